@@ -0,0 +1,7 @@
+from django.contrib.admin.apps import AdminConfig
+
+
+class BookingAdminConfig(AdminConfig):
+    """Serves the booking dashboard as ``admin.site``."""
+
+    default_site = "booking.sites.CustomAdminSite"
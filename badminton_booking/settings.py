@@ -21,13 +21,14 @@ if CSRF_TRUSTED_ORIGINS_ENV:
     CSRF_TRUSTED_ORIGINS = [o.strip() for o in CSRF_TRUSTED_ORIGINS_ENV.split(",") if o.strip()]
 
 INSTALLED_APPS = [
-    "django.contrib.admin",
+    "badminton_booking.apps.BookingAdminConfig",
     "django.contrib.auth",
     "django.contrib.contenttypes",
     "django.contrib.sessions",
     "django.contrib.messages",
-    "django.contrib.staticfiles",
+    # Listed before staticfiles so its collectstatic (which builds image variants) wins
     "booking",
+    "django.contrib.staticfiles",
 ]
 
 MIDDLEWARE = [
@@ -37,6 +38,8 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "booking.middleware.ProfilingMiddleware",
+    "booking.middleware.PrimaryPinMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -59,7 +62,21 @@ TEMPLATES = [
     },
 ]
 
+if not DEBUG:
+    # Compile each template once per process instead of on every render
+    TEMPLATES[0]["APP_DIRS"] = False
+    TEMPLATES[0]["OPTIONS"]["loaders"] = [
+        (
+            "django.template.loaders.cached.Loader",
+            [
+                "django.template.loaders.filesystem.Loader",
+                "django.template.loaders.app_directories.Loader",
+            ],
+        ),
+    ]
+
 WSGI_APPLICATION = "badminton_booking.wsgi.application"
+ASGI_APPLICATION = "badminton_booking.asgi.application"
 
 DATABASES = {
     "default": {
@@ -70,7 +87,68 @@ DATABASES = {
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL:
-    DATABASES["default"] = dj_database_url.parse(DATABASE_URL, conn_max_age=600, ssl_require=True)
+    DATABASES["default"] = dj_database_url.parse(
+        DATABASE_URL, conn_max_age=600, conn_health_checks=True, ssl_require=True
+    )
+
+# Optional read replica for availability, pricing quotes and admin reports.
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+if DATABASE_REPLICA_URL:
+    DATABASES["replica"] = dj_database_url.parse(
+        DATABASE_REPLICA_URL, conn_max_age=600, conn_health_checks=True, ssl_require=True
+    )
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+
+DATABASE_ROUTERS = ["booking.routers.PrimaryReplicaRouter"]
+
+# After a write, a client reads from the primary for this many seconds.
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "10"))
+
+# On-demand profiles (?_profile=1 or an X-Profile header, staff only) are
+# written here; SELECTs slower than the threshold get an EXPLAIN.
+PROFILING_ROOT = Path(os.getenv("PROFILING_ROOT", BASE_DIR / "profiles"))
+PROFILING_EXPLAIN_THRESHOLD_MS = float(os.getenv("PROFILING_EXPLAIN_THRESHOLD_MS", "20"))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Shared cache so invalidations reach every worker
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+
+# Seconds an identical pricing quote is served from cache. Rule and booking
+# changes invalidate entries right away, so this mainly bounds memory.
+PRICING_QUOTE_CACHE_TTL = int(os.getenv("PRICING_QUOTE_CACHE_TTL", "30"))
+
+# Live availability (SSE). The local broker only reaches clients on the same
+# process; set LIVE_AVAILABILITY_BROKER=booking.live.RedisStreamBroker (with
+# REDIS_URL) when running several workers.
+LIVE_AVAILABILITY_BROKER = os.getenv("LIVE_AVAILABILITY_BROKER", "booking.live.LocalBroker")
+LIVE_AVAILABILITY_HEARTBEAT = 15
+LIVE_AVAILABILITY_BACKLOG = 500
+# Furthest date ahead a client may subscribe to
+LIVE_AVAILABILITY_DAYS_AHEAD = 90
+
+# Hours a booking submission's idempotency key is kept for replaying retries
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+
+# Bookings dated more than this many days ago are moved to the archive tables
+BOOKING_ARCHIVE_HORIZON_DAYS = int(os.getenv("BOOKING_ARCHIVE_HORIZON_DAYS", "180"))
+
+# iCalendar feeds: days of past bookings they carry, seconds clients may reuse
+# a response before revalidating, and seconds an assembled feed stays cached
+# (each change retires it anyway). The UID domain keeps event ids globally unique.
+CALENDAR_FEED_PAST_DAYS = int(os.getenv("CALENDAR_FEED_PAST_DAYS", "30"))
+CALENDAR_FEED_MAX_AGE = int(os.getenv("CALENDAR_FEED_MAX_AGE", "300"))
+CALENDAR_FEED_CACHE_TTL = 24 * 60 * 60
+CALENDAR_UID_DOMAIN = os.getenv("CALENDAR_UID_DOMAIN", "badminton-booking")
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -85,7 +163,22 @@ USE_TZ = True
 STATIC_URL = "static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
 STATIC_ROOT = BASE_DIR / "staticfiles"
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+
+# Images served through {% responsive_image %}. collectstatic writes resized
+# AVIF/WebP copies under static/responsive/ so WhiteNoise hashes them too.
+RESPONSIVE_IMAGES = [
+    "assest/Riya_Kumari_A_premium_3D_render_of_a_badminton_scene_in_vibrant_emerald_green_14513214-c142-4994-8505-f64fc7cd55d3.jpg",
+]
+RESPONSIVE_IMAGE_WIDTHS = [480, 768, 1024, 1536]
+RESPONSIVE_IMAGES_ROOT = BASE_DIR / "static"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
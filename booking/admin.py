@@ -1,39 +1,97 @@
+import csv
+from pathlib import Path
+
+from django.conf import settings
 from django.contrib import admin
-from django.contrib.auth.models import User
-from django.db.models import Sum
+from django.core.exceptions import PermissionDenied
+from django.db.models import OuterRef, Subquery
+from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
 from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.html import format_html, format_html_join
 from datetime import timedelta
 
 from .models import (
+    ArchivedBooking,
+    ArchivedBookingEquipment,
     Booking,
     BookingEquipment,
+    BookingEvent,
+    CalendarFeed,
     Coach,
     CoachAvailability,
     Court,
     Equipment,
     PricingRule,
+    RequestProfile,
+    Venue,
     WaitlistEntry,
 )
+from .analytics import MAX_REPORT_DAYS, WEEKDAYS, slot_starts, venue_utilization
+from .backtest import MAX_BACKTEST_DAYS, candidate_rules, run_backtest
+from .changelist import EstimatedCountPaginator, with_date_range_dates
+from .forms import PricingBacktestForm, UtilizationReportForm
+from .ical import feed_url, rotate_feed_secret
+from .routers import replica_reads
+from .search import search_customers
+
+
+@admin.register(Venue)
+class VenueAdmin(admin.ModelAdmin):
+    list_display = ("name", "slug", "is_active")
+    prepopulated_fields = {"slug": ("name",)}
+    search_fields = ("name", "slug")
+
+
+class CalendarFeedAdmin(admin.ModelAdmin):
+    """Lists each object's iCal link, its secret read with the page, and can revoke links."""
+
+    feed_scope: str
+    actions = ["rotate_calendar_feeds"]
+
+    def get_queryset(self, request):
+        secrets = CalendarFeed.objects.filter(scope=self.feed_scope, object_id=OuterRef("pk")).values("secret")
+        return super().get_queryset(request).annotate(feed_secret=Subquery(secrets[:1]))
+
+    @admin.display(description="Calendar feed")
+    def calendar_feed(self, obj):
+        # Share the link, e.g. with the coach; it is the credential
+        url = feed_url(self.feed_scope, obj.pk, getattr(obj, "feed_secret", None))
+        return format_html('<a href="{}">iCal</a>', url)
+
+    @admin.action(description="Issue new calendar feed links (old ones stop working)")
+    def rotate_calendar_feeds(self, request, queryset):
+        ids = list(queryset.values_list("pk", flat=True))
+        for pk in ids:
+            rotate_feed_secret(self.feed_scope, pk)
+        self.message_user(request, f"Issued new calendar feed links for {len(ids)} {self.opts.verbose_name_plural}.")
 
 
 @admin.register(Court)
-class CourtAdmin(admin.ModelAdmin):
-    list_display = ("name", "court_type", "hourly_rate", "is_active")
-    list_filter = ("court_type", "is_active")
+class CourtAdmin(CalendarFeedAdmin):
+    feed_scope = CalendarFeed.COURT
+    list_display = ("name", "venue", "court_type", "hourly_rate", "is_active", "calendar_feed")
+    list_filter = ("venue", "court_type", "is_active")
     search_fields = ("name",)
     list_editable = ("is_active", "hourly_rate")
 
 
 @admin.register(Equipment)
 class EquipmentAdmin(admin.ModelAdmin):
-    list_display = ("name", "total_quantity", "rental_price", "is_active")
+    list_display = ("name", "venue", "total_quantity", "rental_price", "is_active")
+    list_filter = ("venue",)
     search_fields = ("name",)
     list_editable = ("is_active", "rental_price", "total_quantity")
 
 
 @admin.register(Coach)
-class CoachAdmin(admin.ModelAdmin):
-    list_display = ("name", "hourly_rate", "is_active")
+class CoachAdmin(CalendarFeedAdmin):
+    feed_scope = CalendarFeed.COACH
+    list_display = ("name", "venue", "hourly_rate", "is_active", "calendar_feed")
+    list_filter = ("venue",)
     search_fields = ("name",)
     list_editable = ("is_active", "hourly_rate")
 
@@ -50,98 +108,324 @@ class BookingEquipmentInline(admin.TabularInline):
     extra = 0
 
 
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables with millions of rows: estimated counts,
+    no facet or unfiltered counts, a date hierarchy answered from the date
+    index, and customer search through the name index.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    date_hierarchy = "date"
+    ordering = ("-date", "-id")
+
+    def get_queryset(self, request):
+        return with_date_range_dates(super().get_queryset(request))
+
+    def get_search_results(self, request, queryset, search_term):
+        # A number is looked up by primary key, anything else through the customer name index
+        if search_term.strip().isdigit():
+            return queryset.filter(pk=int(search_term)), False
+        if search_term.strip():
+            return search_customers(queryset, search_term), False
+        return queryset, False
+
+
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
+class BookingAdmin(LargeTableAdmin):
     list_display = ("id", "customer_name", "date", "start_time", "end_time", "court", "coach", "status", "total_price")
-    list_filter = ("status", "court", "coach", "date")
-    search_fields = ("customer_name", "id")
+    list_filter = ("venue", "status", "court", "coach", "date")
+    list_select_related = ("court", "coach")
+    search_fields = ("customer_name",)
     inlines = [BookingEquipmentInline]
     readonly_fields = ("created_at", "total_price")
 
+    def get_urls(self):
+        return [
+            path(
+                "utilization/",
+                self.admin_site.admin_view(self.utilization_view),
+                name="booking_booking_utilization",
+            ),
+        ] + super().get_urls()
+
+    @method_decorator(replica_reads)
+    def utilization_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        today = timezone.localdate()
+        form = UtilizationReportForm(
+            request.GET or None,
+            initial={"venue": Venue.objects.order_by("name").first(), "date_from": today - timedelta(days=89), "date_to": today},
+            max_days=MAX_REPORT_DAYS,
+        )
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Court utilization",
+            "opts": self.model._meta,
+            "form": form,
+        }
+        if form.is_valid():
+            venue = form.cleaned_data["venue"]
+            report = venue_utilization(venue, form.cleaned_data["date_from"], form.cleaned_data["date_to"])
+            if request.GET.get("format") == "csv":
+                return self._utilization_csv(venue, report)
+            context.update(_utilization_context(report))
+        return TemplateResponse(request, "admin/booking/utilization.html", context)
+
+    @staticmethod
+    def _utilization_csv(venue, report):
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = (
+            f'attachment; filename="utilization-{venue.slug}-{report.date_from}-{report.date_to}.csv"'
+        )
+        utilization, revenue = report.court_weekday_slot()
+        starts = [start.strftime("%H:%M") for start in slot_starts()]
+        writer = csv.writer(response)
+        writer.writerow(["court", "weekday", "slot", "utilization", "avg_daily_revenue"])
+        for court_index, court in enumerate(report.courts):
+            for weekday, label in enumerate(WEEKDAYS):
+                writer.writerows(
+                    (court.name, label, start, round(share, 4), round(amount, 2))
+                    for start, share, amount in zip(
+                        starts, utilization[court_index, weekday].tolist(), revenue[court_index, weekday].tolist()
+                    )
+                )
+        return response
+
+
+def _heatmap_rows(labels, grid):
+    # Cell shading is relative to the busiest cell of the grid
+    peak = grid.max() if grid.size and grid.max() > 0 else 1
+    return [
+        (label, [(value, round(value / peak, 2)) for value in row])
+        for label, row in zip(labels, grid.tolist())
+    ]
+
+
+def _utilization_context(report):
+    starts = slot_starts()
+    peaks, idle = report.extremes()
+
+    def cells(extremes):
+        return [(WEEKDAYS[weekday], starts[slot], share * 100) for weekday, slot, share in extremes]
+
+    return {
+        "report": report,
+        "slots": starts,
+        "utilization_rows": _heatmap_rows(WEEKDAYS, report.weekday_slot_utilization() * 100),
+        "revenue_rows": _heatmap_rows(WEEKDAYS, report.weekday_slot_revenue()),
+        "court_rows": list(
+            zip(report.courts, (report.court_utilization() * 100).tolist(), report.court_revenue().tolist())
+        ),
+        "slot_rows": list(zip(starts, (report.slot_utilization() * 100).tolist(), report.slot_revenue().tolist())),
+        "extremes": list(zip(cells(peaks), cells(idle))),
+        "overall": report.overall * 100,
+    }
+
+
+class ArchivedBookingEquipmentInline(admin.TabularInline):
+    model = ArchivedBookingEquipment
+    extra = 0
+    can_delete = False
+    readonly_fields = ("equipment", "quantity")
+
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(admin.ModelAdmin):
+    list_display = ("id", "customer_name", "date", "start_time", "end_time", "court", "coach", "status", "total_price")
+    list_filter = ("venue", "status")
+    search_fields = ("customer_name", "id")
+    date_hierarchy = "date"
+    list_select_related = ("court", "coach")
+    inlines = [ArchivedBookingEquipmentInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(PricingRule)
 class PricingRuleAdmin(admin.ModelAdmin):
-    list_display = ("name", "rule_type", "percentage_adjustment", "is_active")
-    list_filter = ("rule_type", "is_active")
+    list_display = ("name", "venue", "rule_type", "percentage_adjustment", "occupancy_threshold", "is_active")
+    list_filter = ("venue", "rule_type", "is_active")
     list_editable = ("is_active", "percentage_adjustment")
 
+    def get_urls(self):
+        return [
+            path(
+                "backtest/",
+                self.admin_site.admin_view(self.backtest_view),
+                name="booking_pricingrule_backtest",
+            ),
+        ] + super().get_urls()
+
+    @method_decorator(replica_reads)
+    def backtest_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        venues = Venue.objects.order_by("name")
+        venue = venues.filter(pk=request.GET.get("venue")).first() if request.GET.get("venue", "").isdigit() else None
+        venue = venue or venues.first()
+        today = timezone.localdate()
+        form = PricingBacktestForm(
+            request.GET if "date_from" in request.GET else None,
+            initial={"venue": venue, "date_from": today - timedelta(days=365), "date_to": today - timedelta(days=1)},
+            rules=PricingRule.objects.filter(venue=venue).order_by("id"),
+            max_days=MAX_BACKTEST_DAYS,
+        )
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Pricing backtest",
+            "opts": self.model._meta,
+            "form": form,
+        }
+        if form.is_valid() and form.cleaned_data["venue"] == venue:
+            result = run_backtest(
+                venue,
+                form.cleaned_data["date_from"],
+                form.cleaned_data["date_to"],
+                candidate_rules(form.rules, form.adjustments()),
+            )
+            sections = [
+                ("Court type", result.by_court_type()),
+                ("Weekday", result.by_weekday()),
+                ("Hour", result.by_hour()),
+                ("Day", result.by_day()),
+            ]
+            if request.GET.get("format") == "csv":
+                return self._backtest_csv(venue, result, sections)
+            recorded, current, candidate = result.totals
+            context.update(
+                {
+                    "result": result,
+                    "recorded": recorded,
+                    "current": current,
+                    "candidate": candidate,
+                    "change": candidate - current,
+                    "change_percent": (candidate - current) / current * 100 if current else 0,
+                    "sections": sections,
+                }
+            )
+        return TemplateResponse(request, "admin/booking/pricing_backtest.html", context)
+
+    @staticmethod
+    def _backtest_csv(venue, result, sections):
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = (
+            f'attachment; filename="pricing-backtest-{venue.slug}-{result.date_from}-{result.date_to}.csv"'
+        )
+        writer = csv.writer(response)
+        writer.writerow(["group", "value", "bookings", "current", "candidate", "change", "change_percent"])
+        for title, rows in sections:
+            writer.writerows(
+                (title.lower(), label, count, round(before, 2), round(after, 2), round(delta, 2), round(percent, 2))
+                for label, count, before, after, delta, percent in rows
+            )
+        return response
+
 
 @admin.register(WaitlistEntry)
-class WaitlistAdmin(admin.ModelAdmin):
+class WaitlistAdmin(LargeTableAdmin):
     list_display = ("customer_name", "date", "start_time", "court", "created_at", "notified")
     list_filter = ("court", "date", "notified")
+    list_select_related = ("court",)
     search_fields = ("customer_name",)
 
 
-# Custom admin dashboard view
-class CustomAdminSite(admin.AdminSite):
-    site_header = "Badminton Booking Administration"
-    site_title = "Badminton Booking Admin"
-    index_title = "Dashboard"
-    
-    def index(self, request, extra_context=None):
-        # Get dashboard data
-        today = timezone.now().date()
-        week_start = today - timedelta(days=today.weekday())
-        month_start = today.replace(day=1)
-        
-        # Recent bookings
-        recent_bookings = Booking.objects.select_related('court').order_by('-created_at')[:5]
-        
-        # User statistics
-        user_count = User.objects.count()
-        active_users_today = User.objects.filter(last_login__date=today).count()
-        
-        # Revenue data
-        revenue_today = Booking.objects.filter(
-            date=today, 
-            status=Booking.CONFIRMED
-        ).aggregate(total=Sum('total_price'))['total'] or 0
-        
-        revenue_week = Booking.objects.filter(
-            date__gte=week_start,
-            date__lte=today,
-            status=Booking.CONFIRMED
-        ).aggregate(total=Sum('total_price'))['total'] or 0
-        
-        revenue_month = Booking.objects.filter(
-            date__gte=month_start,
-            date__lte=today,
-            status=Booking.CONFIRMED
-        ).aggregate(total=Sum('total_price'))['total'] or 0
-        
-        # System status
-        court_count = Court.objects.filter(is_active=True).count()
-        equipment_count = Equipment.objects.filter(is_active=True).count()
-        coach_count = Coach.objects.filter(is_active=True).count()
-        waitlist_count = WaitlistEntry.objects.count()
-        
-        extra_context = extra_context or {}
-        extra_context.update({
-            'booking_list': recent_bookings,
-            'user_count': user_count,
-            'active_users_today': active_users_today,
-            'revenue_today': revenue_today,
-            'revenue_week': revenue_week,
-            'revenue_month': revenue_month,
-            'court_count': court_count,
-            'equipment_count': equipment_count,
-            'coach_count': coach_count,
-            'waitlist_count': waitlist_count,
-        })
-        
-        return super().index(request, extra_context)
-
-
-# Create custom admin site instance
-custom_admin_site = CustomAdminSite(name='custom_admin')
-
-
-# Register models with custom admin site
-custom_admin_site.register(Court, CourtAdmin)
-custom_admin_site.register(Equipment, EquipmentAdmin)
-custom_admin_site.register(Coach, CoachAdmin)
-custom_admin_site.register(CoachAvailability, CoachAvailabilityAdmin)
-custom_admin_site.register(Booking, BookingAdmin)
-custom_admin_site.register(PricingRule, PricingRuleAdmin)
-custom_admin_site.register(WaitlistEntry, WaitlistAdmin)
\ No newline at end of file
+@admin.register(BookingEvent)
+class BookingEventAdmin(admin.ModelAdmin):
+    list_display = ("sequence", "recorded_at", "kind", "venue", "booking_id", "waitlist_entry_id", "date")
+    list_filter = ("kind", "venue")
+    search_fields = ("=booking_id",)
+    ordering = ("-sequence",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    readonly_fields = ("sequence", "recorded_at", "kind", "venue", "booking_id", "waitlist_entry_id", "date", "data")
+
+    # The log is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "method", "path", "status_code", "duration_ms", "query_count", "query_ms", "user")
+    list_filter = ("method", "status_code")
+    search_fields = ("path",)
+    date_hierarchy = "created_at"
+    list_select_related = ("user",)
+    exclude = ("queries", "summary", "stats_file")
+    readonly_fields = (
+        "created_at",
+        "user",
+        "method",
+        "path",
+        "status_code",
+        "duration_ms",
+        "query_count",
+        "query_ms",
+        "stats_download",
+        "profile_summary",
+        "query_table",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:pk>/stats/",
+                self.admin_site.admin_view(self.stats_view),
+                name="booking_requestprofile_stats",
+            ),
+        ] + super().get_urls()
+
+    def stats_view(self, request, pk):
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        stats_path = Path(settings.PROFILING_ROOT) / Path(profile.stats_file).name
+        if not stats_path.exists():
+            raise Http404("Stats file no longer exists")
+        return FileResponse(stats_path.open("rb"), as_attachment=True, filename=stats_path.name)
+
+    @admin.display(description="cProfile stats")
+    def stats_download(self, obj):
+        url = reverse(f"{self.admin_site.name}:booking_requestprofile_stats", args=[obj.pk])
+        return format_html('<a href="{}">{}</a> (open with snakeviz or pstats)', url, obj.stats_file)
+
+    @admin.display(description="Top functions")
+    def profile_summary(self, obj):
+        return format_html("<pre>{}</pre>", obj.summary)
+
+    @admin.display(description="Queries")
+    def query_table(self, obj):
+        rows = format_html_join(
+            "",
+            "<tr><td>{}</td><td>{}</td><td><pre>{}</pre><small>{}</small>{}</td></tr>",
+            (
+                (
+                    query["alias"],
+                    query["ms"],
+                    query["sql"],
+                    query["params"],
+                    format_html("<pre>{}</pre>", query["explain"]) if "explain" in query else "",
+                )
+                for query in sorted(obj.queries, key=lambda query: query["ms"], reverse=True)
+            ),
+        )
+        return format_html("<table><tr><th>DB</th><th>ms</th><th>SQL</th></tr>{}</table>", rows)
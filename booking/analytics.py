@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date as date_type
+from datetime import time
+
+import numpy as np
+from django.db.models import FloatField, Func, IntegerField
+from django.db.models.functions import Cast, Coalesce
+
+from .models import CLOSING_HOUR, OPENING_HOUR, ArchivedBooking, Booking, Court
+
+SLOT_MINUTES = 30
+SLOT_COUNT = (CLOSING_HOUR - OPENING_HOUR) * 60 // SLOT_MINUTES
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+# Longest range a report may cover; a year of 30 courts is ~3 MB per array
+MAX_REPORT_DAYS = 731
+
+
+def slot_starts() -> list[time]:
+    minutes = OPENING_HOUR * 60 + np.arange(SLOT_COUNT) * SLOT_MINUTES
+    return [time(int(minute) // 60, int(minute) % 60) for minute in minutes]
+
+
+class MinuteOfDay(Func):
+    """Minutes since midnight of a time column."""
+
+    output_field = IntegerField()
+    template = "CAST(EXTRACT(EPOCH FROM %(expressions)s) AS integer) / 60"
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # Times are stored as 'HH:MM:SS'; ExtractHour would call back into Python per row
+        return self.as_sql(
+            compiler,
+            connection,
+            template="CAST(substr(%(expressions)s, 1, 2) AS integer) * 60 + CAST(substr(%(expressions)s, 4, 2) AS integer)",
+            **extra_context,
+        )
+
+
+class DayOrdinal(Func):
+    """``date.toordinal()`` of a date column, so dates arrive as plain integers."""
+
+    output_field = IntegerField()
+    template = "(%(expressions)s - DATE '0001-01-01' + 1)"
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, template="CAST(julianday(%(expressions)s) - 1721424.5 AS integer)", **extra_context
+        )
+
+
+COLUMNS = ("court_id", "coach_pk", "day", "start", "end", "price")
+
+
+def load_bookings(venue, date_from: date_type, date_to: date_type) -> dict[str, np.ndarray]:
+    """
+    Confirmed bookings of ``venue`` dated in ``[date_from, date_to]``, hot
+    and archived, as parallel column arrays. The database turns every value
+    into a number (day ordinal, start and end minute, price; 0 for no
+    coach), so rows load straight into one array with no per-row conversion
+    in Python.
+    """
+    chunks = []
+    for model in (Booking, ArchivedBooking):
+        rows = (
+            model.objects.filter(venue=venue, status=Booking.CONFIRMED, date__gte=date_from, date__lte=date_to)
+            .annotate(
+                coach_pk=Coalesce("coach_id", 0),
+                day=DayOrdinal("date"),
+                start=MinuteOfDay("start_time"),
+                end=MinuteOfDay("end_time"),
+                price=Cast("total_price", FloatField()),
+            )
+            .values_list(*COLUMNS)
+        )
+        chunks.append(np.array(list(rows), dtype=np.float64).reshape(-1, len(COLUMNS)))
+    table = np.concatenate(chunks)
+    columns = {name: table[:, index].astype(np.int64) for index, name in enumerate(COLUMNS[:-1])}
+    columns["price"] = table[:, -1]
+    return columns
+
+
+@dataclass
+class Utilization:
+    """
+    Court × day × slot grids for a date range. ``occupancy`` is 1 where a
+    confirmed booking covers the slot; ``revenue`` spreads each booking's
+    price evenly over the slots it covers.
+    """
+
+    date_from: date_type
+    date_to: date_type
+    courts: list[Court]
+    occupancy: np.ndarray
+    revenue: np.ndarray
+
+    @property
+    def weekdays(self) -> np.ndarray:
+        """Weekday (0 = Monday) of each day on the day axis."""
+        return (np.arange(self.occupancy.shape[1]) + self.date_from.weekday()) % 7
+
+    def _by_weekday(self, grid: np.ndarray) -> np.ndarray:
+        # (7, D) one-hot matrix times (..., D, S) sums each weekday's days in one product
+        onehot = (self.weekdays == np.arange(7)[:, None]).astype(np.float64)
+        return np.matmul(onehot, grid)
+
+    def _weekday_days(self) -> np.ndarray:
+        return np.bincount(self.weekdays, minlength=7)
+
+    @property
+    def overall(self) -> float:
+        return float(self.occupancy.mean()) if self.occupancy.size else 0.0
+
+    @property
+    def total_revenue(self) -> float:
+        return float(self.revenue.sum())
+
+    def court_utilization(self) -> np.ndarray:
+        return self.occupancy.mean(axis=(1, 2))
+
+    def court_revenue(self) -> np.ndarray:
+        return self.revenue.sum(axis=(1, 2))
+
+    def slot_utilization(self) -> np.ndarray:
+        return self.occupancy.mean(axis=(0, 1))
+
+    def slot_revenue(self) -> np.ndarray:
+        return self.revenue.sum(axis=(0, 1))
+
+    def weekday_slot_utilization(self) -> np.ndarray:
+        """(7, S) share of court-slots booked on each weekday at each slot."""
+        booked = self._by_weekday(self.occupancy.sum(axis=0))
+        available = self._weekday_days()[:, None] * len(self.courts)
+        return np.divide(booked, available, out=np.zeros_like(booked), where=available > 0)
+
+    def weekday_slot_revenue(self) -> np.ndarray:
+        """(7, S) average revenue per day on each weekday at each slot."""
+        earned = self._by_weekday(self.revenue.sum(axis=0))
+        days = self._weekday_days()[:, None]
+        return np.divide(earned, days, out=np.zeros_like(earned), where=days > 0)
+
+    def court_weekday_slot(self) -> tuple[np.ndarray, np.ndarray]:
+        """(C, 7, S) utilization and average daily revenue per court."""
+        days = self._weekday_days()[None, :, None]
+        booked = self._by_weekday(self.occupancy)
+        earned = self._by_weekday(self.revenue)
+        utilization = np.divide(booked, days, out=np.zeros_like(booked), where=days > 0)
+        revenue = np.divide(earned, days, out=np.zeros_like(earned), where=days > 0)
+        return utilization, revenue
+
+    def extremes(self, count: int = 5) -> tuple[list[tuple[int, int, float]], list[tuple[int, int, float]]]:
+        """The ``count`` busiest and quietest (weekday, slot, utilization) cells."""
+        grid = self.weekday_slot_utilization()
+        present = self._weekday_days() > 0
+        flat = np.where(present[:, None], grid, np.nan).ravel()
+        order = np.argsort(flat, kind="stable")
+        order = order[~np.isnan(flat[order])]
+
+        def cells(indexes):
+            return [(int(index) // SLOT_COUNT, int(index) % SLOT_COUNT, float(flat[index])) for index in indexes]
+
+        return cells(order[::-1][:count]), cells(order[:count])
+
+
+def compute_utilization(columns: dict[str, np.ndarray], courts: list[Court], date_from: date_type, date_to: date_type) -> Utilization:
+    """
+    Build the occupancy and revenue grids from ``load_bookings`` columns.
+    Each booking adds +1 at its first slot and -1 past its last in a
+    difference array; a cumulative sum along the slot axis then gives every
+    slot's occupancy, all without a Python loop over bookings.
+    """
+    court_ids = np.array(sorted(court.id for court in courts), dtype=np.int64)
+    courts = sorted(courts, key=lambda court: court.id)
+    days = (date_to - date_from).days + 1
+    shape = (len(courts), days, SLOT_COUNT + 1)
+    occupancy = np.zeros(shape, dtype=np.float64)
+    revenue = np.zeros(shape, dtype=np.float64)
+
+    court_index = np.searchsorted(court_ids, columns["court_id"])
+    day_index = columns["day"] - date_from.toordinal()
+    opening = OPENING_HOUR * 60
+    # A slot counts as booked when any part of it is; clip to opening hours
+    first = np.clip((columns["start"] - opening) // SLOT_MINUTES, 0, SLOT_COUNT)
+    last = np.clip(-((opening - columns["end"]) // SLOT_MINUTES), 0, SLOT_COUNT)
+    known = (court_index < len(court_ids)) & (last > first)
+    known[known] = court_ids[court_index[known]] == columns["court_id"][known]
+    court_index, day_index, first, last = court_index[known], day_index[known], first[known], last[known]
+    per_slot = columns["price"][known] / (last - first)
+
+    np.add.at(occupancy, (court_index, day_index, first), 1)
+    np.add.at(occupancy, (court_index, day_index, last), -1)
+    np.add.at(revenue, (court_index, day_index, first), per_slot)
+    np.add.at(revenue, (court_index, day_index, last), -per_slot)
+    occupancy = np.minimum(np.cumsum(occupancy, axis=2)[:, :, :SLOT_COUNT], 1)
+    revenue = np.cumsum(revenue, axis=2)[:, :, :SLOT_COUNT]
+    return Utilization(date_from, date_to, courts, occupancy, revenue)
+
+
+def venue_utilization(venue, date_from: date_type, date_to: date_type) -> Utilization:
+    courts = list(Court.objects.filter(venue=venue))
+    return compute_utilization(load_bookings(venue, date_from, date_to), courts, date_from, date_to)
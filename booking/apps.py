@@ -5,4 +5,13 @@ class BookingConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "booking"
 
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .live import check_broker
+        from .routers import watch_for_writes
+
+        connection_created.connect(watch_for_writes)
+        check_broker()
 
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .ical import bump_feeds_showing
+from .models import (
+    ArchivedBooking,
+    ArchivedBookingEquipment,
+    ArchivedWaitlistEntry,
+    Booking,
+    BookingEquipment,
+    WaitlistEntry,
+)
+
+BOOKING_FIELDS = (
+    "id",
+    "created_at",
+    "venue_id",
+    "user_id",
+    "customer_name",
+    "date",
+    "start_time",
+    "end_time",
+    "court_id",
+    "coach_id",
+    "total_price",
+    "status",
+)
+WAITLIST_FIELDS = ("date", "start_time", "end_time", "court_id", "created_at", "customer_name", "notified")
+
+# Set while archived bookings are deleted; the booking signal handlers check it.
+_archiving: ContextVar[bool] = ContextVar("archiving_bookings", default=False)
+
+
+def archiving() -> bool:
+    return _archiving.get()
+
+
+@contextmanager
+def skip_booking_signals():
+    """
+    Deletes inside the block skip the per-row booking handlers. They would do
+    nothing for rows past the archive cutoff (past slots, no event log
+    entries) but cost queries per row.
+    """
+    token = _archiving.set(True)
+    try:
+        yield
+    finally:
+        _archiving.reset(token)
+
+
+def archive_cutoff():
+    """Bookings dated before this move to the archive tables."""
+    return timezone.localdate() - timedelta(days=settings.BOOKING_ARCHIVE_HORIZON_DAYS)
+
+
+def archive_booking_batch(cutoff, batch_size: int) -> int:
+    """
+    Move up to ``batch_size`` of the oldest bookings dated before ``cutoff``,
+    with their equipment rows, into the archive. Each batch commits on its
+    own, so an interrupted run simply resumes with the next call. The rows
+    are deleted without the booking signal handlers, so ``cutoff`` must not
+    be later than ``archive_cutoff()``.
+    """
+    with transaction.atomic(using=router.db_for_write(Booking)):
+        return _archive_booking_batch(cutoff, batch_size)
+
+
+def _archive_booking_batch(cutoff, batch_size: int) -> int:
+    rows = list(
+        Booking.objects.select_for_update(skip_locked=True)
+        .filter(date__lt=cutoff)
+        .order_by("date", "id")
+        .values(*BOOKING_FIELDS)[:batch_size]
+    )
+    if not rows:
+        return 0
+    ids = [row["id"] for row in rows]
+    ArchivedBooking.objects.bulk_create([ArchivedBooking(**row) for row in rows], ignore_conflicts=True)
+    ArchivedBookingEquipment.objects.bulk_create(
+        [
+            ArchivedBookingEquipment(**row)
+            for row in BookingEquipment.objects.filter(booking_id__in=ids).values("booking_id", "equipment_id", "quantity")
+        ]
+    )
+    # Feeds still showing these bookings are the one thing the skipped handlers
+    # would update; dependent rows follow the usual on_delete rules
+    using = router.db_for_write(Booking)
+    bump_feeds_showing(ids, using)
+    with skip_booking_signals():
+        Booking.objects.using(using).filter(id__in=ids).delete()
+    return len(ids)
+
+
+def archive_waitlist_batch(cutoff, batch_size: int) -> int:
+    with transaction.atomic(using=router.db_for_write(WaitlistEntry)):
+        return _archive_waitlist_batch(cutoff, batch_size)
+
+
+def _archive_waitlist_batch(cutoff, batch_size: int) -> int:
+    rows = list(
+        WaitlistEntry.objects.select_for_update(skip_locked=True)
+        .filter(date__lt=cutoff)
+        .order_by("id")
+        .values("id", *WAITLIST_FIELDS)[:batch_size]
+    )
+    if not rows:
+        return 0
+    ids = [row.pop("id") for row in rows]
+    ArchivedWaitlistEntry.objects.bulk_create([ArchivedWaitlistEntry(**row) for row in rows])
+    WaitlistEntry.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def user_booking_history(user, limit: int = 50) -> list:
+    """
+    A user's most recent bookings across hot and archived data. The archive is
+    only read when the hot table can't fill the page.
+    """
+    bookings = list(
+        Booking.objects.filter(user=user).select_related("court", "coach").order_by("-created_at")[:limit]
+    )
+    if len(bookings) < limit:
+        bookings += list(
+            ArchivedBooking.objects.filter(user=user)
+            .select_related("court", "coach")
+            .order_by("-created_at")[: limit - len(bookings)]
+        )
+        bookings.sort(key=lambda booking: booking.created_at, reverse=True)
+    return bookings
+
+
+def confirmed_revenue(date_from, date_to):
+    """Confirmed revenue for bookings dated in ``[date_from, date_to]``, hot and archived."""
+    total = 0
+    for model in (Booking, ArchivedBooking):
+        total += (
+            model.objects.filter(date__gte=date_from, date__lte=date_to, status=Booking.CONFIRMED).aggregate(
+                total=Sum("total_price")
+            )["total"]
+            or 0
+        )
+    return total
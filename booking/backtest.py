@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+from copy import copy
+from dataclasses import dataclass
+from datetime import date as date_type
+from decimal import Decimal
+
+import numpy as np
+
+from .analytics import WEEKDAYS, load_bookings
+from .models import Coach, Court, PricingRule
+
+COURT_TYPES = [value for value, label in Court.COURT_TYPE_CHOICES]
+
+# Bookings are replayed as flat arrays, so long ranges only cost a few MB
+MAX_BACKTEST_DAYS = 10 * 366
+
+
+def _minutes(value) -> int:
+    return value.hour * 60 + value.minute
+
+
+class _Lookup:
+    """Maps ids in a column to positions in a list of objects, vectorized."""
+
+    def __init__(self, objects):
+        self.objects = sorted(objects, key=lambda obj: obj.id)
+        self.ids = np.array([obj.id for obj in self.objects], dtype=np.int64)
+
+    def index(self, ids: np.ndarray) -> np.ndarray:
+        """Position of each id, or -1 where it isn't known."""
+        positions = np.searchsorted(self.ids, ids)
+        found = positions < len(self.ids)
+        found[found] = self.ids[positions[found]] == ids[found]
+        return np.where(found, positions, -1)
+
+    def values(self, attribute: str, dtype=np.float64) -> np.ndarray:
+        return np.array([getattr(obj, attribute) for obj in self.objects], dtype=dtype)
+
+
+@dataclass
+class Bookings:
+    """Column arrays of the bookings being replayed, with their price inputs resolved."""
+
+    day: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    court: np.ndarray
+    court_type: np.ndarray
+    base_price: np.ndarray
+    recorded: np.ndarray
+    # Share of the venue's active courts booked in the busiest hour, other than by the booking itself
+    occupancy: np.ndarray
+
+    @classmethod
+    def load(cls, venue, date_from: date_type, date_to: date_type) -> Bookings:
+        columns = load_bookings(venue, date_from, date_to)
+        courts = _Lookup(Court.objects.filter(venue=venue))
+        coaches = _Lookup(Coach.objects.filter(venue=venue))
+        court = courts.index(columns["court_id"])
+        known = court >= 0
+        columns = {name: values[known] for name, values in columns.items()}
+        court = court[known]
+
+        coach = coaches.index(columns["coach_pk"])
+        coach_rates = np.append(coaches.values("hourly_rate"), 0.0)
+        court_rates = courts.values("hourly_rate")
+        hours = (columns["end"] - columns["start"]) / 60
+        # Same arithmetic as calculate_base_price; index -1 picks the appended 0 rate
+        base_price = hours * (court_rates[court] + coach_rates[coach])
+        court_types = np.array([COURT_TYPES.index(obj.court_type) for obj in courts.objects], dtype=np.int64)
+        active_courts = int(sum(obj.is_active for obj in courts.objects))
+        return cls(
+            day=columns["day"],
+            start=columns["start"],
+            end=columns["end"],
+            court=court,
+            court_type=court_types[court],
+            base_price=base_price,
+            recorded=columns["price"],
+            occupancy=_peak_occupancy(columns["day"], columns["start"], columns["end"], active_courts),
+        )
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+
+def _first_last_hours(start: np.ndarray, end: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # booking_hours(): every hour the booking touches, end exclusive
+    return start // 60, -(-end // 60)
+
+
+def _peak_occupancy(day: np.ndarray, start: np.ndarray, end: np.ndarray, active_courts: int) -> np.ndarray:
+    """
+    What the demand counters would have read for each booking: confirmed
+    bookings per (day, hour) from a difference array, minus the booking
+    itself, over the busiest hour it touches.
+    """
+    if not len(day) or not active_courts:
+        return np.zeros(len(day))
+    first, last = _first_last_hours(start, end)
+    day_index = day - day.min()
+    counts = np.zeros((day_index.max() + 1, 25), dtype=np.int64)
+    np.add.at(counts, (day_index, first), 1)
+    np.add.at(counts, (day_index, last), -1)
+    counts = np.cumsum(counts, axis=1)
+    peak = np.zeros(len(day), dtype=np.int64)
+    # One pass per hour offset, bounded by the longest booking, not per booking
+    for offset in range(int((last - first).max())):
+        hour = first + offset
+        covered = hour < last
+        peak = np.where(covered, np.maximum(peak, counts[day_index, np.minimum(hour, 24)]), peak)
+    return np.minimum((peak - 1) / active_courts, 1.0)
+
+
+def price_factors(rules, bookings: Bookings) -> np.ndarray:
+    """
+    The product of every applicable rule's multiplier for each booking,
+    vectorized rule by rule with the same conditions as ``rule_applies``.
+    """
+    factors = np.ones(len(bookings))
+    weekday = (bookings.day - 1) % 7  # date.fromordinal(1) is a Monday
+    for rule in rules:
+        if rule.rule_type == PricingRule.WEEKEND:
+            applies = weekday >= 5
+        elif rule.rule_type == PricingRule.PEAK_HOUR:
+            if not rule.peak_start or not rule.peak_end:
+                continue
+            applies = (bookings.end > _minutes(rule.peak_start)) & (bookings.start < _minutes(rule.peak_end))
+        elif rule.rule_type == PricingRule.INDOOR_PREMIUM:
+            applies = bookings.court_type == COURT_TYPES.index(Court.INDOOR)
+        elif rule.rule_type == PricingRule.DEMAND:
+            if rule.occupancy_threshold is None:
+                continue
+            applies = bookings.occupancy * 100 > rule.occupancy_threshold
+        else:
+            continue
+        factors = np.where(applies, factors * (1 + float(rule.percentage_adjustment) / 100.0), factors)
+    return factors
+
+
+def reprice(rules, bookings: Bookings) -> np.ndarray:
+    return np.round(bookings.base_price * price_factors(rules, bookings), 2)
+
+
+@dataclass
+class Backtest:
+    """Prices of the same bookings under the current rules and a candidate rule set."""
+
+    date_from: date_type
+    date_to: date_type
+    bookings: Bookings
+    current: np.ndarray
+    candidate: np.ndarray
+
+    @property
+    def totals(self) -> tuple[float, float, float]:
+        return float(self.bookings.recorded.sum()), float(self.current.sum()), float(self.candidate.sum())
+
+    def _grouped(self, groups: np.ndarray, size: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        count = np.bincount(groups, minlength=size)
+        current = np.bincount(groups, weights=self.current, minlength=size)
+        candidate = np.bincount(groups, weights=self.candidate, minlength=size)
+        return count, current, candidate
+
+    def _rows(self, labels, groups: np.ndarray) -> list[tuple]:
+        """``(label, bookings, current, candidate, delta, delta %)`` per group with bookings."""
+        count, current, candidate = self._grouped(groups, len(labels))
+        delta = candidate - current
+        percent = np.divide(delta * 100, current, out=np.zeros_like(delta), where=current != 0)
+        return [
+            row
+            for row in zip(labels, count.tolist(), current.tolist(), candidate.tolist(), delta.tolist(), percent.tolist())
+            if row[1]
+        ]
+
+    def by_day(self) -> list[tuple]:
+        first = self.date_from.toordinal()
+        days = (self.date_to - self.date_from).days + 1
+        labels = [date_type.fromordinal(first + offset) for offset in range(days)]
+        return self._rows(labels, self.bookings.day - first)
+
+    def by_weekday(self) -> list[tuple]:
+        return self._rows(WEEKDAYS, (self.bookings.day - 1) % 7)
+
+    def by_hour(self) -> list[tuple]:
+        return self._rows([f"{hour:02d}:00" for hour in range(24)], self.bookings.start // 60)
+
+    def by_court_type(self) -> list[tuple]:
+        labels = [dict(Court.COURT_TYPE_CHOICES)[value] for value in COURT_TYPES]
+        return self._rows(labels, self.bookings.court_type)
+
+
+def candidate_rules(rules, adjustments: dict[int, Decimal | None]) -> list[PricingRule]:
+    """
+    Unsaved copies of ``rules`` to backtest: a rule whose id is in
+    ``adjustments`` takes that percentage, or is left out for ``None``;
+    the others keep their percentage if active.
+    """
+    candidates = []
+    for rule in rules:
+        if rule.id in adjustments:
+            if adjustments[rule.id] is None:
+                continue
+            rule = copy(rule)
+            rule.percentage_adjustment = adjustments[rule.id]
+        elif not rule.is_active:
+            continue
+        candidates.append(rule)
+    return candidates
+
+
+def run_backtest(venue, date_from: date_type, date_to: date_type, candidate_rules) -> Backtest:
+    """
+    Replay ``venue``'s confirmed bookings (archived ones included) dated in
+    ``[date_from, date_to]`` through its active rules and through
+    ``candidate_rules`` at today's court and coach rates. Demand rules see
+    each hour's final occupancy, less the booking being priced.
+    """
+    bookings = Bookings.load(venue, date_from, date_to)
+    current_rules = list(PricingRule.objects.filter(venue=venue, is_active=True))
+    return Backtest(date_from, date_to, bookings, reprice(current_rules, bookings), reprice(candidate_rules, bookings))
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .routers import use_primary
+
+
+def _pricing_version_key(venue_id: int) -> str:
+    return f"pricing:version:{venue_id}"
+
+
+def _availability_version_key(venue_id: int, date) -> str:
+    return f"availability:version:{venue_id}:{date.isoformat()}"
+
+
+async def pricing_version(venue_id: int) -> int:
+    """Bumped whenever a venue's rules, courts, coaches or equipment prices change."""
+    return await cache.aget_or_set(_pricing_version_key(venue_id), 1, timeout=None)
+
+
+async def availability_version(venue_id: int, date) -> int:
+    """Bumped whenever a booking at the venue on ``date`` is created, changed or cancelled."""
+    return await cache.aget_or_set(_availability_version_key(venue_id, date), 1, timeout=None)
+
+
+async def grid_versions(venue_id: int, date) -> tuple[int, int]:
+    """``(availability_version, pricing_version)`` in one cache round trip once both keys exist."""
+    keys = (_availability_version_key(venue_id, date), _pricing_version_key(venue_id))
+    found = await cache.aget_many(keys)
+    if len(found) < len(keys):
+        return await availability_version(venue_id, date), await pricing_version(venue_id)
+    return found[keys[0]], found[keys[1]]
+
+
+def _bump(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Never read yet, so nothing can be cached under it
+        cache.set(key, 2, timeout=None)
+
+
+def prime_versions(venue_id: int, date) -> None:
+    """Create the version keys ahead of traffic so the first requests don't race to set them."""
+    cache.get_or_set(_pricing_version_key(venue_id), 1, timeout=None)
+    cache.get_or_set(_availability_version_key(venue_id, date), 1, timeout=None)
+
+
+def bump_pricing_version(venue_id: int) -> None:
+    _bump(_pricing_version_key(venue_id))
+
+
+def bump_availability_version(venue_id: int, date) -> None:
+    _bump(_availability_version_key(venue_id, date))
+
+
+async def quote_cache_key(
+    venue_id: int, date, start, end, court_id: int, coach_id: int | None, equipment: dict[int, int]
+) -> str:
+    av, pv = await grid_versions(venue_id, date)
+    equipment_part = ",".join(f"{eq_id}x{qty}" for eq_id, qty in sorted(equipment.items()))
+    return (
+        f"quote:{venue_id}:{pv}:{av}:{date.isoformat()}:{start:%H%M}-{end:%H%M}"
+        f":{court_id}:{coach_id or ''}:{equipment_part}"
+    )
+
+
+async def cached_quote(key: str, compute):
+    """
+    Return the cached quote for ``key`` or compute it once. Concurrent misses
+    for the same key within this worker share a single computation, which
+    reads the primary: the key's versions are already bumped, so a lagging
+    replica would leave a stale quote cached under them.
+    """
+    payload = await cache.aget(key)
+    if payload is not None:
+        return payload
+
+    async def compute_and_store():
+        with use_primary():
+            result = await compute()
+        await cache.aset(key, result, timeout=settings.PRICING_QUOTE_CACHE_TTL)
+        return result
+
+    return await quote_flight.do(key, compute_and_store)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one. Uses thread-safe
+    futures so callers on different event loops (e.g. WSGI threads each
+    running their own loop) can still share a result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, Future] = {}
+
+    async def do(self, key: str, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+quote_flight = SingleFlight()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import json
+from datetime import date as date_type
+
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.utils.functional import cached_property
+
+# Above this many rows the admin shows an estimate instead of an exact count
+COUNT_CAP = 10_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs a full ``COUNT(*)``. On PostgreSQL it uses the
+    planner's row estimate (``pg_class.reltuples`` when unfiltered, the
+    ``EXPLAIN`` estimate otherwise) and only counts exactly when that is
+    small; elsewhere it counts at most ``COUNT_CAP`` rows.
+    """
+
+    @cached_property
+    def count(self) -> int:
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == "postgresql":
+            estimate = self._postgres_estimate(queryset, connection)
+            if estimate is not None and estimate > COUNT_CAP:
+                return estimate
+            return queryset.count()
+        return queryset.order_by()[:COUNT_CAP].count()
+
+    @staticmethod
+    def _postgres_estimate(queryset, connection) -> int | None:
+        if not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            # -1 until the table is first analyzed
+            if row and row[0] >= 0:
+                return row[0]
+        plan = json.loads(queryset.order_by().explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class DateRangeQuerySet(models.QuerySet):
+    """
+    Queryset for admin changelists with a ``date_hierarchy``. ``dates()``
+    finds the years or months that have rows by seeking the index on the
+    field once per period (the first value from each period's start on)
+    instead of a ``DISTINCT`` over every matching row. Days are only listed
+    within one month, which is a narrow index range already.
+    """
+
+    def dates(self, field_name, kind, order="ASC"):
+        if kind not in ("year", "month"):
+            return super().dates(field_name, kind, order)
+        values = self.values_list(field_name, flat=True).order_by(field_name)
+        periods = []
+        value = values.first()
+        while value is not None:
+            if kind == "year":
+                period = date_type(value.year, 1, 1)
+                following = date_type(value.year + 1, 1, 1)
+            else:
+                period = date_type(value.year, value.month, 1)
+                following = date_type(value.year + value.month // 12, value.month % 12 + 1, 1)
+            periods.append(period)
+            value = values.filter(**{f"{field_name}__gte": following}).first()
+        return periods[::-1] if order == "DESC" else periods
+
+
+def with_date_range_dates(queryset: models.QuerySet) -> DateRangeQuerySet:
+    return DateRangeQuerySet(model=queryset.model, query=queryset.query.chain(), using=queryset._db, hints=queryset._hints)
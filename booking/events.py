@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max
+
+from .archive import archive_cutoff
+from .models import Booking, BookingEvent, BookingEventSequence, WaitlistEntry
+
+# Largest page ``read_events`` returns
+MAX_PAGE = 5000
+
+# Events numbered per transaction by ``sequence_events``
+SEQUENCE_BATCH = 1000
+
+RESCHEDULE_FIELDS = ("date", "start_time", "end_time", "court_id", "coach_id")
+
+
+def append_events(events: list[BookingEvent], using: str) -> list[BookingEvent]:
+    """
+    Insert ``events`` in the caller's transaction, without a sequence
+    number, and number them once it commits. Writers never wait for each
+    other here; only the short numbering step is serialized.
+    """
+    if not events:
+        return events
+    BookingEvent.objects.using(using).bulk_create(events, batch_size=1000)
+    transaction.on_commit(lambda: sequence_events(using), using=using, robust=True)
+    return events
+
+
+def sequence_events(using: str) -> int:
+    """
+    Number every committed event that has no sequence yet, in insertion
+    order. Each batch runs in its own transaction holding the counter row,
+    and only sees events whose writers have committed, so a number is only
+    handed out once its event is visible and every lower number was handed
+    out, and committed, before it. Readers can never skip one. Events whose
+    writer crashed before numbering them are picked up by the next run.
+    Returns how many events were numbered.
+    """
+    numbered = 0
+    while True:
+        with transaction.atomic(using=using):
+            counter, _ = BookingEventSequence.objects.using(using).select_for_update().get_or_create(pk=1)
+            pending = list(
+                BookingEvent.objects.using(using)
+                .filter(sequence=None)
+                .order_by("id")
+                .values_list("id", flat=True)[:SEQUENCE_BATCH]
+            )
+            if not pending:
+                return numbered
+            BookingEvent.objects.using(using).bulk_update(
+                [BookingEvent(id=event_id, sequence=counter.last + offset) for offset, event_id in enumerate(pending, 1)],
+                ["sequence"],
+            )
+            counter.last += len(pending)
+            counter.save(update_fields=["last"])
+        numbered += len(pending)
+        if len(pending) < SEQUENCE_BATCH:
+            return numbered
+
+
+def _price(value) -> str:
+    # Fresh bookings carry the float the pricing code returned, stored ones a Decimal
+    return f"{Decimal(str(value)):.2f}"
+
+
+def _booking_data(booking: Booking) -> dict:
+    return {
+        "date": booking.date.isoformat(),
+        "start": booking.start_time.strftime("%H:%M"),
+        "end": booking.end_time.strftime("%H:%M"),
+        "court": booking.court_id,
+        "coach": booking.coach_id,
+        "user": booking.user_id,
+        "status": booking.status,
+        "total_price": _price(booking.total_price),
+    }
+
+
+def _event(kind: str, booking: Booking, **data) -> BookingEvent:
+    return BookingEvent(
+        kind=kind,
+        venue_id=booking.venue_id,
+        booking_id=booking.pk,
+        date=booking.date,
+        data={**_booking_data(booking), **data},
+    )
+
+
+def booking_events(booking: Booking, created: bool) -> list[BookingEvent]:
+    """What a save of ``booking`` changed, compared with its values as loaded."""
+    if created:
+        return [_event(BookingEvent.CREATED, booking), _event(BookingEvent.PRICED, booking)]
+    loaded = getattr(booking, "_loaded", None)
+    if loaded is None:
+        return []
+    events = []
+    if any(loaded[field] != getattr(booking, field) for field in RESCHEDULE_FIELDS):
+        previous = {
+            "date": loaded["date"].isoformat(),
+            "start": loaded["start_time"].strftime("%H:%M"),
+            "end": loaded["end_time"].strftime("%H:%M"),
+            "court": loaded["court_id"],
+            "coach": loaded["coach_id"],
+        }
+        events.append(_event(BookingEvent.RESCHEDULED, booking, previous=previous))
+    if loaded["status"] != booking.status:
+        kind = BookingEvent.CANCELLED if booking.status == Booking.CANCELLED else BookingEvent.CONFIRMED
+        if booking.status in (Booking.CANCELLED, Booking.CONFIRMED):
+            events.append(_event(kind, booking, previous_status=loaded["status"]))
+    if loaded["total_price"] is not None and _price(loaded["total_price"]) != _price(booking.total_price):
+        events.append(_event(BookingEvent.PRICED, booking, previous_price=_price(loaded["total_price"])))
+    return events
+
+
+def record_booking_saved(booking: Booking, created: bool, using: str) -> None:
+    append_events(booking_events(booking, created), using)
+
+
+def record_booking_deleted(booking: Booking, using: str) -> None:
+    # Archiving deletes bookings dated before the cutoff; that moves them, it doesn't undo them
+    if booking.date >= archive_cutoff():
+        append_events([_event(BookingEvent.DELETED, booking)], using)
+
+
+def record_waitlisted(entry: WaitlistEntry, using: str) -> None:
+    append_events(
+        [
+            BookingEvent(
+                kind=BookingEvent.WAITLISTED,
+                venue_id=entry.court.venue_id,
+                waitlist_entry_id=entry.pk,
+                date=entry.date,
+                data={
+                    "date": entry.date.isoformat(),
+                    "start": entry.start_time.strftime("%H:%M"),
+                    "end": entry.end_time.strftime("%H:%M"),
+                    "court": entry.court_id,
+                    "customer_name": entry.customer_name,
+                },
+            )
+        ],
+        using,
+    )
+
+
+def imported_events(bookings) -> list[BookingEvent]:
+    """Events for bookings inserted in bulk, which the signal handlers never see."""
+    return [event for booking in bookings for event in booking_events(booking, created=True)]
+
+
+def latest_sequence() -> int:
+    return BookingEvent.objects.aggregate(last=Max("sequence"))["last"] or 0
+
+
+def read_events(after: int = 0, limit: int = 1000, *, venue=None, kinds=None) -> list[BookingEvent]:
+    """
+    Up to ``limit`` (at most ``MAX_PAGE``) events with a sequence above
+    ``after``, oldest first. Pass the last returned event's sequence as
+    ``after`` to continue; a short page means the consumer has caught up.
+    Filtering by ``venue`` or ``kinds`` skips events but not sequence
+    numbers, so cursors stay valid. Events are numbered after their writer
+    commits (see ``sequence_events``), so once a number is visible every
+    lower one is too.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    events = BookingEvent.objects.filter(sequence__gt=after)
+    if venue is not None:
+        events = events.filter(venue=venue)
+    if kinds:
+        events = events.filter(kind__in=kinds)
+    return list(events.order_by("sequence")[: min(limit, MAX_PAGE)])
+
+
+def serialize_event(event: BookingEvent) -> dict:
+    return {
+        "sequence": event.sequence,
+        "recorded_at": event.recorded_at.isoformat(),
+        "kind": event.kind,
+        "venue": event.venue_id,
+        "booking": event.booking_id,
+        "waitlist_entry": event.waitlist_entry_id,
+        "date": event.date.isoformat(),
+        "data": event.data,
+    }
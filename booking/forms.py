@@ -1,24 +1,78 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 
-from .models import Coach, Court, Equipment
+from .models import Coach, Court, Equipment, Venue
 
 
 class AvailabilitySearchForm(forms.Form):
     date = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}))
 
 
+class UtilizationReportForm(forms.Form):
+    venue = forms.ModelChoiceField(queryset=Venue.objects.order_by("name"), empty_label=None)
+    date_from = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}))
+    date_to = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}))
+
+    def __init__(self, *args, max_days, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_days = max_days
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get("date_from"), cleaned_data.get("date_to")
+        if date_from and date_to:
+            if date_to < date_from:
+                raise forms.ValidationError("The end date is before the start date.")
+            if (date_to - date_from).days >= self.max_days:
+                raise forms.ValidationError(f"Reports cover at most {self.max_days} days.")
+        return cleaned_data
+
+
+class PricingBacktestForm(UtilizationReportForm):
+    """Report range plus one percentage per rule of the venue; blank leaves the rule out."""
+
+    def __init__(self, *args, rules=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rules = list(rules)
+        for rule in self.rules:
+            self.fields[f"rule_{rule.id}"] = forms.DecimalField(
+                label=rule.name,
+                max_digits=5,
+                decimal_places=2,
+                required=False,
+                initial=rule.percentage_adjustment if rule.is_active else None,
+                help_text=rule.get_rule_type_display(),
+            )
+
+    def range_fields(self):
+        return [self[name] for name in UtilizationReportForm.base_fields]
+
+    def rule_fields(self):
+        return [self[f"rule_{rule.id}"] for rule in self.rules]
+
+    def adjustments(self) -> dict:
+        return {rule.id: self.cleaned_data[f"rule_{rule.id}"] for rule in self.rules}
+
+
 class BookingForm(forms.Form):
     customer_name = forms.CharField(max_length=100)
     date = forms.DateField(widget=forms.DateInput(attrs={"type": "date"}))
     start_time = forms.TimeField(widget=forms.TimeInput(attrs={"type": "time"}))
     end_time = forms.TimeField(widget=forms.TimeInput(attrs={"type": "time"}))
-    court = forms.ModelChoiceField(queryset=Court.objects.filter(is_active=True))
-    coach = forms.ModelChoiceField(queryset=Coach.objects.filter(is_active=True), required=False)
+    court = forms.ModelChoiceField(queryset=Court.objects.none())
+    coach = forms.ModelChoiceField(queryset=Coach.objects.none(), required=False)
+    venue = forms.CharField(required=False, widget=forms.HiddenInput)
+    # Generated per form render; a resubmission with the same key replays the first outcome
+    idempotency_key = forms.CharField(max_length=64, required=False, widget=forms.HiddenInput)
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, venue=None, **kwargs):
         super().__init__(*args, **kwargs)
-        for equipment in Equipment.objects.filter(is_active=True):
+        # Only the selected venue's courts, coaches and equipment can be booked
+        self.fields["court"].queryset = Court.objects.filter(venue=venue, is_active=True)
+        self.fields["coach"].queryset = Coach.objects.filter(venue=venue, is_active=True)
+        if venue is not None:
+            self.fields["venue"].initial = venue.slug
+        for equipment in Equipment.objects.filter(venue=venue, is_active=True):
             self.fields[f"equipment_{equipment.id}"] = forms.IntegerField(
                 label=f"{equipment.name} quantity",
                 min_value=0,
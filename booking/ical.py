@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+from datetime import date as date_type
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.signing import Signer
+from django.db import router, transaction
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Booking, CalendarEvent, CalendarFeed, Coach, Court, new_feed_secret
+
+FEED_SCOPES = {
+    CalendarFeed.COURT: Court,
+    CalendarFeed.COACH: Coach,
+    CalendarFeed.USER: get_user_model(),
+}
+
+STATUSES = {
+    Booking.CONFIRMED: "CONFIRMED",
+    Booking.PENDING: "TENTATIVE",
+    Booking.CANCELLED: "CANCELLED",
+}
+
+_signer = Signer(salt="booking.calendar")
+
+
+def feed_token(scope: str, object_id: int, secret: str) -> str:
+    """Secret part of a feed URL; calendar apps can't sign in, so the link itself is the credential."""
+    return _signer.signature(f"{scope}:{object_id}:{secret}")
+
+
+def feed_secret(scope: str, object_id: int) -> str:
+    feed, _ = CalendarFeed.objects.get_or_create(
+        scope=scope, object_id=object_id, defaults={"modified": timezone.now()}
+    )
+    return feed.secret
+
+
+def rotate_feed_secret(scope: str, object_id: int) -> str:
+    """Give a feed a new secret, so links handed out before stop working. Returns the new secret."""
+    secret = new_feed_secret()
+    CalendarFeed.objects.update_or_create(
+        scope=scope,
+        object_id=object_id,
+        defaults={"secret": secret},
+        create_defaults={"secret": secret, "modified": timezone.now()},
+    )
+    return secret
+
+
+def feed_url(scope: str, object_id: int, secret: str | None = None) -> str:
+    """Path of a feed; pass ``secret`` when it is already at hand to skip the lookup."""
+    token = feed_token(scope, object_id, secret or feed_secret(scope, object_id))
+    return reverse("booking:calendar_feed", kwargs={"scope": scope, "object_id": object_id, "token": token})
+
+
+def window_start() -> date_type:
+    """Feeds carry bookings from this date on; older ones stay in whatever the client already has."""
+    return timezone.localdate() - timedelta(days=settings.CALENDAR_FEED_PAST_DAYS)
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold(line: str) -> str:
+    """Split a content line into 75-octet pieces as RFC 5545 requires."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    pieces = []
+    while encoded:
+        limit = 75 if not pieces else 74
+        cut = min(limit, len(encoded))
+        # Never split a UTF-8 sequence
+        while cut < len(encoded) and encoded[cut] & 0xC0 == 0x80:
+            cut -= 1
+        pieces.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+    return "\r\n ".join(pieces) + "\r\n"
+
+
+def _utc(value: datetime) -> str:
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _local(date: date_type, value) -> str:
+    return _utc(timezone.make_aware(datetime.combine(date, value)))
+
+
+def serialize_event(booking: Booking, sequence: int, stamp: datetime) -> str:
+    """``booking`` as a VEVENT; its court and coach should be loaded with it."""
+    title = f"Badminton: {booking.court.name}"
+    if booking.coach_id:
+        title += f" with {booking.coach.name}"
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:booking-{booking.pk}@{settings.CALENDAR_UID_DOMAIN}",
+        f"DTSTAMP:{_utc(stamp)}",
+        f"LAST-MODIFIED:{_utc(stamp)}",
+        f"SEQUENCE:{sequence}",
+        f"DTSTART:{_local(booking.date, booking.start_time)}",
+        f"DTEND:{_local(booking.date, booking.end_time)}",
+        f"SUMMARY:{_escape(title)}",
+        f"LOCATION:{_escape(booking.court.name)}",
+        f"DESCRIPTION:{_escape(f'Booking #{booking.pk} for {booking.customer_name}')}",
+        f"STATUS:{STATUSES.get(booking.status, 'CONFIRMED')}",
+        "END:VEVENT",
+    ]
+    return "".join(_fold(line) for line in lines)
+
+
+def _feeds(court_id, coach_id, user_id) -> set[tuple[str, int]]:
+    ids = {CalendarFeed.COURT: court_id, CalendarFeed.COACH: coach_id, CalendarFeed.USER: user_id}
+    return {(scope, object_id) for scope, object_id in ids.items() if object_id}
+
+
+def bump_feeds(feeds, using: str) -> None:
+    """
+    Give each ``(scope, object_id)`` feed a new version, creating it if
+    needed, once the caller's transaction commits. The version rows are
+    shared by every booking of a court, coach or user, so they are not
+    locked for the length of a booking; and bumping only after the events
+    are visible means a reader can't cache the old events under the new
+    version. A bump lost to a crash in between waits for the feed's next
+    change or ``rebuild_calendars``.
+    """
+    if not feeds:
+        return
+    feeds = set(feeds)
+    transaction.on_commit(lambda: _bump_feeds(feeds, using), using=using, robust=True)
+
+
+def _bump_feeds(feeds, using: str) -> None:
+    now = timezone.now()
+    CalendarFeed.objects.using(using).bulk_create(
+        [CalendarFeed(scope=scope, object_id=object_id, modified=now) for scope, object_id in feeds],
+        ignore_conflicts=True,
+    )
+    match = Q()
+    for scope, object_id in feeds:
+        match |= Q(scope=scope, object_id=object_id)
+    # Versions only go up, so readers never see an older ETag again
+    CalendarFeed.objects.using(using).filter(match).update(version=F("version") + 1, modified=now)
+
+
+def store_events(bookings, using: str) -> set[tuple[str, int]]:
+    """
+    Serialize ``bookings`` (with court and coach loaded) into the event
+    store, revising any stored versions. Returns the feeds they appear in.
+    """
+    bookings = list(bookings)
+    if not bookings:
+        return set()
+    sequences = dict(
+        CalendarEvent.objects.using(using)
+        .filter(booking_id__in=[booking.pk for booking in bookings])
+        .values_list("booking_id", "sequence")
+    )
+    now = timezone.now()
+    events = []
+    feeds = set()
+    for booking in bookings:
+        sequence = sequences[booking.pk] + 1 if booking.pk in sequences else 0
+        events.append(
+            CalendarEvent(
+                booking_id=booking.pk,
+                court_id=booking.court_id,
+                coach_id=booking.coach_id,
+                user_id=booking.user_id,
+                date=booking.date,
+                sequence=sequence,
+                vevent=serialize_event(booking, sequence, now),
+            )
+        )
+        feeds |= _feeds(booking.court_id, booking.coach_id, booking.user_id)
+    CalendarEvent.objects.using(using).bulk_create(
+        events,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["booking"],
+        update_fields=["court", "coach", "user", "date", "sequence", "vevent"],
+    )
+    return feeds
+
+
+def sync_booking_event(booking: Booking, deleted: bool, using: str) -> None:
+    """
+    Bring the event store up to date with a saved or deleted booking, in
+    the caller's transaction, and bump its feeds once that commits.
+    Bookings outside the feed window, such as those being archived, cost
+    nothing.
+    """
+    loaded = getattr(booking, "_loaded", None) or {}
+    start = window_start()
+    previous_in_window = loaded.get("date") is not None and loaded["date"] >= start
+    if booking.date < start and not previous_in_window:
+        return
+    feeds = _feeds(booking.court_id, booking.coach_id, booking.user_id)
+    if previous_in_window:
+        # Moving a booking takes it out of the old court's, coach's or user's feed
+        feeds |= _feeds(loaded["court_id"], loaded["coach_id"], loaded["user_id"])
+    if not deleted:
+        if booking.date >= start:
+            feeds |= store_events([booking], using)
+        else:
+            CalendarEvent.objects.using(using).filter(booking_id=booking.pk).delete()
+    bump_feeds(feeds, using)
+
+
+def bump_feeds_showing(booking_ids, using: str) -> None:
+    """
+    Bump every feed whose window shows an event of ``booking_ids``, for
+    bookings about to be deleted without the signal handlers. The events
+    themselves go with the bookings.
+    """
+    events = CalendarEvent.objects.using(using).filter(booking_id__in=booking_ids, date__gte=window_start())
+    feeds = set()
+    for court_id, coach_id, user_id in events.values_list("court_id", "coach_id", "user_id"):
+        feeds |= _feeds(court_id, coach_id, user_id)
+    bump_feeds(feeds, using)
+
+
+def refresh_events(bookings, using: str | None = None) -> int:
+    """
+    Re-serialize ``bookings`` (a queryset) that fall in the feed window, for
+    writes that bypass the signal handlers or change a court or coach name.
+    Returns the number of events written.
+    """
+    using = using or router.db_for_write(CalendarEvent)
+    rows = bookings.using(using).filter(date__gte=window_start()).select_related("court", "coach")
+    written = 0
+    feeds = set()
+    with transaction.atomic(using=using):
+        chunk = []
+        for booking in rows.iterator(chunk_size=1000):
+            chunk.append(booking)
+            if len(chunk) == 1000:
+                feeds |= store_events(chunk, using)
+                written += len(chunk)
+                chunk = []
+        feeds |= store_events(chunk, using)
+        written += len(chunk)
+        bump_feeds(feeds, using)
+    return written
+
+
+def feed_state(scope: str, object_id: int) -> tuple[int, datetime | None, str | None]:
+    """``(version, modified, secret)`` of a feed; no secret for one whose link was never issued."""
+    row = (
+        CalendarFeed.objects.filter(scope=scope, object_id=object_id)
+        .values_list("version", "modified", "secret")
+        .first()
+    )
+    return row or (0, None, None)
+
+
+def feed_etag(scope: str, object_id: int, version: int) -> str:
+    return f'"{scope}-{object_id}-{version}"'
+
+
+def render_feed(scope: str, object_id: int, version: int) -> str:
+    """
+    The feed's VCALENDAR, joined from the stored events and cached per
+    version, so polls between changes never touch the event table.
+    """
+    key = f"calendar:{router.db_for_read(CalendarEvent) or 'default'}:{scope}:{object_id}:{version}"
+    body = cache.get(key)
+    if body is not None:
+        return body
+    owner = FEED_SCOPES[scope].objects.filter(pk=object_id).first()
+    events = (
+        CalendarEvent.objects.filter(**{f"{scope}_id": object_id}, date__gte=window_start())
+        .order_by("date", "booking_id")
+        .values_list("vevent", flat=True)
+    )
+    header = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Badminton Booking//Calendar//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(str(owner) if owner else 'Bookings')}",
+        f"REFRESH-INTERVAL;VALUE=DURATION:PT{settings.CALENDAR_FEED_MAX_AGE // 60 or 1}M",
+    ]
+    body = "".join(_fold(line) for line in header) + "".join(events) + "END:VCALENDAR\r\n"
+    cache.set(key, body, timeout=settings.CALENDAR_FEED_CACHE_TTL)
+    return body
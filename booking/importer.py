@@ -0,0 +1,446 @@
+from __future__ import annotations
+
+import csv
+import json
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import date as date_type, time as time_type
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone
+
+from .cache import bump_availability_version, bump_pricing_version
+from .events import append_events, imported_events
+from .ical import refresh_events
+from .models import (
+    Booking,
+    Coach,
+    CoachAvailability,
+    Court,
+    PricingRule,
+    calculate_base_price,
+    has_demand_rules,
+    hourly_occupancy,
+    rebuild_slot_occupancy,
+    rule_applies,
+)
+
+
+def read_rows(stream, fmt: str):
+    """
+    Yield ``(line_number, row)`` from a CSV (with a header line) or NDJSON
+    stream one row at a time. A row that can't be decoded is yielded as a
+    ``ValueError`` so the caller can report it and carry on.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_number, ValueError(f"invalid JSON: {exc.msg}")
+            continue
+        if not isinstance(row, dict):
+            row = ValueError("expected a JSON object")
+        yield line_number, row
+
+
+def _field(row: dict, name: str, required: bool = True) -> str:
+    value = row.get(name)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise ValueError(f"{name} is required")
+    return value
+
+
+def _date(row: dict, name: str):
+    try:
+        return date_type.fromisoformat(_field(row, name))
+    except ValueError:
+        raise ValueError(f"{name} must be YYYY-MM-DD") from None
+
+
+def _time(row: dict, name: str, required: bool = True):
+    value = _field(row, name, required)
+    if not value:
+        return None
+    try:
+        return time_type.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be HH:MM") from None
+
+
+def _decimal(row: dict, name: str, required: bool = True) -> Decimal | None:
+    value = _field(row, name, required)
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"{name} must be a number") from None
+
+
+def _percentage(row: dict, name: str, required: bool = True) -> int | None:
+    value = _field(row, name, required)
+    if not value:
+        return None
+    if not value.isdigit() or int(value) > 100:
+        raise ValueError(f"{name} must be a whole number from 0 to 100")
+    return int(value)
+
+
+def _time_range(row: dict):
+    start, end = _time(row, "start_time"), _time(row, "end_time")
+    if end <= start:
+        raise ValueError("end_time must be after start_time")
+    return start, end
+
+
+class _ByName:
+    """Venue-scoped lookup of courts or coaches by the names used in spreadsheets."""
+
+    def __init__(self, objects, label: str):
+        self.label = label
+        self._by_name = defaultdict(list)
+        self.names = {}
+        for obj in objects:
+            self._by_name[obj.name.casefold()].append(obj)
+            self.names[obj.id] = obj.name
+
+    def get(self, name: str):
+        matches = self._by_name.get(name.casefold(), [])
+        if not matches:
+            raise ValueError(f"unknown {self.label} {name!r}")
+        if len(matches) > 1:
+            raise ValueError(f"{self.label} name {name!r} is ambiguous")
+        return matches[0]
+
+
+class OccupancySnapshot:
+    """
+    Booked time ranges per date and resource, bulk-loaded for the dates a
+    chunk touches and updated as rows are accepted. Only the most recently
+    used ``max_dates`` dates are kept, so memory stays bounded however large
+    the input is. An evicted date is reloaded from the database, which has
+    the rows committed since; in a dry run nothing was committed, so rows
+    are only checked against input rows for dates still held.
+    """
+
+    def __init__(self, load, max_dates: int = 400):
+        # ``load(dates)`` yields (resource, date, start, end) for those dates
+        self._load = load
+        self.max_dates = max_dates
+        self._days: OrderedDict = OrderedDict()
+
+    def prepare(self, dates) -> None:
+        dates = set(dates)
+        missing = [date for date in dates if date not in self._days]
+        for date in missing:
+            self._days[date] = defaultdict(list)
+        if missing:
+            for resource, date, start, end in self._load(missing):
+                self._days[date][resource].append((start, end))
+        for date in dates:
+            self._days.move_to_end(date)
+        # Never evict a date the current chunk needs
+        while len(self._days) > max(self.max_dates, len(dates)):
+            self._days.popitem(last=False)
+
+    def overlaps(self, date, resource, start, end) -> bool:
+        return any(taken_start < end and taken_end > start for taken_start, taken_end in self._days[date][resource])
+
+    def add(self, date, resource, start, end) -> None:
+        self._days[date][resource].append((start, end))
+
+
+class Importer:
+    """One kind of import: parses rows into unsaved model instances and checks them for conflicts."""
+
+    model = None
+
+    def __init__(self, venue):
+        self.venue = venue
+
+    def parse(self, row: dict):
+        raise NotImplementedError
+
+    def prepare(self, objs) -> None:
+        """Bulk-load whatever ``conflict`` needs for this chunk."""
+
+    def conflict(self, obj) -> str | None:
+        return None
+
+    def accept(self, obj) -> None:
+        """Record an accepted row so later rows in the input see it."""
+
+    def inserted(self, objs, using: str) -> None:
+        """Runs inside a batch's transaction, after its rows are inserted."""
+
+    def committed(self, objs) -> None:
+        """Runs after a batch commits."""
+
+
+STATUSES = {value for value, _ in Booking.STATUS_CHOICES}
+
+
+class BookingImporter(Importer):
+    model = Booking
+
+    def __init__(self, venue):
+        super().__init__(venue)
+        self.courts = _ByName(Court.objects.filter(venue=venue), "court")
+        self.coaches = _ByName(Coach.objects.filter(venue=venue), "coach")
+        self.rules = list(PricingRule.objects.filter(venue=venue, is_active=True))
+        self.occupancy = OccupancySnapshot(self._load_occupancy)
+        # Demand rules price against the occupancy stored before the import
+        self.demand = OrderedDict() if has_demand_rules(self.rules) else None
+
+    def _load_occupancy(self, dates):
+        rows = Booking.objects.filter(venue=self.venue, date__in=dates, status=Booking.CONFIRMED).values_list(
+            "court_id", "coach_id", "date", "start_time", "end_time"
+        )
+        for court_id, coach_id, date, start, end in rows.iterator(chunk_size=5000):
+            yield ("court", court_id), date, start, end
+            if coach_id:
+                yield ("coach", coach_id), date, start, end
+
+    def parse(self, row: dict) -> Booking:
+        customer_name = _field(row, "customer_name")
+        if len(customer_name) > 100:
+            raise ValueError("customer_name is longer than 100 characters")
+        date = _date(row, "date")
+        start, end = _time_range(row)
+        court = self.courts.get(_field(row, "court"))
+        coach_name = _field(row, "coach", required=False)
+        coach = self.coaches.get(coach_name) if coach_name else None
+        status = _field(row, "status", required=False) or Booking.CONFIRMED
+        if status not in STATUSES:
+            raise ValueError(f"unknown status {status!r}")
+        total_price = _decimal(row, "total_price", required=False)
+        if total_price is None:
+            total_price = self._price(date, start, end, court, coach)
+        # Ids rather than instances: assigning related objects dominates the cost of a row
+        return Booking(
+            venue_id=self.venue.id,
+            customer_name=customer_name,
+            date=date,
+            start_time=start,
+            end_time=end,
+            court_id=court.id,
+            coach_id=coach.id if coach else None,
+            status=status,
+            total_price=total_price,
+        )
+
+    def _price(self, date, start, end, court, coach) -> Decimal:
+        # Same result as apply_pricing_rules, without a rules query per row
+        duration_hours = (end.hour + end.minute / 60) - (start.hour + start.minute / 60)
+        price = calculate_base_price(court, coach, duration_hours)
+        occupancy = self._demand_occupancy(date) if self.demand is not None else None
+        for rule in self.rules:
+            if rule_applies(rule, date, start, end, court, occupancy):
+                price *= 1 + float(rule.percentage_adjustment) / 100.0
+        return Decimal(str(round(price, 2)))
+
+    def _demand_occupancy(self, date) -> dict[int, float]:
+        if date not in self.demand:
+            self.demand[date] = hourly_occupancy(self.venue.id, date)
+            if len(self.demand) > self.occupancy.max_dates:
+                self.demand.popitem(last=False)
+        return self.demand[date]
+
+    def prepare(self, objs) -> None:
+        self.occupancy.prepare(obj.date for obj in objs)
+
+    def conflict(self, obj: Booking) -> str | None:
+        if obj.status != Booking.CONFIRMED:
+            return None
+        if self.occupancy.overlaps(obj.date, ("court", obj.court_id), obj.start_time, obj.end_time):
+            return f"{self.courts.names[obj.court_id]} is already booked"
+        if obj.coach_id and self.occupancy.overlaps(obj.date, ("coach", obj.coach_id), obj.start_time, obj.end_time):
+            return f"{self.coaches.names[obj.coach_id]} is already booked"
+        return None
+
+    def accept(self, obj: Booking) -> None:
+        if obj.status == Booking.CONFIRMED:
+            self.occupancy.add(obj.date, ("court", obj.court_id), obj.start_time, obj.end_time)
+            if obj.coach_id:
+                self.occupancy.add(obj.date, ("coach", obj.coach_id), obj.start_time, obj.end_time)
+
+    def inserted(self, objs, using: str) -> None:
+        # bulk_create skips the signal handler that logs new bookings
+        append_events(imported_events(objs), using)
+
+    def committed(self, objs) -> None:
+        # bulk_create skips the signals that normally retire cached grids and quotes
+        # and keep the occupancy counters and calendar feeds current
+        dates = {obj.date for obj in objs}
+        rebuild_slot_occupancy(self.venue.id, [date for date in dates if date >= timezone.localdate()])
+        refresh_events(Booking.objects.filter(pk__in=[obj.pk for obj in objs]))
+        for date in dates:
+            bump_availability_version(self.venue.id, date)
+
+
+class CoachAvailabilityImporter(Importer):
+    model = CoachAvailability
+
+    def __init__(self, venue):
+        super().__init__(venue)
+        self.coaches = _ByName(Coach.objects.filter(venue=venue), "coach")
+        self.windows = OccupancySnapshot(self._load_windows)
+
+    def _load_windows(self, dates):
+        rows = CoachAvailability.objects.filter(coach__venue=self.venue, date__in=dates).values_list(
+            "coach_id", "date", "start_time", "end_time"
+        )
+        for coach_id, date, start, end in rows.iterator(chunk_size=5000):
+            yield coach_id, date, start, end
+
+    def parse(self, row: dict) -> CoachAvailability:
+        date = _date(row, "date")
+        start, end = _time_range(row)
+        coach = self.coaches.get(_field(row, "coach"))
+        return CoachAvailability(coach_id=coach.id, date=date, start_time=start, end_time=end)
+
+    def prepare(self, objs) -> None:
+        self.windows.prepare(obj.date for obj in objs)
+
+    def conflict(self, obj: CoachAvailability) -> str | None:
+        if self.windows.overlaps(obj.date, obj.coach_id, obj.start_time, obj.end_time):
+            return f"{self.coaches.names[obj.coach_id]} already has an overlapping window"
+        return None
+
+    def accept(self, obj: CoachAvailability) -> None:
+        self.windows.add(obj.date, obj.coach_id, obj.start_time, obj.end_time)
+
+
+class PricingRuleImporter(Importer):
+    model = PricingRule
+
+    def __init__(self, venue):
+        super().__init__(venue)
+        self.names = {name.casefold() for name in PricingRule.objects.filter(venue=venue).values_list("name", flat=True)}
+
+    def parse(self, row: dict) -> PricingRule:
+        rule_type = _field(row, "rule_type")
+        if rule_type not in dict(PricingRule.RULE_TYPE_CHOICES):
+            raise ValueError(f"unknown rule_type {rule_type!r}")
+        peak_start, peak_end = _time(row, "peak_start", required=False), _time(row, "peak_end", required=False)
+        if rule_type == PricingRule.PEAK_HOUR and not (peak_start and peak_end):
+            raise ValueError("peak_hour rules need peak_start and peak_end")
+        occupancy_threshold = _percentage(row, "occupancy_threshold", required=rule_type == PricingRule.DEMAND)
+        is_active = _field(row, "is_active", required=False).lower()
+        return PricingRule(
+            venue_id=self.venue.id,
+            name=_field(row, "name"),
+            rule_type=rule_type,
+            percentage_adjustment=_decimal(row, "percentage_adjustment"),
+            peak_start=peak_start,
+            peak_end=peak_end,
+            occupancy_threshold=occupancy_threshold,
+            is_active=is_active not in ("0", "false", "no"),
+        )
+
+    def conflict(self, obj: PricingRule) -> str | None:
+        if obj.name.casefold() in self.names:
+            return f"a rule named {obj.name!r} already exists"
+        return None
+
+    def accept(self, obj: PricingRule) -> None:
+        self.names.add(obj.name.casefold())
+
+    def committed(self, objs) -> None:
+        bump_pricing_version(self.venue.id)
+
+
+IMPORTERS = {
+    "bookings": BookingImporter,
+    "coach_availability": CoachAvailabilityImporter,
+    "pricing_rules": PricingRuleImporter,
+}
+
+INVALID = "invalid"
+CONFLICT = "conflict"
+
+
+@dataclass
+class ImportResult:
+    read: int = 0
+    imported: int = 0
+    invalid: int = 0
+    conflicts: int = 0
+
+
+def run_import(importer: Importer, rows, *, batch_size: int, dry_run: bool, report) -> ImportResult:
+    """
+    Validate and insert ``rows`` (as yielded by ``read_rows``) in chunks of
+    ``batch_size``, each chunk in its own transaction. Rejected rows are
+    passed to ``report(line, problem, reason, row)`` and skipped. With
+    ``dry_run`` nothing is written, but rows are still checked against each
+    other as well as the database.
+    """
+    result = ImportResult()
+    rows = iter(rows)
+    using = router.db_for_write(importer.model)
+    while chunk := list(islice(rows, batch_size)):
+        result.read += len(chunk)
+        parsed = []
+        for line, row in chunk:
+            try:
+                if isinstance(row, ValueError):
+                    raise row
+                parsed.append((line, row, importer.parse(row)))
+            except ValueError as exc:
+                result.invalid += 1
+                report(line, INVALID, str(exc), row)
+
+        importer.prepare(obj for _, _, obj in parsed)
+        accepted = []
+        for line, row, obj in parsed:
+            reason = importer.conflict(obj)
+            if reason:
+                result.conflicts += 1
+                report(line, CONFLICT, reason, row)
+            else:
+                importer.accept(obj)
+                accepted.append((line, row, obj))
+
+        if dry_run or not accepted:
+            result.imported += len(accepted)
+            continue
+        with transaction.atomic(using=using):
+            inserted = _insert(importer.model, accepted, using, report)
+            importer.inserted(inserted, using)
+            transaction.on_commit(lambda inserted=inserted: importer.committed(inserted), using=using)
+        result.imported += len(inserted)
+        result.conflicts += len(accepted) - len(inserted)
+    return result
+
+
+def _insert(model, accepted, using: str, report) -> list:
+    objs = [obj for _, _, obj in accepted]
+    try:
+        with transaction.atomic(using=using):
+            model.objects.using(using).bulk_create(objs)
+        return objs
+    except IntegrityError:
+        pass
+    # Something the snapshot didn't know about (a booking made meanwhile, a
+    # database constraint) rejected the batch; find it row by row
+    inserted = []
+    for line, row, obj in accepted:
+        try:
+            with transaction.atomic(using=using):
+                model.objects.using(using).bulk_create([obj])
+        except IntegrityError as exc:
+            report(line, CONFLICT, f"rejected by the database: {exc}", row)
+        else:
+            inserted.append(obj)
+    return inserted
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import date as date_type
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+BOOKED = "booked"
+FREED = "freed"
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.LIVE_AVAILABILITY_BROKER)()
+
+
+def check_broker() -> None:
+    """
+    Fail at startup, rather than on the first booking, when the configured
+    broker can't run.
+    """
+    broker_class = import_string(settings.LIVE_AVAILABILITY_BROKER)
+    if issubclass(broker_class, RedisStreamBroker):
+        if not settings.REDIS_URL:
+            raise ImproperlyConfigured("RedisStreamBroker needs REDIS_URL to be set.")
+        try:
+            import redis  # noqa: F401
+        except ImportError as exc:
+            raise ImproperlyConfigured("RedisStreamBroker needs the redis package (pip install redis).") from exc
+
+
+def publish_slot_change(venue_id: int, date, court_id: int, start, end, status: str) -> None:
+    get_broker().publish(
+        date,
+        {
+            "venue": venue_id,
+            "date": date.isoformat(),
+            "court": court_id,
+            "start": start.strftime("%H:%M"),
+            "end": end.strftime("%H:%M"),
+            "status": status,
+        },
+    )
+
+
+class LocalBroker:
+    """
+    In-process broker. Keeps a short per-date backlog so a reconnecting
+    client can resume from its ``Last-Event-ID``. Publishers may run on any
+    thread; subscribers are woken on their own event loop.
+
+    Only reaches clients connected to the same process, so multi-worker
+    deployments should use ``RedisStreamBroker``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Ids are "<epoch>-<seq>" so ids from before a restart are recognised
+        self._epoch = format(time.time_ns(), "x")
+        self._ids = itertools.count(1)
+        self._backlog: dict[date_type, deque] = defaultdict(lambda: deque(maxlen=settings.LIVE_AVAILABILITY_BACKLOG))
+        # Highest sequence number that fell out of each date's backlog
+        self._evicted: dict[date_type, int] = defaultdict(int)
+        self._subscribers: dict[date_type, set] = defaultdict(set)
+
+    def publish(self, date, payload: dict) -> None:
+        with self._lock:
+            seq = next(self._ids)
+            event_id = f"{self._epoch}-{seq}"
+            backlog = self._backlog[date]
+            if len(backlog) == backlog.maxlen:
+                self._evicted[date] = backlog[0][0]
+            backlog.append((seq, event_id, payload))
+            subscribers = list(self._subscribers[date])
+            self._prune_past_dates()
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, (event_id, payload))
+
+    def _prune_past_dates(self) -> None:
+        today = timezone.localdate()
+        for past in [d for d in self._backlog if d < today and not self._subscribers.get(d)]:
+            del self._backlog[past]
+            self._evicted.pop(past, None)
+
+    async def subscribe(self, date, last_event_id: str | None, heartbeat: float):
+        """
+        Yield ``(event_id, payload)`` tuples as they are published, or
+        ``None`` after ``heartbeat`` quiet seconds. A ``(None, None)`` tuple
+        means events were missed and the client should refetch its grid.
+        """
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            # Reading must not create a backlog; only publishing does
+            backlog = list(self._backlog.get(date, ()))
+            evicted = self._evicted.get(date, 0)
+            self._subscribers[date].add(subscriber)
+        try:
+            if last_event_id is not None:
+                epoch, _, seq = last_event_id.partition("-")
+                if epoch != self._epoch or not seq.isdigit() or int(seq) < evicted:
+                    yield None, None
+                    last = 0
+                else:
+                    last = int(seq)
+                for seq, event_id, payload in backlog:
+                    if seq > last:
+                        yield event_id, payload
+            queue = subscriber[1]
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._subscribers[date].discard(subscriber)
+                if not self._subscribers[date]:
+                    del self._subscribers[date]
+
+
+# Stream entry ids are "<milliseconds>-<sequence>"
+STREAM_ID = re.compile(r"\A(\d+)-(\d+)\Z")
+
+
+def _stream_id(value) -> tuple[int, int] | None:
+    match = STREAM_ID.match(value.decode() if isinstance(value, bytes) else value)
+    return (int(match[1]), int(match[2])) if match else None
+
+
+class RedisStreamBroker:
+    """
+    Broker backed by one Redis stream per date, shared by every worker.
+    Stream entry ids double as SSE event ids, so resume is an ``XREAD`` from
+    the client's last id. Works against any server speaking the Redis
+    protocol, including a local redis-server during development.
+    """
+
+    def __init__(self):
+        import redis
+
+        self._redis = redis.Redis.from_url(settings.REDIS_URL)
+
+    @staticmethod
+    def _stream(date) -> str:
+        return f"live:slots:{date.isoformat()}"
+
+    def publish(self, date, payload: dict) -> None:
+        stream = self._stream(date)
+        self._redis.xadd(
+            stream,
+            {"data": json.dumps(payload)},
+            maxlen=settings.LIVE_AVAILABILITY_BACKLOG,
+            approximate=True,
+        )
+        self._redis.expire(stream, 2 * 24 * 3600)
+
+    async def subscribe(self, date, last_event_id: str | None, heartbeat: float):
+        import redis.asyncio
+
+        stream = self._stream(date)
+        cursor = "$"
+        # Async clients are bound to the loop they were created on
+        client = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+        try:
+            if last_event_id is not None:
+                if await self._can_resume(client, stream, last_event_id):
+                    cursor = last_event_id
+                else:
+                    yield None, None
+            while True:
+                result = await client.xread({stream: cursor}, block=int(heartbeat * 1000), count=100)
+                if not result:
+                    yield None
+                    continue
+                for _, entries in result:
+                    for entry_id, fields in entries:
+                        cursor = entry_id
+                        yield entry_id.decode(), json.loads(fields[b"data"])
+        finally:
+            await client.aclose()
+
+    @staticmethod
+    async def _can_resume(client, stream: str, last_event_id: str) -> bool:
+        """
+        Whether every entry after ``last_event_id`` is still in the stream.
+        Malformed ids, expired streams and ids older than the oldest kept
+        entry all mean the client has to refetch its grid.
+        """
+        last = _stream_id(last_event_id)
+        if last is None:
+            return False
+        oldest = await client.xrange(stream, count=1)
+        if not oldest:
+            return False
+        # Conservative: trimming may have dropped only entries the client already had
+        return _stream_id(oldest[0][0]) <= last
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.archive import archive_booking_batch, archive_cutoff, archive_waitlist_batch
+
+
+class Command(BaseCommand):
+    help = "Move bookings and waitlist entries older than the archive horizon into the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--before", help="Archive rows dated before YYYY-MM-DD, no later than the configured horizon"
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches per table")
+
+    def handle(self, *args, **options):
+        cutoff = (
+            datetime.strptime(options["before"], "%Y-%m-%d").date() if options["before"] else archive_cutoff()
+        )
+        if cutoff > archive_cutoff():
+            # Archiving deletes without the booking signal handlers, which only suits rows past the horizon
+            raise CommandError(f"--before can't be later than the archive horizon ({archive_cutoff()})")
+        self.stdout.write(f"Archiving rows dated before {cutoff}")
+        for label, archive_batch in (("bookings", archive_booking_batch), ("waitlist entries", archive_waitlist_batch)):
+            moved = batches = 0
+            while options["max_batches"] is None or batches < options["max_batches"]:
+                count = archive_batch(cutoff, options["batch_size"])
+                if not count:
+                    break
+                moved += count
+                batches += 1
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"  {label}: {moved} moved")
+            self.stdout.write(self.style.SUCCESS(f"Archived {moved} {label}"))
@@ -0,0 +1,123 @@
+import csv
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from booking.backtest import candidate_rules, run_backtest
+from booking.importer import PricingRuleImporter, read_rows
+from booking.models import PricingRule, Venue
+
+
+class Command(BaseCommand):
+    help = "Replay a venue's past confirmed bookings through a candidate pricing rule set and report the revenue change"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--venue", required=True, help="Slug of the venue")
+        parser.add_argument("--from", dest="date_from", help="First date YYYY-MM-DD (default: a year before --to)")
+        parser.add_argument("--to", dest="date_to", help="Last date YYYY-MM-DD (default: yesterday)")
+        parser.add_argument(
+            "--set",
+            action="append",
+            default=[],
+            metavar="NAME=PCT",
+            help="Give the rule with this name a new percentage_adjustment (repeatable; also enables inactive rules)",
+        )
+        parser.add_argument("--drop", action="append", default=[], metavar="NAME", help="Leave this rule out (repeatable)")
+        parser.add_argument(
+            "--rules",
+            help="Backtest the rules in this CSV or NDJSON file, in import_data's pricing_rules format, instead of adjusting the current ones",
+        )
+        parser.add_argument("--csv", help="Write the per-day comparison to this CSV file")
+
+    def handle(self, *args, **options):
+        try:
+            venue = Venue.objects.get(slug=options["venue"])
+        except Venue.DoesNotExist:
+            raise CommandError(f"Unknown venue {options['venue']!r}") from None
+        date_to = self._date(options["date_to"], "--to") or timezone.localdate() - timedelta(days=1)
+        date_from = self._date(options["date_from"], "--from") or date_to - timedelta(days=364)
+        if date_to < date_from:
+            raise CommandError("--to is before --from")
+
+        started = time.monotonic()
+        candidates = self._candidates(venue, options)
+        result = run_backtest(venue, date_from, date_to, candidates)
+        elapsed = time.monotonic() - started
+
+        recorded, current, candidate = result.totals
+        self.stdout.write(f"{len(result.bookings)} confirmed bookings from {date_from} to {date_to} ({elapsed:.2f}s)")
+        self.stdout.write(f"Candidate rules: {', '.join(f'{rule.name} {float(rule.percentage_adjustment):+g}%' for rule in candidates) or 'none'}")
+        self.stdout.write(f"Recorded revenue      {recorded:14,.2f}")
+        self.stdout.write(f"Current rules         {current:14,.2f}")
+        self.stdout.write(f"Candidate rules       {candidate:14,.2f}")
+        change = f"{(candidate - current) / current * 100:+.2f}%" if current else "n/a"
+        self.stdout.write(self.style.SUCCESS(f"Change                {candidate - current:+14,.2f} ({change})"))
+        for title, rows in (
+            ("Court type", result.by_court_type()),
+            ("Weekday", result.by_weekday()),
+            ("Hour", result.by_hour()),
+        ):
+            self.stdout.write("")
+            self.stdout.write(f"{title:<12}{'bookings':>10}{'current':>14}{'candidate':>14}{'change':>14}{'%':>9}")
+            for label, count, before, after, delta, percent in rows:
+                self.stdout.write(f"{label:<12}{count:>10}{before:>14,.2f}{after:>14,.2f}{delta:>+14,.2f}{percent:>+9.2f}")
+
+        if options["csv"]:
+            with open(options["csv"], "w", newline="", encoding="utf-8") as report:
+                writer = csv.writer(report)
+                writer.writerow(["date", "bookings", "current", "candidate", "change", "change_percent"])
+                for label, count, before, after, delta, percent in result.by_day():
+                    writer.writerow([label, count, round(before, 2), round(after, 2), round(delta, 2), round(percent, 2)])
+            self.stdout.write(f"Per-day comparison written to {options['csv']}")
+
+    @staticmethod
+    def _date(value, option):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError(f"{option} must be YYYY-MM-DD") from None
+
+    def _candidates(self, venue, options) -> list:
+        if options["rules"]:
+            importer = PricingRuleImporter(venue)
+            fmt = "ndjson" if options["rules"].endswith((".ndjson", ".jsonl")) else "csv"
+            rules = []
+            with Path(options["rules"]).open(newline="", encoding="utf-8") as stream:
+                for line, row in read_rows(stream, fmt):
+                    try:
+                        if isinstance(row, ValueError):
+                            raise row
+                        rule = importer.parse(row)
+                    except ValueError as exc:
+                        raise CommandError(f"{options['rules']} line {line}: {exc}") from None
+                    if rule.is_active:
+                        rules.append(rule)
+            return rules
+
+        rules = list(PricingRule.objects.filter(venue=venue).order_by("id"))
+        by_name = {rule.name.casefold(): rule for rule in rules}
+
+        def find(name):
+            try:
+                return by_name[name.strip().casefold()]
+            except KeyError:
+                raise CommandError(f"No pricing rule named {name!r} at {venue.slug}") from None
+
+        adjustments = {}
+        for setting in options["set"]:
+            name, separator, value = setting.rpartition("=")
+            if not separator:
+                raise CommandError(f"--set {setting!r}: expected NAME=PCT")
+            try:
+                adjustments[find(name).id] = Decimal(value)
+            except InvalidOperation:
+                raise CommandError(f"--set {setting!r}: the percentage must be a number") from None
+        for name in options["drop"]:
+            adjustments[find(name).id] = None
+        return candidate_rules(rules, adjustments)
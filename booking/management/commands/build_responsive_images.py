@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.templatetags.responsive_images import IMAGE_FORMATS, variant_path
+
+
+class Command(BaseCommand):
+    help = "Generate resized WebP/AVIF variants of the configured static images"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenerate variants even if they are up to date")
+
+    def handle(self, *args, **options):
+        try:
+            from PIL import Image, features
+        except ImportError as exc:
+            raise CommandError("Pillow is required to build responsive images") from exc
+
+        encoders = {
+            "webp": {"quality": 80, "method": 6},
+            "avif": {"quality": 55, "speed": 6},
+        }
+        formats = []
+        for fmt in IMAGE_FORMATS:
+            if features.check(fmt):
+                formats.append(fmt)
+            else:
+                self.stdout.write(self.style.WARNING(f"Pillow has no {fmt} support, skipping {fmt} variants"))
+
+        output_root = Path(settings.RESPONSIVE_IMAGES_ROOT)
+        built = skipped = 0
+        for path in settings.RESPONSIVE_IMAGES:
+            source = finders.find(path)
+            if not source:
+                raise CommandError(f"Static image not found: {path}")
+            source_mtime = Path(source).stat().st_mtime
+
+            with Image.open(source) as image:
+                if image.mode not in ("RGB", "RGBA"):
+                    image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+                for width in settings.RESPONSIVE_IMAGE_WIDTHS:
+                    # Never upscale; the original is the largest candidate
+                    if width >= image.width:
+                        continue
+                    height = round(image.height * width / image.width)
+                    resized = None
+                    for fmt in formats:
+                        target = output_root / variant_path(path, width, fmt)
+                        if not options["force"] and target.exists() and target.stat().st_mtime >= source_mtime:
+                            skipped += 1
+                            continue
+                        if resized is None:
+                            resized = image.resize((width, height), Image.LANCZOS)
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        resized.save(target, fmt.upper(), **encoders[fmt])
+                        built += 1
+                        if options["verbosity"] > 1:
+                            self.stdout.write(f"{target} ({target.stat().st_size // 1024} KB)")
+
+        self.stdout.write(self.style.SUCCESS(f"Built {built} image variants ({skipped} up to date)"))
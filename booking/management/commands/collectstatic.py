@@ -0,0 +1,10 @@
+from django.contrib.staticfiles.management.commands.collectstatic import Command as CollectStaticCommand
+from django.core.management import call_command
+
+
+class Command(CollectStaticCommand):
+    """collectstatic that first builds responsive image variants so they get collected and hashed."""
+
+    def handle(self, **options):
+        call_command("build_responsive_images", verbosity=options["verbosity"], stdout=self.stdout)
+        return super().handle(**options)
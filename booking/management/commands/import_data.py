@@ -0,0 +1,70 @@
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.importer import IMPORTERS, read_rows, run_import
+from booking.models import Venue
+
+
+class Command(BaseCommand):
+    help = "Stream bookings, coach availability or pricing rules for a venue from a CSV or NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORTERS))
+        parser.add_argument("path", help="Input file, or - for stdin")
+        parser.add_argument("--venue", required=True, help="Slug of the venue the rows belong to")
+        parser.add_argument("--format", choices=("csv", "ndjson"), help="Defaults to the file extension")
+        parser.add_argument("--batch-size", type=int, default=2000, help="Rows validated and inserted per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Validate and report without writing anything")
+        parser.add_argument("--report", help="Write rejected rows, with the reason, to this CSV file")
+
+    def handle(self, *args, **options):
+        try:
+            venue = Venue.objects.get(slug=options["venue"])
+        except Venue.DoesNotExist:
+            raise CommandError(f"Unknown venue {options['venue']!r}") from None
+        fmt = options["format"] or ("ndjson" if options["path"].endswith((".ndjson", ".jsonl")) else "csv")
+
+        stream = sys.stdin if options["path"] == "-" else Path(options["path"]).open(newline="", encoding="utf-8")
+        report_file = open(options["report"], "w", newline="", encoding="utf-8") if options["report"] else None
+        report_writer = csv.writer(report_file) if report_file else None
+        if report_writer:
+            report_writer.writerow(["line", "problem", "reason", "row"])
+        shown = 0
+
+        def report(line, problem, reason, row):
+            nonlocal shown
+            if report_writer:
+                report_writer.writerow([line, problem, reason, row if isinstance(row, ValueError) else json.dumps(row)])
+            elif shown < 20:
+                self.stderr.write(f"line {line}: {problem}: {reason}")
+                shown += 1
+
+        started = time.monotonic()
+        try:
+            result = run_import(
+                IMPORTERS[options["kind"]](venue),
+                read_rows(stream, fmt),
+                batch_size=options["batch_size"],
+                dry_run=options["dry_run"],
+                report=report,
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if report_file:
+                report_file.close()
+
+        verb = "Would import" if options["dry_run"] else "Imported"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {result.imported} of {result.read} rows in {time.monotonic() - started:.1f}s "
+                f"({result.invalid} invalid, {result.conflicts} conflicting)"
+            )
+        )
+        if (result.invalid or result.conflicts) and not report_writer and shown < result.invalid + result.conflicts:
+            self.stderr.write("Only the first 20 problems are shown; use --report for all of them")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.ical import refresh_events, window_start
+from booking.models import Booking, Venue
+
+
+class Command(BaseCommand):
+    help = "Re-serialize the calendar feed events of every booking still in the feed window, e.g. after upgrading"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--venue", help="Only this venue (slug); all venues by default")
+
+    def handle(self, *args, **options):
+        venues = Venue.objects.order_by("id")
+        if options["venue"]:
+            venues = venues.filter(slug=options["venue"])
+            if not venues.exists():
+                raise CommandError(f"Unknown venue {options['venue']!r}")
+        for venue in venues:
+            written = refresh_events(Booking.objects.filter(venue=venue))
+            self.stdout.write(self.style.SUCCESS(f"{venue.slug}: {written} calendar events from {window_start()} on"))
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from booking.cache import bump_availability_version
+from booking.models import Venue, rebuild_slot_occupancy
+
+
+class Command(BaseCommand):
+    help = "Recount the per-hour occupancy counters demand pricing reads, from the bookings themselves"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--venue", help="Only this venue (slug); all venues by default")
+        parser.add_argument("--from", dest="date_from", help="First date YYYY-MM-DD (default: today)")
+        parser.add_argument("--days", type=int, default=365, help="Number of days from the first date")
+
+    def handle(self, *args, **options):
+        try:
+            date_from = (
+                datetime.strptime(options["date_from"], "%Y-%m-%d").date()
+                if options["date_from"]
+                else timezone.localdate()
+            )
+        except ValueError:
+            raise CommandError("--from must be YYYY-MM-DD") from None
+        dates = [date_from + timedelta(days=offset) for offset in range(options["days"])]
+        venues = Venue.objects.order_by("id")
+        if options["venue"]:
+            venues = venues.filter(slug=options["venue"])
+            if not venues.exists():
+                raise CommandError(f"Unknown venue {options['venue']!r}")
+        for venue in venues:
+            written = rebuild_slot_occupancy(venue.id, dates)
+            for date in dates:
+                bump_availability_version(venue.id, date)
+            self.stdout.write(self.style.SUCCESS(f"{venue.slug}: {written} hourly counters from {dates[0]} to {dates[-1]}"))
@@ -3,13 +3,20 @@ from datetime import date, time, timedelta
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
-from booking.models import Coach, CoachAvailability, Court, Equipment, PricingRule
+from booking.models import Coach, CoachAvailability, Court, Equipment, PricingRule, Venue
 
 
 class Command(BaseCommand):
-    help = "Seed initial data for courts, equipment, coaches, and pricing rules"
+    help = "Seed initial data for a venue's courts, equipment, coaches, and pricing rules"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--venue", default="main", help="Slug of the venue to seed (created if missing).")
 
     def handle(self, *args, **options):
+        venue, _ = Venue.objects.get_or_create(
+            slug=options["venue"], defaults={"name": options["venue"].replace("-", " ").title()}
+        )
+
         # Update or create courts
         courts_data = [
             {"name": "Court 1", "court_type": Court.INDOOR, "hourly_rate": 400},
@@ -20,6 +27,7 @@ class Command(BaseCommand):
         courts = []
         for data in courts_data:
             court, created = Court.objects.update_or_create(
+                venue=venue,
                 name=data["name"],
                 defaults={"court_type": data["court_type"], "hourly_rate": data["hourly_rate"], "is_active": True}
             )
@@ -34,6 +42,7 @@ class Command(BaseCommand):
         equipment = []
         for data in equipment_data:
             eq, created = Equipment.objects.update_or_create(
+                venue=venue,
                 name=data["name"],
                 defaults={"total_quantity": data["total_quantity"], "rental_price": data["rental_price"], "is_active": True}
             )
@@ -41,9 +50,9 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(f"Created {len(equipment)} equipment types"))
 
         coaches = [
-            Coach.objects.create(name="Coach A", hourly_rate=500),
-            Coach.objects.create(name="Coach B", hourly_rate=600),
-            Coach.objects.create(name="Coach C", hourly_rate=700),
+            Coach.objects.create(venue=venue, name="Coach A", hourly_rate=500),
+            Coach.objects.create(venue=venue, name="Coach B", hourly_rate=600),
+            Coach.objects.create(venue=venue, name="Coach C", hourly_rate=700),
         ]
         self.stdout.write(self.style.SUCCESS(f"Created {len(coaches)} coaches"))
 
@@ -60,6 +69,7 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS("Created coach availability for next 7 days"))
 
         PricingRule.objects.create(
+            venue=venue,
             name="Peak hours 6-9 PM",
             rule_type=PricingRule.PEAK_HOUR,
             percentage_adjustment=30,
@@ -67,15 +77,24 @@ class Command(BaseCommand):
             peak_end=time(21, 0),
         )
         PricingRule.objects.create(
+            venue=venue,
             name="Weekend premium",
             rule_type=PricingRule.WEEKEND,
             percentage_adjustment=20,
         )
         PricingRule.objects.create(
+            venue=venue,
             name="Indoor court premium",
             rule_type=PricingRule.INDOOR_PREMIUM,
             percentage_adjustment=15,
         )
+        PricingRule.objects.create(
+            venue=venue,
+            name="High demand",
+            rule_type=PricingRule.DEMAND,
+            percentage_adjustment=25,
+            occupancy_threshold=80,
+        )
         self.stdout.write(self.style.SUCCESS("Created pricing rules"))
 
 
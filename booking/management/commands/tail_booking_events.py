@@ -0,0 +1,52 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.events import latest_sequence, read_events, serialize_event
+from booking.models import BookingEvent, Venue
+
+
+class Command(BaseCommand):
+    help = "Print booking events as JSON lines, oldest first, optionally following new ones like tail -f"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--after", type=int, help="Start after this sequence number (default: the last --lines events)")
+        parser.add_argument("-n", "--lines", type=int, default=10, help="Events to show before following (default: 10)")
+        parser.add_argument("-f", "--follow", action="store_true", help="Keep polling for new events")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls with --follow")
+        parser.add_argument("--venue", help="Only this venue's events (slug)")
+        parser.add_argument(
+            "--kind",
+            action="append",
+            choices=[value for value, _ in BookingEvent.KIND_CHOICES],
+            help="Only events of this kind (repeatable)",
+        )
+
+    def handle(self, *args, **options):
+        venue = None
+        if options["venue"]:
+            try:
+                venue = Venue.objects.get(slug=options["venue"])
+            except Venue.DoesNotExist:
+                raise CommandError(f"Unknown venue {options['venue']!r}") from None
+
+        cursor = options["after"]
+        if cursor is None:
+            cursor = max(latest_sequence() - options["lines"], 0)
+        try:
+            while True:
+                events = read_events(cursor, venue=venue, kinds=options["kind"])
+                for event in events:
+                    self.stdout.write(json.dumps(serialize_event(event)))
+                if events:
+                    cursor = events[-1].sequence
+                    continue
+                if not options["follow"]:
+                    break
+                self.stdout.flush()
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        # Where to pick up next time
+        self.stderr.write(f"Last sequence: {cursor}")
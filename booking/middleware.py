@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .profiling import profile_request, profile_requested
+from .routers import _pinned, _wrote
+
+PIN_COOKIE = "primary_pin"
+
+
+class PrimaryPinMiddleware:
+    """
+    Keeps a client on the primary database for ``REPLICA_PIN_SECONDS`` after
+    any request that wrote, so customers see their own booking straight away
+    instead of a lagging replica.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        pinned_token = _pinned.set(PIN_COOKIE in request.COOKIES)
+        wrote_token = _wrote.set(False)
+        try:
+            response = self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            _pinned.reset(pinned_token)
+            _wrote.reset(wrote_token)
+        return self._pin(response, wrote)
+
+    async def __acall__(self, request):
+        pinned_token = _pinned.set(PIN_COOKIE in request.COOKIES)
+        wrote_token = _wrote.set(False)
+        try:
+            response = await self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            _pinned.reset(pinned_token)
+            _wrote.reset(wrote_token)
+        return self._pin(response, wrote)
+
+    def _pin(self, response, wrote: bool):
+        if wrote:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a request when a staff member asks for it with the ``_profile``
+    query parameter or the ``X-Profile`` header. Any other request only pays
+    for that lookup.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if profile_requested(request) and request.user.is_staff:
+            return profile_request(request, self.get_response)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if profile_requested(request) and (await request.auser()).is_staff:
+            # Run the rest of the stack from one worker thread: the profiler
+            # only sees that thread, and thread-sensitive ORM calls made by
+            # async views run on it too
+            return await sync_to_async(profile_request)(request, async_to_sync(self.get_response))
+        return await self.get_response(request)
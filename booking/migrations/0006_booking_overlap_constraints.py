@@ -0,0 +1,54 @@
+from django.db import migrations
+
+# PostgreSQL only: a generated tsrange column on bookings plus exclusion
+# constraints, so the database rejects overlapping confirmed bookings for the
+# same court or coach. Other databases keep the lock-and-check path in
+# create_booking_atomic.
+
+FORWARD_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    """
+    ALTER TABLE booking_booking
+    ADD COLUMN time_range tsrange
+    GENERATED ALWAYS AS (tsrange(date + start_time, date + end_time, '[)')) STORED
+    """,
+    """
+    ALTER TABLE booking_booking
+    ADD CONSTRAINT booking_court_no_overlap
+    EXCLUDE USING gist (court_id WITH =, time_range WITH &&)
+    WHERE (status = 'confirmed')
+    """,
+    """
+    ALTER TABLE booking_booking
+    ADD CONSTRAINT booking_coach_no_overlap
+    EXCLUDE USING gist (coach_id WITH =, time_range WITH &&)
+    WHERE (status = 'confirmed' AND coach_id IS NOT NULL)
+    """,
+]
+
+BACKWARD_SQL = [
+    "ALTER TABLE booking_booking DROP CONSTRAINT IF EXISTS booking_coach_no_overlap",
+    "ALTER TABLE booking_booking DROP CONSTRAINT IF EXISTS booking_court_no_overlap",
+    "ALTER TABLE booking_booking DROP COLUMN IF EXISTS time_range",
+]
+
+
+def run_on_postgres(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_archived_bookings'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_on_postgres(FORWARD_SQL), run_on_postgres(BACKWARD_SQL)),
+    ]
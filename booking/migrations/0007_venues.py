@@ -0,0 +1,69 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+VENUE_SCOPED = ["court", "coach", "equipment", "pricingrule", "booking", "archivedbooking"]
+
+
+def assign_default_venue(apps, schema_editor):
+    """Existing single-facility data all moves to one default venue."""
+    Venue = apps.get_model("booking", "Venue")
+    Court = apps.get_model("booking", "Court")
+    if not any(apps.get_model("booking", model_name).objects.exists() for model_name in VENUE_SCOPED):
+        return
+    venue, _ = Venue.objects.get_or_create(slug="main", defaults={"name": "Main venue"})
+    for model_name in VENUE_SCOPED:
+        apps.get_model("booking", model_name).objects.filter(venue__isnull=True).update(venue=venue)
+    # Bookings follow their court, in case anything was assigned elsewhere
+    Booking = apps.get_model("booking", "Booking")
+    for court in Court.objects.all():
+        Booking.objects.filter(court=court).exclude(venue_id=court.venue_id).update(venue_id=court.venue_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_booking_overlap_constraints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Venue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='court',
+            name='venue',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='courts', to='booking.venue'),
+        ),
+        migrations.AddField(
+            model_name='coach',
+            name='venue',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='coaches', to='booking.venue'),
+        ),
+        migrations.AddField(
+            model_name='equipment',
+            name='venue',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='equipment', to='booking.venue'),
+        ),
+        migrations.AddField(
+            model_name='pricingrule',
+            name='venue',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='pricing_rules', to='booking.venue'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='venue',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='bookings', to='booking.venue'),
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='venue',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.venue'),
+        ),
+        migrations.RunPython(assign_default_venue, migrations.RunPython.noop),
+    ]
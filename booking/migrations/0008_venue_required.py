@@ -0,0 +1,66 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separate from 0007 so PostgreSQL has committed the data migration's
+    # updates before the columns are altered
+
+    dependencies = [
+        ('booking', '0007_venues'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='court',
+            name='venue',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='courts', to='booking.venue'),
+        ),
+        migrations.AlterField(
+            model_name='coach',
+            name='venue',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='coaches', to='booking.venue'),
+        ),
+        migrations.AlterField(
+            model_name='equipment',
+            name='venue',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='equipment', to='booking.venue'),
+        ),
+        migrations.AlterField(
+            model_name='pricingrule',
+            name='venue',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='pricing_rules', to='booking.venue'),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='venue',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='bookings', to='booking.venue'),
+        ),
+        migrations.AlterField(
+            model_name='archivedbooking',
+            name='venue',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.venue'),
+        ),
+        migrations.AlterField(
+            model_name='court',
+            name='name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='equipment',
+            name='name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='court',
+            constraint=models.UniqueConstraint(fields=('venue', 'name'), name='unique_court_name_per_venue'),
+        ),
+        migrations.AddConstraint(
+            model_name='equipment',
+            constraint=models.UniqueConstraint(fields=('venue', 'name'), name='unique_equipment_name_per_venue'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['venue', 'date'], name='booking_venue_date_idx'),
+        ),
+    ]
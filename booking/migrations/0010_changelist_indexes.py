@@ -0,0 +1,47 @@
+from django.db import migrations, models
+
+# Indexes for the admin changelists. On PostgreSQL they are built with
+# CREATE INDEX CONCURRENTLY so bookings keep flowing while a large table is
+# indexed; that can't run inside a transaction, hence atomic = False.
+
+INDEXES = [
+    ("booking", models.Index(fields=["date", "id"], name="booking_date_id_idx")),
+    ("booking", models.Index(fields=["court", "date"], name="booking_court_date_idx")),
+    ("booking", models.Index(fields=["status", "date"], name="booking_status_date_idx")),
+    ("waitlistentry", models.Index(fields=["date", "id"], name="waitlist_date_id_idx")),
+    ("waitlistentry", models.Index(fields=["court", "date"], name="waitlist_court_date_idx")),
+]
+
+
+def add_indexes(apps, schema_editor):
+    for model_name, index in INDEXES:
+        model = apps.get_model("booking", model_name)
+        if schema_editor.connection.vendor == "postgresql":
+            sql = str(index.create_sql(model, schema_editor)).replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY IF NOT EXISTS", 1)
+            schema_editor.execute(sql)
+        else:
+            schema_editor.add_index(model, index)
+
+
+def remove_indexes(apps, schema_editor):
+    for model_name, index in INDEXES:
+        schema_editor.remove_index(apps.get_model("booking", model_name), index)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("booking", "0009_request_profile"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index) for model_name, index in INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(add_indexes, remove_indexes),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+# Substring search on customer names: FTS5 trigram shadow tables on SQLite,
+# trigram GIN indexes on PostgreSQL (built concurrently, hence atomic = False).
+# See booking.search.
+
+
+def install(apps, schema_editor):
+    from booking.search import install_search_index
+
+    install_search_index(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    from booking.search import uninstall_search_index
+
+    uninstall_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("booking", "0010_changelist_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:46
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def count_upcoming_bookings(apps, schema_editor):
+    """Counters only cover today onward, the only dates still priced."""
+    Booking = apps.get_model("booking", "Booking")
+    SlotOccupancy = apps.get_model("booking", "SlotOccupancy")
+    db = schema_editor.connection.alias
+    counts = {}
+    rows = (
+        Booking.objects.using(db)
+        .filter(date__gte=timezone.localdate(), status="confirmed")
+        .values_list("venue_id", "date", "start_time", "end_time")
+    )
+    for venue_id, date, start, end in rows.iterator(chunk_size=5000):
+        for hour in range(start.hour, end.hour + (1 if end.minute or end.second else 0)):
+            counts[venue_id, date, hour] = counts.get((venue_id, date, hour), 0) + 1
+    SlotOccupancy.objects.using(db).bulk_create(
+        [
+            SlotOccupancy(venue_id=venue_id, date=date, hour=hour, booked=booked)
+            for (venue_id, date, hour), booked in counts.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0011_customer_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricingrule',
+            name='occupancy_threshold',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Demand rules: applies when more than this % of active courts are booked in any hour of the slot.', null=True, validators=[django.core.validators.MaxValueValidator(100)]),
+        ),
+        migrations.AlterField(
+            model_name='pricingrule',
+            name='rule_type',
+            field=models.CharField(choices=[('peak_hour', 'Peak hour'), ('weekend', 'Weekend'), ('indoor_premium', 'Indoor premium'), ('demand', 'Demand')], max_length=50),
+        ),
+        migrations.CreateModel(
+            name='SlotOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('booked', models.PositiveIntegerField(default=0)),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='booking.venue')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('venue', 'date', 'hour'), name='unique_slot_occupancy')],
+            },
+        ),
+        migrations.RunPython(count_upcoming_bookings, migrations.RunPython.noop),
+    ]
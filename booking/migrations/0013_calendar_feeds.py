@@ -0,0 +1,44 @@
+# Generated by Django 5.1.4 on 2026-10-19 08:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_slot_occupancy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('court', 'Court'), ('coach', 'Coach'), ('user', 'User')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('modified', models.DateTimeField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('scope', 'object_id'), name='unique_calendar_feed')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CalendarEvent',
+            fields=[
+                ('booking', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='booking.booking')),
+                ('date', models.DateField()),
+                ('sequence', models.PositiveIntegerField(default=0)),
+                ('vevent', models.TextField()),
+                ('coach', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='booking.coach')),
+                ('court', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='booking.court')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['court', 'date'], name='calendar_court_date_idx'), models.Index(fields=['coach', 'date'], name='calendar_coach_date_idx'), models.Index(fields=['user', 'date'], name='calendar_user_date_idx')],
+            },
+        ),
+    ]
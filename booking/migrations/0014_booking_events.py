@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2026-10-19 08:04
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0013_calendar_feeds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingEventSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BookingEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveBigIntegerField(blank=True, null=True, unique=True)),
+                ('recorded_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('rescheduled', 'Rescheduled'), ('priced', 'Priced'), ('waitlisted', 'Waitlisted'), ('deleted', 'Deleted')], max_length=20)),
+                ('booking_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('waitlist_entry_id', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('date', models.DateField()),
+                ('data', models.JSONField(default=dict)),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='booking.venue')),
+            ],
+            options={
+                'ordering': ['sequence'],
+                'indexes': [models.Index(fields=['booking_id'], name='booking_event_booking_idx'), models.Index(condition=models.Q(('sequence', None)), fields=['id'], name='booking_event_pending_idx')],
+            },
+        ),
+    ]
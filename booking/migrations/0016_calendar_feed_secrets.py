@@ -0,0 +1,27 @@
+# Generated by Django 5.1.4 on 2026-10-19 08:23
+
+import booking.models
+from django.db import migrations, models
+
+
+def give_each_feed_its_own_secret(apps, schema_editor):
+    # AddField evaluates the default once, so existing feeds would share a secret
+    CalendarFeed = apps.get_model("booking", "CalendarFeed")
+    for feed in CalendarFeed.objects.only("pk").iterator():
+        CalendarFeed.objects.filter(pk=feed.pk).update(secret=booking.models.new_feed_secret())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0015_idempotency_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarfeed',
+            name='secret',
+            field=models.CharField(default=booking.models.new_feed_secret, max_length=32),
+        ),
+        migrations.RunPython(give_each_feed_its_own_secret, migrations.RunPython.noop),
+    ]
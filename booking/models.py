@@ -1,14 +1,51 @@
 from __future__ import annotations
 
+import secrets
 from datetime import time
 
 from django.contrib.auth import get_user_model
-from django.db import models, transaction
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models.functions import Now
 
 User = get_user_model()
 
+# Courts are bookable by the hour between these hours
+OPENING_HOUR = 6
+CLOSING_HOUR = 22
 
-class Court(models.Model):
+
+class Venue(models.Model):
+    """A facility. Courts, coaches, equipment, pricing rules and bookings all belong to one."""
+
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=50, unique=True)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class LoadedNameMixin:
+    """Remembers the stored ``name``, so a save can tell a rename from other edits."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_name = instance.__dict__.get("name")
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_name = self.name
+
+    def name_changed(self) -> bool:
+        # Instances never loaded from the database count as renamed
+        return self.name != getattr(self, "_loaded_name", None)
+
+
+class Court(LoadedNameMixin, models.Model):
     INDOOR = "indoor"
     OUTDOOR = "outdoor"
     COURT_TYPE_CHOICES = [
@@ -16,26 +53,39 @@ class Court(models.Model):
         (OUTDOOR, "Outdoor"),
     ]
 
-    name = models.CharField(max_length=100, unique=True)
+    venue = models.ForeignKey(Venue, on_delete=models.PROTECT, related_name="courts")
+    name = models.CharField(max_length=100)
     court_type = models.CharField(max_length=20, choices=COURT_TYPE_CHOICES)
     hourly_rate = models.DecimalField(max_digits=8, decimal_places=2, default=400.00)
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["venue", "name"], name="unique_court_name_per_venue"),
+        ]
+
     def __str__(self) -> str:
         return self.name
 
 
 class Equipment(models.Model):
-    name = models.CharField(max_length=100, unique=True)
+    venue = models.ForeignKey(Venue, on_delete=models.PROTECT, related_name="equipment")
+    name = models.CharField(max_length=100)
     total_quantity = models.PositiveIntegerField()
     rental_price = models.DecimalField(max_digits=8, decimal_places=2, default=50.00)
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["venue", "name"], name="unique_equipment_name_per_venue"),
+        ]
+
     def __str__(self) -> str:
         return self.name
 
 
-class Coach(models.Model):
+class Coach(LoadedNameMixin, models.Model):
+    venue = models.ForeignKey(Venue, on_delete=models.PROTECT, related_name="coaches")
     name = models.CharField(max_length=100)
     bio = models.TextField(blank=True)
     hourly_rate = models.DecimalField(max_digits=8, decimal_places=2)
@@ -62,13 +112,16 @@ class PricingRule(models.Model):
     PEAK_HOUR = "peak_hour"
     WEEKEND = "weekend"
     INDOOR_PREMIUM = "indoor_premium"
+    DEMAND = "demand"
 
     RULE_TYPE_CHOICES = [
         (PEAK_HOUR, "Peak hour"),
         (WEEKEND, "Weekend"),
         (INDOOR_PREMIUM, "Indoor premium"),
+        (DEMAND, "Demand"),
     ]
 
+    venue = models.ForeignKey(Venue, on_delete=models.PROTECT, related_name="pricing_rules")
     name = models.CharField(max_length=100)
     rule_type = models.CharField(max_length=50, choices=RULE_TYPE_CHOICES)
     # Percentage adjustment, e.g. 20 means +20%, -10 means -10%
@@ -77,6 +130,17 @@ class PricingRule(models.Model):
 
     peak_start = models.TimeField(null=True, blank=True)
     peak_end = models.TimeField(null=True, blank=True)
+    # Demand rules apply once more than this percentage of the venue's courts are booked
+    occupancy_threshold = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        validators=[MaxValueValidator(100)],
+        help_text="Demand rules: applies when more than this % of active courts are booked in any hour of the slot.",
+    )
+
+    def clean(self):
+        if self.rule_type == self.DEMAND and self.occupancy_threshold is None:
+            raise ValidationError({"occupancy_threshold": "Demand rules need an occupancy threshold."})
 
     def __str__(self) -> str:
         return self.name
@@ -94,6 +158,8 @@ class Booking(models.Model):
     ]
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # Copied from the court on save, so venue-wide queries skip the join
+    venue = models.ForeignKey(Venue, on_delete=models.PROTECT, related_name="bookings", editable=False)
     user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="bookings")
     customer_name = models.CharField(max_length=100)
     date = models.DateField()
@@ -104,10 +170,188 @@ class Booking(models.Model):
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=CONFIRMED)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["venue", "date"], name="booking_venue_date_idx"),
+            # Admin changelist: date hierarchy and its (-date, -id) ordering, and the common filters
+            models.Index(fields=["date", "id"], name="booking_date_id_idx"),
+            models.Index(fields=["court", "date"], name="booking_court_date_idx"),
+            models.Index(fields=["status", "date"], name="booking_status_date_idx"),
+        ]
+
+    # Fields whose stored values signal handlers compare against on save
+    TRACKED_FIELDS = (
+        "venue_id",
+        "date",
+        "start_time",
+        "end_time",
+        "court_id",
+        "coach_id",
+        "user_id",
+        "status",
+        "total_price",
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded = instance._tracked_values()
+        return instance
+
+    def _tracked_values(self) -> dict:
+        return {name: self.__dict__.get(name) for name in self.TRACKED_FIELDS}
+
+    def save(self, *args, **kwargs):
+        self.venue_id = self.court.venue_id
+        # post_save handlers write counters and the event log; they commit or roll back with the row
+        with transaction.atomic(using=kwargs.get("using") or router.db_for_write(Booking, instance=self)):
+            super().save(*args, **kwargs)
+        # post_save handlers have seen the old values; later saves compare against these
+        self._loaded = self._tracked_values()
+
     def __str__(self) -> str:
         return f"Booking {self.id} - {self.customer_name}"
 
 
+class SlotOccupancy(models.Model):
+    """
+    Confirmed bookings per venue, date and hour, kept current by the booking
+    signal handlers from today onward so demand pricing reads one row per
+    hour instead of counting bookings.
+    """
+
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name="+")
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    booked = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["venue", "date", "hour"], name="unique_slot_occupancy"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.venue} {self.date} {self.hour}:00 ({self.booked} booked)"
+
+
+def new_feed_secret() -> str:
+    return secrets.token_urlsafe(16)
+
+
+class CalendarFeed(models.Model):
+    """
+    Version of one court's, coach's or user's iCalendar feed. Bumped in the
+    same transaction as any change to the feed's events, so it serves as the
+    feed's ETag and its cache key without reading the events.
+    """
+
+    COURT = "court"
+    COACH = "coach"
+    USER = "user"
+    SCOPE_CHOICES = [
+        (COURT, "Court"),
+        (COACH, "Coach"),
+        (USER, "User"),
+    ]
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    version = models.PositiveIntegerField(default=0)
+    modified = models.DateTimeField()
+    # Signed into the feed URL; replacing it revokes every copy of the old link
+    secret = models.CharField(max_length=32, default=new_feed_secret)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["scope", "object_id"], name="unique_calendar_feed"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.scope} {self.object_id} feed v{self.version}"
+
+
+class CalendarEvent(models.Model):
+    """
+    A booking serialized as an iCalendar VEVENT when it changes, so feeds
+    are assembled by joining stored text instead of formatting bookings.
+    """
+
+    booking = models.OneToOneField(Booking, on_delete=models.CASCADE, primary_key=True, related_name="+")
+    court = models.ForeignKey(Court, on_delete=models.CASCADE, related_name="+")
+    coach = models.ForeignKey(Coach, null=True, on_delete=models.CASCADE, related_name="+")
+    user = models.ForeignKey(User, null=True, on_delete=models.SET_NULL, related_name="+")
+    date = models.DateField()
+    # iCalendar SEQUENCE: how many times the event has been revised
+    sequence = models.PositiveIntegerField(default=0)
+    vevent = models.TextField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["court", "date"], name="calendar_court_date_idx"),
+            models.Index(fields=["coach", "date"], name="calendar_coach_date_idx"),
+            models.Index(fields=["user", "date"], name="calendar_user_date_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"Calendar event for booking {self.booking_id}"
+
+
+class BookingEvent(models.Model):
+    """
+    Append-only log of what happened to bookings, for consumers that keep
+    derived data current from their last ``sequence`` instead of rescanning
+    bookings. Written by the booking signal handlers in the same transaction
+    as the change. Bookings are referenced by id only, so archiving them
+    leaves the log intact.
+    """
+
+    CREATED = "created"
+    CONFIRMED = "confirmed"
+    CANCELLED = "cancelled"
+    RESCHEDULED = "rescheduled"
+    PRICED = "priced"
+    WAITLISTED = "waitlisted"
+    DELETED = "deleted"
+    KIND_CHOICES = [
+        (CREATED, "Created"),
+        (CONFIRMED, "Confirmed"),
+        (CANCELLED, "Cancelled"),
+        (RESCHEDULED, "Rescheduled"),
+        (PRICED, "Priced"),
+        (WAITLISTED, "Waitlisted"),
+        (DELETED, "Deleted"),
+    ]
+
+    # Numbered after the writer commits, in commit order; see booking.events.sequence_events
+    sequence = models.PositiveBigIntegerField(null=True, blank=True, unique=True)
+    recorded_at = models.DateTimeField(db_default=Now())
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    venue = models.ForeignKey(Venue, on_delete=models.PROTECT, related_name="+")
+    booking_id = models.PositiveBigIntegerField(null=True, blank=True)
+    waitlist_entry_id = models.PositiveBigIntegerField(null=True, blank=True)
+    date = models.DateField()
+    data = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ["sequence"]
+        indexes = [
+            models.Index(fields=["booking_id"], name="booking_event_booking_idx"),
+            models.Index(fields=["id"], condition=models.Q(sequence=None), name="booking_event_pending_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"#{self.sequence or '-'} {self.kind}"
+
+
+class BookingEventSequence(models.Model):
+    """The last sequence number handed out; one row, locked only while committed events are numbered."""
+
+    last = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"Booking events up to #{self.last}"
+
+
 class BookingEquipment(models.Model):
     booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name="equipment_items")
     equipment = models.ForeignKey(Equipment, on_delete=models.PROTECT)
@@ -131,11 +375,119 @@ class WaitlistEntry(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["date", "id"], name="waitlist_date_id_idx"),
+            models.Index(fields=["court", "date"], name="waitlist_court_date_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Waitlist {self.customer_name} {self.date} {self.start_time}"
 
 
+class ArchivedBooking(models.Model):
+    """
+    Bookings older than ``BOOKING_ARCHIVE_HORIZON_DAYS``, moved out of the hot
+    ``Booking`` table by ``archive_bookings``. Ids are preserved.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    created_at = models.DateTimeField()
+    venue = models.ForeignKey(Venue, on_delete=models.PROTECT, related_name="+")
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="archived_bookings")
+    customer_name = models.CharField(max_length=100)
+    date = models.DateField(db_index=True)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    court = models.ForeignKey(Court, on_delete=models.PROTECT, related_name="+")
+    coach = models.ForeignKey(Coach, null=True, blank=True, on_delete=models.PROTECT, related_name="+")
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"Booking {self.id} - {self.customer_name} (archived)"
+
+
+class ArchivedBookingEquipment(models.Model):
+    booking = models.ForeignKey(ArchivedBooking, on_delete=models.CASCADE, related_name="equipment_items")
+    equipment = models.ForeignKey(Equipment, on_delete=models.PROTECT, related_name="+")
+    quantity = models.PositiveIntegerField()
+
+    def __str__(self) -> str:
+        return f"{self.equipment} x{self.quantity}"
+
+
+class ArchivedWaitlistEntry(models.Model):
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    court = models.ForeignKey(Court, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+    customer_name = models.CharField(max_length=100)
+    notified = models.BooleanField(default=False)
+
+    def __str__(self) -> str:
+        return f"Waitlist {self.customer_name} {self.date} {self.start_time} (archived)"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Outcome of a booking submission, keyed by the client's idempotency key so
+    retries replay it instead of booking again.
+    """
+
+    BOOKED = "booked"
+    WAITLISTED = "waitlisted"
+
+    OUTCOME_CHOICES = [
+        (BOOKED, "Booked"),
+        (WAITLISTED, "Waitlisted"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    key = models.CharField(max_length=64)
+    # Digest of the submitted booking parameters; a key is only replayed for the same ones
+    fingerprint = models.CharField(max_length=64, blank=True)
+    outcome = models.CharField(max_length=10, choices=OUTCOME_CHOICES, blank=True)
+    booking = models.ForeignKey(Booking, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "key"], name="unique_idempotency_key_per_user"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.key} ({self.outcome})"
+
+
+class RequestProfile(models.Model):
+    """
+    A request run under the profiler on a staff member's request. The cProfile
+    stats live in ``stats_file`` under ``PROFILING_ROOT``.
+    """
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    query_ms = models.FloatField()
+    # One entry per statement: alias, sql, params, ms and, for slow SELECTs, explain
+    queries = models.JSONField(default=list)
+    # Top functions by cumulative time, as printed by pstats
+    summary = models.TextField(blank=True)
+    stats_file = models.CharField(max_length=200)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
 def is_weekend(date) -> bool:
     return date.weekday() >= 5
 
@@ -146,12 +498,111 @@ def is_peak_hour(rule: PricingRule, start: time, end: time) -> bool:
     return not (end <= rule.peak_start or start >= rule.peak_end)
 
 
+def booking_hours(start: time, end: time) -> range:
+    """The hours of the day a booking from ``start`` to ``end`` touches."""
+    return range(start.hour, end.hour + (1 if end.minute or end.second else 0))
+
+
+def peak_occupancy(occupancy: dict[int, float], start: time, end: time) -> float:
+    return max((occupancy.get(hour, 0.0) for hour in booking_hours(start, end)), default=0.0)
+
+
+def occupancy_shares(booked: dict[int, int], court_count: int) -> dict[int, float]:
+    """Share of ``court_count`` courts booked in each hour, from ``SlotOccupancy`` counts."""
+    if not court_count:
+        return {}
+    return {hour: min(count / court_count, 1.0) for hour, count in booked.items()}
+
+
+def hourly_occupancy(venue_id: int, date) -> dict[int, float]:
+    booked = dict(SlotOccupancy.objects.filter(venue_id=venue_id, date=date).values_list("hour", "booked"))
+    return occupancy_shares(booked, Court.objects.filter(venue_id=venue_id, is_active=True).count())
+
+
+async def ahourly_occupancy(venue_id: int, date) -> dict[int, float]:
+    rows = SlotOccupancy.objects.filter(venue_id=venue_id, date=date).values_list("hour", "booked")
+    booked = {hour: count async for hour, count in rows}
+    return occupancy_shares(booked, await Court.objects.filter(venue_id=venue_id, is_active=True).acount())
+
+
+def has_demand_rules(rules) -> bool:
+    return any(rule.rule_type == PricingRule.DEMAND for rule in rules)
+
+
+def adjust_slot_occupancy(venue_id: int, date, start: time, end: time, delta: int, using: str) -> None:
+    """
+    Add ``delta`` to the counters of every hour a booking touches, creating
+    missing ones. Called after the booking commits, in autocommit mode.
+    """
+    hours = booking_hours(start, end)
+    if not hours:
+        return
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    table = qn(SlotOccupancy._meta.db_table)
+    booked = f"{table}.{qn('booked')}"
+    day = connection.ops.adapt_datefield_value(date)
+    # One upsert, so concurrent bookings of the same hour never lose a count and a
+    # contended counter waits on the database's row lock rather than a retry loop
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({qn('venue_id')}, {qn('date')}, {qn('hour')}, {qn('booked')}) "
+            f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(hours))} "
+            f"ON CONFLICT ({qn('venue_id')}, {qn('date')}, {qn('hour')}) "
+            f"DO UPDATE SET {qn('booked')} = CASE WHEN {booked} + %s > 0 THEN {booked} + %s ELSE 0 END",
+            [value for hour in hours for value in (venue_id, day, hour, max(delta, 0))] + [delta, delta],
+        )
+
+
+def rebuild_slot_occupancy(venue_id: int, dates, using: str | None = None) -> int:
+    """
+    Recount the occupancy counters of ``dates`` from the bookings themselves,
+    for writes that bypass the signal handlers such as bulk imports.
+    Returns the number of counters written.
+    """
+    using = using or router.db_for_write(SlotOccupancy)
+    dates = list(dates)
+    counts: dict[tuple, int] = {}
+    bookings = Booking.objects.using(using).filter(venue_id=venue_id, date__in=dates, status=Booking.CONFIRMED)
+    for date, start, end in bookings.values_list("date", "start_time", "end_time").iterator(chunk_size=5000):
+        for hour in booking_hours(start, end):
+            counts[date, hour] = counts.get((date, hour), 0) + 1
+    with transaction.atomic(using=using):
+        SlotOccupancy.objects.using(using).filter(venue_id=venue_id, date__in=dates).delete()
+        SlotOccupancy.objects.using(using).bulk_create(
+            [SlotOccupancy(venue_id=venue_id, date=date, hour=hour, booked=booked) for (date, hour), booked in counts.items()],
+            batch_size=1000,
+        )
+    return len(counts)
+
+
 def calculate_base_price(court: Court, coach: Coach | None, duration_hours: float) -> float:
     court_base_rate = float(court.hourly_rate)
     coach_rate = float(coach.hourly_rate) if coach else 0
     return duration_hours * (court_base_rate + coach_rate)
 
 
+def rule_applies(
+    rule: PricingRule,
+    date,
+    start: time,
+    end: time,
+    court: Court,
+    occupancy: dict[int, float] | None = None,
+) -> bool:
+    if rule.rule_type == PricingRule.WEEKEND:
+        return is_weekend(date)
+    if rule.rule_type == PricingRule.PEAK_HOUR:
+        return is_peak_hour(rule, start, end)
+    if rule.rule_type == PricingRule.INDOOR_PREMIUM:
+        return court.court_type == Court.INDOOR
+    if rule.rule_type == PricingRule.DEMAND:
+        return rule.occupancy_threshold is not None and (
+            peak_occupancy(occupancy or {}, start, end) * 100 > rule.occupancy_threshold
+        )
+    return False
+
+
 def apply_pricing_rules(
     date,
     start: time,
@@ -159,22 +610,63 @@ def apply_pricing_rules(
     court: Court,
     base_price: float,
 ) -> float:
-    rules = PricingRule.objects.filter(is_active=True)
+    rules = list(PricingRule.objects.filter(venue_id=court.venue_id, is_active=True))
+    occupancy = hourly_occupancy(court.venue_id, date) if has_demand_rules(rules) else {}
     price = base_price
     for rule in rules:
-        applies = False
-        if rule.rule_type == PricingRule.WEEKEND and is_weekend(date):
-            applies = True
-        elif rule.rule_type == PricingRule.PEAK_HOUR and is_peak_hour(rule, start, end):
-            applies = True
-        elif rule.rule_type == PricingRule.INDOOR_PREMIUM and court.court_type == Court.INDOOR:
-            applies = True
-
-        if applies:
+        if rule_applies(rule, date, start, end, court, occupancy):
             price *= 1 + float(rule.percentage_adjustment) / 100.0
     return round(price, 2)
 
 
+def build_price_matrix(
+    date,
+    courts,
+    coach: Coach | None,
+    rules,
+    slots: list[tuple[time, time]],
+    occupancy: dict[int, float] | None = None,
+) -> dict[int, list[float]]:
+    """
+    Price every (court, slot) cell of a day in one pass. Rules are
+    multiplicative, so each one folds into a per-day, per-slot or
+    per-court-type factor and a cell's price is the product of its factors.
+    Demand rules need the day's ``hourly_occupancy``.
+    """
+    day_factor = 1.0
+    slot_factors = [1.0] * len(slots)
+    type_factors = {Court.INDOOR: 1.0, Court.OUTDOOR: 1.0}
+    for rule in rules:
+        multiplier = 1 + float(rule.percentage_adjustment) / 100.0
+        if rule.rule_type == PricingRule.WEEKEND:
+            if is_weekend(date):
+                day_factor *= multiplier
+        elif rule.rule_type == PricingRule.PEAK_HOUR:
+            for i, (start, end) in enumerate(slots):
+                if is_peak_hour(rule, start, end):
+                    slot_factors[i] *= multiplier
+        elif rule.rule_type == PricingRule.INDOOR_PREMIUM:
+            type_factors[Court.INDOOR] *= multiplier
+        elif rule.rule_type == PricingRule.DEMAND:
+            for i, (start, end) in enumerate(slots):
+                if rule_applies(rule, date, start, end, None, occupancy):
+                    slot_factors[i] *= multiplier
+
+    coach_rate = float(coach.hourly_rate) if coach else 0
+    matrix = {}
+    for court in courts:
+        court_factor = (float(court.hourly_rate) + coach_rate) * day_factor * type_factors[court.court_type]
+        matrix[court.id] = [
+            round(court_factor * slot_factor * _slot_hours(start, end), 2)
+            for slot_factor, (start, end) in zip(slot_factors, slots)
+        ]
+    return matrix
+
+
+def _slot_hours(start: time, end: time) -> float:
+    return (end.hour + end.minute / 60) - (start.hour + start.minute / 60)
+
+
 def get_equipment_availability(equipment: Equipment, date, start: time, end: time) -> int:
     booked_qty = (
         BookingEquipment.objects.filter(
@@ -200,17 +692,20 @@ def is_court_available(court: Court, date, start: time, end: time) -> bool:
     return not overlap
 
 
-def is_coach_available(coach: Coach, date, start: time, end: time) -> bool:
-    if not coach:
-        return True
+def coach_has_window(coach: Coach, date, start: time, end: time) -> bool:
     # must have an availability window that covers this slot
-    has_availability = CoachAvailability.objects.filter(
+    return CoachAvailability.objects.filter(
         coach=coach,
         date=date,
         start_time__lte=start,
         end_time__gte=end,
     ).exists()
-    if not has_availability:
+
+
+def is_coach_available(coach: Coach, date, start: time, end: time) -> bool:
+    if not coach:
+        return True
+    if not coach_has_window(coach, date, start, end):
         return False
     overlap = Booking.objects.filter(
         coach=coach,
@@ -222,8 +717,26 @@ def is_coach_available(coach: Coach, date, start: time, end: time) -> bool:
     return not overlap
 
 
-@transaction.atomic
-def create_booking_atomic(
+# Created by migration 0006 on PostgreSQL only
+OVERLAP_CONSTRAINTS = {"booking_court_no_overlap", "booking_coach_no_overlap"}
+
+
+def overlap_constraints_enforced(using: str = "default") -> bool:
+    """Whether the database itself rejects overlapping confirmed bookings."""
+    return connections[using].vendor == "postgresql"
+
+
+def _is_overlap_violation(exc: IntegrityError) -> bool:
+    diag = getattr(exc.__cause__, "diag", None)
+    return getattr(diag, "constraint_name", None) in OVERLAP_CONSTRAINTS
+
+
+def create_booking_atomic(**kwargs):
+    with transaction.atomic(using=router.db_for_write(Booking)):
+        return _create_booking(**kwargs)
+
+
+def _create_booking(
     *,
     user: User | None,
     customer_name: str,
@@ -235,9 +748,9 @@ def create_booking_atomic(
     equipment_quantities: dict[int, int],
     allow_waitlist: bool = True,
 ):
-    court = Court.objects.select_for_update().get(pk=court.pk)
+    using = router.db_for_write(Booking)
 
-    if not is_court_available(court, date, start, end) or not is_coach_available(coach, date, start, end):
+    def waitlist():
         if allow_waitlist:
             WaitlistEntry.objects.create(
                 date=date,
@@ -248,8 +761,19 @@ def create_booking_atomic(
             )
         return None
 
+    # With exclusion constraints the insert itself is the overlap check, so
+    # there is no court lock and no availability query up front
+    constrained = overlap_constraints_enforced(using)
+    if constrained:
+        if coach and not coach_has_window(coach, date, start, end):
+            return waitlist()
+    else:
+        court = Court.objects.select_for_update().get(pk=court.pk)
+        if not is_court_available(court, date, start, end) or not is_coach_available(coach, date, start, end):
+            return waitlist()
+
     equipment_objs = {
-        eq.id: Equipment.objects.select_for_update().get(pk=eq_id)
+        eq.id: Equipment.objects.select_for_update().get(pk=eq_id, venue_id=court.venue_id)
         for eq_id in equipment_quantities.keys()
         for eq in [Equipment(id=eq_id)]
     }
@@ -257,31 +781,29 @@ def create_booking_atomic(
     for eq_id, qty in equipment_quantities.items():
         available = get_equipment_availability(equipment_objs[eq_id], date, start, end)
         if qty > available:
-            if allow_waitlist:
-                WaitlistEntry.objects.create(
-                    date=date,
-                    start_time=start,
-                    end_time=end,
-                    court=court,
-                    customer_name=customer_name,
-                )
-            return None
+            return waitlist()
 
     duration_hours = (end.hour + end.minute / 60) - (start.hour + start.minute / 60)
     base_price = calculate_base_price(court, coach, duration_hours)
     total_price = apply_pricing_rules(date, start, end, court, base_price)
 
-    booking = Booking.objects.create(
-        user=user,
-        customer_name=customer_name,
-        date=date,
-        start_time=start,
-        end_time=end,
-        court=court,
-        coach=coach,
-        total_price=total_price,
-        status=Booking.CONFIRMED,
-    )
+    try:
+        with transaction.atomic(using=using):
+            booking = Booking.objects.create(
+                user=user,
+                customer_name=customer_name,
+                date=date,
+                start_time=start,
+                end_time=end,
+                court=court,
+                coach=coach,
+                total_price=total_price,
+                status=Booking.CONFIRMED,
+            )
+    except IntegrityError as exc:
+        if not (constrained and _is_overlap_violation(exc)):
+            raise
+        return waitlist()
     for eq_id, qty in equipment_quantities.items():
         if qty > 0:
             BookingEquipment.objects.create(
@@ -292,3 +814,32 @@ def create_booking_atomic(
     return booking
 
 
+class IdempotencyKeyReused(Exception):
+    """An idempotency key was sent again with different booking parameters."""
+
+
+def create_booking_once(
+    *, idempotency_key: str, fingerprint: str, user: User, **booking_kwargs
+) -> IdempotencyKey:
+    """
+    Run ``create_booking_atomic`` at most once per (user, key) and return the
+    stored outcome. A concurrent duplicate blocks on the unique key until the
+    first submission commits, then replays its outcome. Raises
+    ``IdempotencyKeyReused`` if the key was first used with another
+    ``fingerprint``.
+    """
+    try:
+        with transaction.atomic(using=router.db_for_write(IdempotencyKey)):
+            record = IdempotencyKey.objects.create(user=user, key=idempotency_key, fingerprint=fingerprint)
+            booking = create_booking_atomic(user=user, **booking_kwargs)
+            record.booking = booking
+            record.outcome = IdempotencyKey.BOOKED if booking else IdempotencyKey.WAITLISTED
+            record.save(update_fields=["booking", "outcome"])
+            return record
+    except IntegrityError:
+        existing = IdempotencyKey.objects.filter(user=user, key=idempotency_key).first()
+        if existing is None:
+            raise
+        if existing.fingerprint != fingerprint:
+            raise IdempotencyKeyReused(idempotency_key)
+        return existing
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import time
+import uuid
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from .models import RequestProfile
+
+PROFILE_PARAM = "_profile"
+PROFILE_HEADER = "X-Profile"
+# Response header carrying the id of the stored profile
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+
+def profile_requested(request) -> bool:
+    """Cheap check made on every request; the staff check only runs when this is true."""
+    return PROFILE_PARAM in request.GET or PROFILE_HEADER in request.headers
+
+
+class QueryRecorder:
+    """``execute_wrapper`` that records every statement with its duration."""
+
+    def __init__(self):
+        self.queries: list[dict] = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                {
+                    "alias": context["connection"].alias,
+                    "sql": sql,
+                    "params": params,
+                    "many": many,
+                    "ms": round((time.perf_counter() - start) * 1000, 3),
+                }
+            )
+
+
+def explain(query: dict) -> str:
+    connection = connections[query["alias"]]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {query['sql']}", query["params"])
+            return "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+    except DatabaseError as exc:
+        return f"EXPLAIN failed: {exc}"
+
+
+def profile_request(request, get_response):
+    """
+    Run ``get_response`` under cProfile with every database statement
+    recorded, store the result as a ``RequestProfile`` and return the
+    response with its id in the ``X-Profile-Id`` header.
+    """
+    recorder = QueryRecorder()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+    duration_ms = (time.perf_counter() - start) * 1000
+
+    # EXPLAIN runs after the recorder is detached so it doesn't profile itself
+    threshold = settings.PROFILING_EXPLAIN_THRESHOLD_MS
+    for query in recorder.queries:
+        if query["ms"] >= threshold and not query["many"] and query["sql"].lstrip().upper().startswith("SELECT"):
+            query["explain"] = explain(query)
+        query["params"] = repr(query["params"])
+
+    root = Path(settings.PROFILING_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    stats_file = f"{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.prof"
+    profiler.dump_stats(root / stats_file)
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(40)
+
+    profile = RequestProfile.objects.create(
+        user=request.user if request.user.is_authenticated else None,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        status_code=response.status_code,
+        duration_ms=round(duration_ms, 3),
+        query_count=len(recorder.queries),
+        query_ms=round(sum(query["ms"] for query in recorder.queries), 3),
+        queries=recorder.queries,
+        summary=summary.getvalue(),
+        stats_file=stats_file,
+    )
+    response[PROFILE_ID_HEADER] = str(profile.pk)
+    return response
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+REPLICA_DB = "replica"
+
+# Set while a read-only view runs and the client is not pinned to the primary.
+_use_replica: ContextVar[bool] = ContextVar("use_replica", default=False)
+# Set when the client carries a pin cookie from a recent write.
+_pinned: ContextVar[bool] = ContextVar("pinned_to_primary", default=False)
+# Set once the current request has written to the primary.
+_wrote: ContextVar[bool] = ContextVar("wrote_to_primary", default=False)
+
+
+def replica_configured() -> bool:
+    return REPLICA_DB in settings.DATABASES
+
+
+@contextmanager
+def use_replica():
+    """
+    Route ORM reads inside the block to the replica, unless the current
+    client is pinned to the primary after a recent write.
+    """
+    token = _use_replica.set(replica_configured() and not (_pinned.get() or _wrote.get()))
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """
+    Route ORM reads inside the block to the primary. For values cached under
+    a version key: the key is bumped as soon as a write commits, while the
+    replica may not have that write yet.
+    """
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def replica_reads(view):
+    """View decorator for read-heavy pages that tolerate replica lag."""
+
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            with use_replica():
+                return await view(request, *args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with use_replica():
+            return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def record_writes(execute, sql, params, many, context):
+    """
+    Connection execute wrapper: any statement that changes data pins the
+    client, so its next reads see its own changes.
+    """
+    if sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+        _wrote.set(True)
+        _use_replica.set(False)
+    return execute(sql, params, many, context)
+
+
+def watch_for_writes(sender, connection, **kwargs):
+    if connection.alias != REPLICA_DB and record_writes not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_writes)
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads to the replica only inside ``use_replica()``; everything else,
+    including all writes and migrations, stays on ``default``.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get():
+            return REPLICA_DB
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Django also asks this for reads that must see the primary
+        # (get_or_create's first get(), select_for_update()), so the write
+        # itself is recorded by record_writes() when the statement runs.
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_DB
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from functools import lru_cache
+
+from django.db import OperationalError, connections
+from django.db.models.expressions import RawSQL
+
+# Tables whose customer_name is indexed for substring search
+SEARCH_TABLES = ("booking_booking", "booking_waitlistentry")
+
+# Shorter terms can't use a trigram index, so they fall back to a plain scan
+MIN_INDEXED_TERM = 3
+
+
+def _fts_table(table: str) -> str:
+    return f"{table}_fts"
+
+
+def _sqlite_statements(table: str) -> list[str]:
+    # External-content FTS5 table with the trigram tokenizer (SQLite 3.34+), so
+    # MATCH finds any substring of three or more characters, case-insensitively.
+    # Triggers keep it in step with every write, including bulk ones.
+    fts = _fts_table(table)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"customer_name, content='{table}', content_rowid='id', tokenize='trigram')",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, customer_name) VALUES (new.id, new.customer_name);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, customer_name) VALUES ('delete', old.id, old.customer_name);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF customer_name ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, customer_name) VALUES ('delete', old.id, old.customer_name);
+            INSERT INTO {fts}(rowid, customer_name) VALUES (new.id, new.customer_name);
+        END
+        """,
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _postgres_index(table: str) -> str:
+    return f"{table}_customer_trgm"
+
+
+def install_search_index(connection) -> None:
+    """
+    Create the customer name search index on ``connection``. PostgreSQL gets
+    a trigram GIN index matching the ``UPPER(...) LIKE`` that ``icontains``
+    compiles to; SQLite gets FTS5 shadow tables. Safe to run repeatedly.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            for table in SEARCH_TABLES:
+                cursor.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {_postgres_index(table)} "
+                    f"ON {table} USING gin (UPPER(customer_name::text) gin_trgm_ops)"
+                )
+        elif connection.vendor == "sqlite":
+            for table in SEARCH_TABLES:
+                if _sqlite_index_installed(cursor, table):
+                    continue
+                try:
+                    for statement in _sqlite_statements(table):
+                        cursor.execute(statement)
+                except OperationalError:
+                    # SQLite without FTS5 or the trigram tokenizer; searches scan instead
+                    return
+        _sqlite_index_ready.cache_clear()
+
+
+def uninstall_search_index(connection) -> None:
+    with connection.cursor() as cursor:
+        for table in SEARCH_TABLES:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {_postgres_index(table)}")
+            elif connection.vendor == "sqlite":
+                fts = _fts_table(table)
+                for suffix in ("ai", "ad", "au"):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+                cursor.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+def _sqlite_index_installed(cursor, table: str) -> bool:
+    # Django rebuilds SQLite tables to alter them, which drops their triggers
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+        [f"{_fts_table(table)}_a_"],
+    )
+    return cursor.fetchone()[0] == 3
+
+
+@lru_cache(maxsize=None)
+def _sqlite_index_ready(alias: str) -> bool:
+    with connections[alias].cursor() as cursor:
+        return all(_sqlite_index_installed(cursor, table) for table in SEARCH_TABLES)
+
+
+def search_customers(queryset, term: str):
+    """
+    Filter ``queryset`` (bookings or waitlist entries) to rows whose
+    customer name contains ``term``, ignoring case, through the search index.
+    """
+    term = term.strip()
+    table = queryset.model._meta.db_table
+    if (
+        connections[queryset.db].vendor == "sqlite"
+        and len(term) >= MIN_INDEXED_TERM
+        and table in SEARCH_TABLES
+        and _sqlite_index_ready(queryset.db)
+    ):
+        fts = _fts_table(table)
+        phrase = '"' + term.replace('"', '""') + '"'
+        return queryset.filter(pk__in=RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [phrase]))
+    # PostgreSQL's trigram index serves icontains directly
+    return queryset.filter(customer_name__icontains=term)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from django.db import connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .archive import archiving
+from .cache import bump_availability_version, bump_pricing_version
+from .events import record_booking_deleted, record_booking_saved, record_waitlisted
+from .ical import refresh_events, sync_booking_event
+from .live import BOOKED, FREED, publish_slot_change
+from .models import (
+    Booking,
+    BookingEquipment,
+    Coach,
+    Court,
+    Equipment,
+    PricingRule,
+    WaitlistEntry,
+    adjust_slot_occupancy,
+)
+from .search import install_search_index
+
+
+def _bump_dates_on_commit(using: str, *venue_dates) -> None:
+    for venue_id, date in {vd for vd in venue_dates if None not in vd}:
+        transaction.on_commit(
+            lambda venue_id=venue_id, date=date: bump_availability_version(venue_id, date), using=using
+        )
+
+
+# Connected before booking_changed so that, after commit, the counters are
+# updated before the availability version bump retires cached quotes
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def count_slot_occupancy(sender, instance: Booking, using, signal, **kwargs):
+    if archiving():
+        return
+    # After commit rather than inside the booking's transaction: the counters
+    # are venue-wide rows, and holding their locks until commit would make
+    # bookings on different courts wait for each other. A counter update lost
+    # to a crash in between is repaired by rebuild_occupancy.
+    for venue_id, date, court_id, start, end, status in _slot_changes(instance, signal):
+        delta = 1 if status == BOOKED else -1
+        transaction.on_commit(
+            lambda venue_id=venue_id, date=date, start=start, end=end, delta=delta: adjust_slot_occupancy(
+                venue_id, date, start, end, delta, using
+            ),
+            using=using,
+            robust=True,
+        )
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_changed(sender, instance: Booking, using, **kwargs):
+    if archiving():
+        return
+    loaded = getattr(instance, "_loaded", {})
+    # A rescheduled booking frees its old date (and venue) as well as taking the new one
+    _bump_dates_on_commit(
+        using, (instance.venue_id, instance.date), (loaded.get("venue_id"), loaded.get("date"))
+    )
+
+
+def _slot_changes(instance: Booking, signal) -> list[tuple]:
+    """
+    ``(venue_id, date, court_id, start, end, BOOKED|FREED)`` for each confirmed
+    slot a save or delete took or released.
+    """
+    current = (instance.venue_id, instance.date, instance.court_id, instance.start_time, instance.end_time)
+    changes = []
+    if signal is post_delete:
+        if instance.status == Booking.CONFIRMED:
+            changes.append((*current, FREED))
+    else:
+        loaded = getattr(instance, "_loaded", None)
+        was_confirmed = loaded is not None and loaded["status"] == Booking.CONFIRMED
+        is_confirmed = instance.status == Booking.CONFIRMED
+        previous = (loaded["venue_id"], loaded["date"], loaded["court_id"], loaded["start_time"], loaded["end_time"]) if loaded else None
+        if was_confirmed and (not is_confirmed or previous != current):
+            changes.append((*previous, FREED))
+        if is_confirmed and (not was_confirmed or previous != current):
+            changes.append((*current, BOOKED))
+    # Nobody books, prices or watches past slots; this also keeps archival runs cheap
+    today = timezone.localdate()
+    return [change for change in changes if change[1] >= today]
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def publish_slot_changes(sender, instance: Booking, using, signal, **kwargs):
+    if archiving():
+        return
+    for change in _slot_changes(instance, signal):
+        transaction.on_commit(lambda change=change: publish_slot_change(*change), using=using)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def update_calendar_event(sender, instance: Booking, using, signal, **kwargs):
+    if archiving():
+        return
+    # Events are stored in the booking's transaction; feed versions are bumped after it commits
+    sync_booking_event(instance, signal is post_delete, using)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def log_booking_events(sender, instance: Booking, using, signal, created=False, **kwargs):
+    if archiving():
+        return
+    if signal is post_delete:
+        record_booking_deleted(instance, using)
+    else:
+        record_booking_saved(instance, created, using)
+
+
+@receiver(post_save, sender=WaitlistEntry)
+def log_waitlisted(sender, instance: WaitlistEntry, using, created, **kwargs):
+    if created:
+        record_waitlisted(instance, using)
+
+
+@receiver(post_save, sender=Court)
+@receiver(post_save, sender=Coach)
+def rename_calendar_events(sender, instance, using, created, update_fields, **kwargs):
+    # Event titles carry the court and coach names; rate or status edits leave them alone
+    if created or (update_fields is not None and "name" not in update_fields):
+        return
+    if "name" in instance.__dict__ and instance.name_changed():
+        refresh_events(Booking.objects.filter(**{sender._meta.model_name: instance}), using)
+
+
+@receiver(post_save, sender=BookingEquipment)
+@receiver(post_delete, sender=BookingEquipment)
+def booking_equipment_changed(sender, instance: BookingEquipment, using, **kwargs):
+    if archiving():
+        return
+    booking = instance.booking
+    _bump_dates_on_commit(using, (booking.venue_id, booking.date))
+
+
+@receiver(post_save, sender=PricingRule)
+@receiver(post_delete, sender=PricingRule)
+@receiver(post_save, sender=Court)
+@receiver(post_delete, sender=Court)
+@receiver(post_save, sender=Coach)
+@receiver(post_delete, sender=Coach)
+@receiver(post_save, sender=Equipment)
+@receiver(post_delete, sender=Equipment)
+def pricing_inputs_changed(sender, instance, using, **kwargs):
+    transaction.on_commit(lambda: bump_pricing_version(instance.venue_id), using=using)
+
+
+@receiver(post_migrate)
+def repair_search_index(sender, using, **kwargs):
+    # SQLite table rebuilds in later migrations drop the search triggers
+    if sender.label != "booking" or connections[using].vendor != "sqlite":
+        return
+    applied = MigrationRecorder(connections[using]).applied_migrations()
+    if ("booking", "0011_customer_search_index") in applied:
+        install_search_index(connections[using])
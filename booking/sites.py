@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+
+from .archive import confirmed_revenue
+from .models import Booking, Coach, Court, Equipment, WaitlistEntry
+from .routers import replica_reads
+
+User = get_user_model()
+
+
+# Custom admin dashboard view, installed as admin.site by badminton_booking.apps
+class CustomAdminSite(admin.AdminSite):
+    site_header = "Badminton Booking Administration"
+    site_title = "Badminton Booking Admin"
+    index_title = "Dashboard"
+    
+    @method_decorator(replica_reads)
+    def index(self, request, extra_context=None):
+        # Get dashboard data
+        today = timezone.now().date()
+        week_start = today - timedelta(days=today.weekday())
+        month_start = today.replace(day=1)
+        
+        # Recent bookings
+        recent_bookings = Booking.objects.select_related('court').order_by('-created_at')[:5]
+        
+        # User statistics
+        user_count = User.objects.count()
+        active_users_today = User.objects.filter(last_login__date=today).count()
+        
+        # Revenue data, including bookings that have moved to the archive
+        revenue_today = confirmed_revenue(today, today)
+        revenue_week = confirmed_revenue(week_start, today)
+        revenue_month = confirmed_revenue(month_start, today)
+        
+        # System status
+        court_count = Court.objects.filter(is_active=True).count()
+        equipment_count = Equipment.objects.filter(is_active=True).count()
+        coach_count = Coach.objects.filter(is_active=True).count()
+        waitlist_count = WaitlistEntry.objects.count()
+        
+        extra_context = extra_context or {}
+        extra_context.update({
+            'booking_list': recent_bookings,
+            'user_count': user_count,
+            'active_users_today': active_users_today,
+            'revenue_today': revenue_today,
+            'revenue_week': revenue_week,
+            'revenue_month': revenue_month,
+            'court_count': court_count,
+            'equipment_count': equipment_count,
+            'coach_count': coach_count,
+            'waitlist_count': waitlist_count,
+        })
+        
+        return super().index(request, extra_context)
@@ -0,0 +1,59 @@
+from functools import lru_cache
+from pathlib import PurePosixPath
+
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.forms.utils import flatatt
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+# Best compression first: browsers take the first <source> they support
+IMAGE_FORMATS = ("avif", "webp")
+
+
+def variant_path(path: str, width: int, fmt: str) -> str:
+    stem = PurePosixPath(path).with_suffix("")
+    return f"responsive/{stem}-{width}w.{fmt}"
+
+
+@lru_cache(maxsize=None)
+def _available_variants(path: str) -> tuple[tuple[str, tuple[tuple[str, int], ...]], ...]:
+    """Variants built by ``build_responsive_images``, looked up once per process."""
+    sources = []
+    for fmt in IMAGE_FORMATS:
+        candidates = tuple(
+            (variant_path(path, width, fmt), width)
+            for width in settings.RESPONSIVE_IMAGE_WIDTHS
+            if finders.find(variant_path(path, width, fmt))
+        )
+        if candidates:
+            sources.append((fmt, candidates))
+    return tuple(sources)
+
+
+@register.simple_tag
+def responsive_image(path, alt, sizes="100vw", loading="lazy", **attrs):
+    """
+    Render a <picture> with AVIF/WebP ``srcset`` candidates for ``path`` and
+    the original as fallback. Falls back to a plain <img> when no variants
+    have been built.
+    """
+    sources = format_html_join(
+        "",
+        '<source type="image/{}" srcset="{}" sizes="{}">',
+        (
+            (fmt, ", ".join(f"{static(variant)} {width}w" for variant, width in candidates), sizes)
+            for fmt, candidates in _available_variants(path)
+        ),
+    )
+    img_attrs = {"loading": loading, "decoding": "async", **attrs}
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}"{}></picture>',
+        sources,
+        static(path),
+        alt,
+        flatatt(img_attrs),
+    )
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+# Slower CI machines can stretch every wall-clock budget, e.g. PERF_BUDGET_MULTIPLIER=3
+BUDGET_MULTIPLIER = float(os.getenv("PERF_BUDGET_MULTIPLIER", "1"))
+
+# Pages render {% static %} without collectstatic having built a manifest
+plain_static_files = override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+    WHITENOISE_AUTOREFRESH=True,
+)
+
+
+class PerformanceAssertions:
+    """Mixin for ``TestCase`` classes asserting query counts and timings."""
+
+    @contextmanager
+    def assertMaxQueries(self, limit: int, using: str = "default"):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > limit:
+            queries = "\n".join(f"{index}. {query['sql']}" for index, query in enumerate(context.captured_queries, 1))
+            self.fail(f"{executed} queries executed, at most {limit} expected:\n{queries}")
+
+    def assertWithinBudget(self, seconds: float, func, *args, repeat: int = 3, **kwargs):
+        """Best of ``repeat`` runs of ``func`` must finish within ``seconds``; returns its result."""
+        budget = seconds * BUDGET_MULTIPLIER
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func(*args, **kwargs)
+            best = min(best, time.perf_counter() - started)
+        if best > budget:
+            self.fail(f"{getattr(func, '__qualname__', func)} took {best * 1000:.1f} ms, budget {budget * 1000:.1f} ms")
+        return result
@@ -0,0 +1,158 @@
+"""
+Scaled test data. ``build_venue`` fills one venue with courts, coaches,
+rules and a booking density per day, through ``bulk_create`` so that even
+large scales build in seconds. Query-count tests run at a scale where an
+N+1 would add dozens of queries; budget tests use larger ones.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass, field
+from datetime import date as date_type
+from datetime import time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from booking.ical import refresh_events
+from booking.models import (
+    CLOSING_HOUR,
+    OPENING_HOUR,
+    Booking,
+    BookingEquipment,
+    Coach,
+    CoachAvailability,
+    Court,
+    Equipment,
+    PricingRule,
+    Venue,
+    WaitlistEntry,
+    rebuild_slot_occupancy,
+)
+
+User = get_user_model()
+
+
+@dataclass(frozen=True)
+class Scale:
+    courts: int = 8
+    coaches: int = 3
+    equipment: int = 3
+    users: int = 5
+    # Days of bookings, centred on today so there is both history and upcoming demand
+    days: int = 14
+    # Share of court-hours booked
+    occupancy: float = 0.5
+    waitlist_per_day: int = 2
+
+
+@dataclass
+class VenueData:
+    venue: Venue
+    courts: list[Court]
+    coaches: list[Coach]
+    equipment: list[Equipment]
+    rules: list[PricingRule]
+    users: list = field(default_factory=list)
+    first_day: date_type | None = None
+    last_day: date_type | None = None
+
+
+def build_venue(scale: Scale = Scale(), *, slug: str = "main", seed: int = 0) -> VenueData:
+    rnd = random.Random(seed)
+    venue = Venue.objects.create(name=slug.title(), slug=slug)
+    courts = Court.objects.bulk_create(
+        Court(
+            venue=venue,
+            name=f"Court {index + 1}",
+            court_type=Court.INDOOR if index % 2 == 0 else Court.OUTDOOR,
+            hourly_rate=400 + 50 * (index % 3),
+        )
+        for index in range(scale.courts)
+    )
+    coaches = Coach.objects.bulk_create(
+        Coach(venue=venue, name=f"Coach {index + 1}", hourly_rate=300) for index in range(scale.coaches)
+    )
+    equipment = Equipment.objects.bulk_create(
+        Equipment(venue=venue, name=f"Racket set {index + 1}", total_quantity=20, rental_price=50)
+        for index in range(scale.equipment)
+    )
+    rules = [
+        PricingRule.objects.create(
+            venue=venue,
+            name="Peak hours",
+            rule_type=PricingRule.PEAK_HOUR,
+            percentage_adjustment=30,
+            peak_start=time(18),
+            peak_end=time(21),
+        ),
+        PricingRule.objects.create(venue=venue, name="Weekend", rule_type=PricingRule.WEEKEND, percentage_adjustment=20),
+        PricingRule.objects.create(
+            venue=venue, name="Indoor", rule_type=PricingRule.INDOOR_PREMIUM, percentage_adjustment=15
+        ),
+        PricingRule.objects.create(
+            venue=venue,
+            name="High demand",
+            rule_type=PricingRule.DEMAND,
+            percentage_adjustment=25,
+            occupancy_threshold=80,
+        ),
+    ]
+    users = [
+        User.objects.create_user(username=f"{slug}-player-{index}", password="password")
+        for index in range(scale.users)
+    ]
+
+    first_day = timezone.localdate() - timedelta(days=scale.days // 2)
+    days = [first_day + timedelta(days=offset) for offset in range(scale.days)]
+    bookings = []
+    for day in days:
+        for court in courts:
+            for hour in range(OPENING_HOUR, CLOSING_HOUR):
+                if rnd.random() >= scale.occupancy:
+                    continue
+                coach = rnd.choice(coaches) if coaches and rnd.random() < 0.1 else None
+                bookings.append(
+                    Booking(
+                        venue=venue,
+                        user=rnd.choice(users) if users else None,
+                        customer_name=f"Player {rnd.randrange(10_000)}",
+                        date=day,
+                        start_time=time(hour),
+                        end_time=time(hour + 1),
+                        court=court,
+                        coach=coach,
+                        total_price=float(court.hourly_rate) + (300 if coach else 0),
+                        status=Booking.CONFIRMED if rnd.random() < 0.95 else Booking.CANCELLED,
+                    )
+                )
+    bookings = Booking.objects.bulk_create(bookings, batch_size=2000)
+    if equipment:
+        BookingEquipment.objects.bulk_create(
+            (
+                BookingEquipment(booking=booking, equipment=rnd.choice(equipment), quantity=rnd.randint(1, 2))
+                for booking in bookings[::5]
+            ),
+            batch_size=2000,
+        )
+    CoachAvailability.objects.bulk_create(
+        CoachAvailability(coach=coach, date=day, start_time=time(8), end_time=time(20))
+        for coach in coaches
+        for day in days
+    )
+    WaitlistEntry.objects.bulk_create(
+        WaitlistEntry(
+            date=day,
+            start_time=time(18),
+            end_time=time(19),
+            court=rnd.choice(courts),
+            customer_name=f"Waiting {index}",
+        )
+        for day in days
+        for index in range(scale.waitlist_per_day)
+    )
+    # bulk_create skips the signal handlers that maintain the demand counters and calendar feeds
+    rebuild_slot_occupancy(venue.id, days)
+    refresh_events(Booking.objects.filter(venue=venue))
+    return VenueData(venue, courts, coaches, equipment, rules, users, days[0], days[-1])
@@ -0,0 +1,140 @@
+"""
+Wall-clock budgets for the hot paths. Each budget is tens of times what the
+code takes on a developer laptop, and none is below 100 ms, so scheduler
+and I/O jitter on a shared CI runner stay well inside it and only an
+algorithmic regression (a loop where there was a vector operation, a query
+per row) trips it. Set PERF_BUDGET_MULTIPLIER to stretch them on slow
+machines.
+"""
+
+from __future__ import annotations
+
+from datetime import date, time, timedelta
+
+import numpy as np
+from django.test import TestCase
+
+from booking.analytics import SLOT_COUNT, compute_utilization, load_bookings
+from booking.archive import user_booking_history
+from booking.backtest import Bookings, price_factors
+from booking.models import (
+    CLOSING_HOUR,
+    OPENING_HOUR,
+    Booking,
+    Court,
+    PricingRule,
+    apply_pricing_rules,
+    build_price_matrix,
+    create_booking_atomic,
+    hourly_occupancy,
+)
+from booking.search import search_customers
+from booking.tests.base import PerformanceAssertions
+from booking.tests.factories import Scale, build_venue
+from booking.views import _hourly_slots
+
+
+class PricingBudgetTests(PerformanceAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Feed versions are bumped on commit, which the test transaction never does
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.data = build_venue(Scale(courts=30, days=7, occupancy=0.5))
+        cls.day = cls.data.first_day + timedelta(days=4)
+        cls.rules = list(PricingRule.objects.filter(venue=cls.data.venue, is_active=True))
+
+    def test_price_matrix(self):
+        occupancy = hourly_occupancy(self.data.venue.id, self.day)
+        matrix = self.assertWithinBudget(
+            0.1, build_price_matrix, self.day, self.data.courts, self.data.coaches[0], self.rules, _hourly_slots(), occupancy
+        )
+        self.assertEqual(len(matrix), 30)
+        self.assertEqual(len(matrix[self.data.courts[0].id]), CLOSING_HOUR - OPENING_HOUR)
+
+    def test_apply_pricing_rules(self):
+        self.assertWithinBudget(
+            0.25, apply_pricing_rules, self.day, time(18), time(20), self.data.courts[0], 800.0, repeat=5
+        )
+
+    def test_create_booking(self):
+        day = self.data.last_day + timedelta(days=1)
+        hours = iter(range(OPENING_HOUR, CLOSING_HOUR))
+
+        def book():
+            hour = next(hours)
+            return create_booking_atomic(
+                user=self.data.users[0],
+                customer_name="Budget",
+                date=day,
+                start=time(hour),
+                end=time(hour + 1),
+                court=self.data.courts[0],
+                coach=None,
+                equipment_quantities={self.data.equipment[0].id: 1},
+            )
+
+        booking = self.assertWithinBudget(0.25, book)
+        self.assertIsInstance(booking, Booking)
+
+    def test_customer_search(self):
+        search_customers(Booking.objects.all(), "Player 1")
+        rows = self.assertWithinBudget(0.25, lambda: list(search_customers(Booking.objects.all(), "Player 12")[:20]))
+        self.assertTrue(rows)
+
+    def test_booking_history(self):
+        bookings = self.assertWithinBudget(0.25, user_booking_history, self.data.users[0])
+        self.assertEqual(len(bookings), 50)
+
+    def test_load_bookings(self):
+        columns = self.assertWithinBudget(0.2, load_bookings, self.data.venue, self.data.first_day, self.data.last_day)
+        confirmed = Booking.objects.filter(venue=self.data.venue, status=Booking.CONFIRMED).count()
+        self.assertEqual(len(columns["day"]), confirmed)
+
+
+class VectorizedBudgetTests(PerformanceAssertions, TestCase):
+    """Array code measured on synthetic columns far larger than a fixture could hold."""
+
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def synthetic_columns(self, rows: int, courts: int, first: date, days: int) -> dict[str, np.ndarray]:
+        start = self.rng.integers(OPENING_HOUR, CLOSING_HOUR - 1, rows) * 60
+        return {
+            "court_id": self.rng.integers(1, courts + 1, rows),
+            "coach_pk": np.zeros(rows, dtype=np.int64),
+            "day": first.toordinal() + self.rng.integers(0, days, rows),
+            "start": start,
+            "end": start + 60 * self.rng.integers(1, 3, rows),
+            "price": self.rng.uniform(400, 900, rows),
+        }
+
+    def test_utilization_year(self):
+        first = date(2025, 1, 1)
+        courts = [Court(id=index + 1, name=f"Court {index + 1}", hourly_rate=500) for index in range(30)]
+        columns = self.synthetic_columns(100_000, 30, first, 365)
+        result = self.assertWithinBudget(0.5, compute_utilization, columns, courts, first, date(2025, 12, 31))
+        self.assertEqual(result.occupancy.shape, (30, 365, SLOT_COUNT))
+        self.assertEqual(result.weekday_slot_utilization().shape, (7, SLOT_COUNT))
+
+    def test_backtest_million_bookings(self):
+        rows = 1_000_000
+        columns = self.synthetic_columns(rows, 30, date(2020, 1, 1), 5 * 365)
+        bookings = Bookings(
+            day=columns["day"],
+            start=columns["start"],
+            end=columns["end"],
+            court=columns["court_id"] - 1,
+            court_type=columns["court_id"] % 2,
+            base_price=columns["price"],
+            recorded=columns["price"],
+            occupancy=self.rng.uniform(0, 1, rows),
+        )
+        rules = [
+            PricingRule(rule_type=PricingRule.PEAK_HOUR, percentage_adjustment=30, peak_start=time(18), peak_end=time(21)),
+            PricingRule(rule_type=PricingRule.WEEKEND, percentage_adjustment=20),
+            PricingRule(rule_type=PricingRule.INDOOR_PREMIUM, percentage_adjustment=15),
+            PricingRule(rule_type=PricingRule.DEMAND, percentage_adjustment=25, occupancy_threshold=80),
+        ]
+        factors = self.assertWithinBudget(1.0, price_factors, rules, bookings)
+        self.assertEqual(len(factors), rows)
+        self.assertGreaterEqual(factors.min(), 1.0)
@@ -0,0 +1,173 @@
+"""
+Races on ``create_booking_atomic``: many threads, each on its own database
+connection, released together against the same court, coach or equipment.
+Whatever the interleaving, no two overlapping confirmed bookings may be
+committed and equipment may never be rented beyond its stock; the losers
+end up on the waitlist. SQLite reports contention as "database is locked",
+which the threads retry as a client would.
+"""
+
+from __future__ import annotations
+
+import threading
+import time as clock
+from datetime import time, timedelta
+from itertools import combinations
+
+from django.db import OperationalError, connections
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from booking.events import read_events
+from booking.models import (
+    Booking,
+    BookingEquipment,
+    BookingEvent,
+    CoachAvailability,
+    SlotOccupancy,
+    WaitlistEntry,
+    create_booking_atomic,
+)
+from booking.tests.factories import Scale, build_venue
+
+THREADS = 8
+RETRIES = 50
+
+
+def book_with_retries(**kwargs):
+    for attempt in range(RETRIES):
+        try:
+            return create_booking_atomic(**kwargs)
+        except OperationalError:
+            clock.sleep(0.005 * (attempt + 1))
+    raise AssertionError(f"Booking still contended after {RETRIES} attempts")
+
+
+def run_concurrently(calls: list[dict]) -> list:
+    """Call ``book_with_retries`` with each kwargs dict from its own thread, all released at once."""
+    barrier = threading.Barrier(len(calls))
+    results = [None] * len(calls)
+    errors = []
+
+    def worker(index, kwargs):
+        try:
+            barrier.wait()
+            results[index] = book_with_retries(**kwargs)
+        except BaseException as exc:
+            errors.append(exc)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=item) for item in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+class CreateBookingRaceTests(TransactionTestCase):
+    def setUp(self):
+        self.data = build_venue(Scale(courts=3, coaches=1, equipment=1, users=1, days=1, occupancy=0, waitlist_per_day=0))
+        self.day = timezone.localdate() + timedelta(days=3)
+        self.court = self.data.courts[0]
+
+    def request(self, index, start, end, court=None, coach=None, equipment=None):
+        return {
+            "user": None,
+            "customer_name": f"Racer {index}",
+            "date": self.day,
+            "start": start,
+            "end": end,
+            "court": court or self.court,
+            "coach": coach,
+            "equipment_quantities": equipment or {},
+        }
+
+    def assertNoOverlap(self, bookings):
+        for first, second in combinations(bookings, 2):
+            self.assertFalse(
+                first.start_time < second.end_time and second.start_time < first.end_time,
+                f"{first.customer_name} {first.start_time}-{first.end_time} overlaps "
+                f"{second.customer_name} {second.start_time}-{second.end_time}",
+            )
+
+    def confirmed(self, **filters):
+        return list(Booking.objects.filter(status=Booking.CONFIRMED, date=self.day, **filters))
+
+    def test_same_slot(self):
+        results = run_concurrently([self.request(index, time(18), time(19)) for index in range(THREADS)])
+        self.assertEqual(sum(isinstance(result, Booking) for result in results), 1)
+        self.assertEqual(len(self.confirmed(court=self.court)), 1)
+        self.assertEqual(WaitlistEntry.objects.filter(date=self.day, court=self.court).count(), THREADS - 1)
+
+    def test_event_log(self):
+        run_concurrently([self.request(index, time(18), time(19)) for index in range(THREADS)])
+        events = list(BookingEvent.objects.filter(date=self.day))
+        kinds = [event.kind for event in events]
+        self.assertEqual(kinds.count(BookingEvent.CREATED), 1)
+        self.assertEqual(kinds.count(BookingEvent.WAITLISTED), THREADS - 1)
+        # Every event is numbered once its writer commits, and readable straight away
+        sequences = [event.sequence for event in events]
+        self.assertNotIn(None, sequences)
+        self.assertEqual(sequences, list(range(sequences[0], sequences[0] + len(sequences))))
+        self.assertEqual([event.sequence for event in read_events(sequences[0] - 1)], sequences)
+
+    def test_overlapping_slots(self):
+        # Staggered half-hour starts, every request overlapping its neighbours
+        starts = [time(16 + index // 2, 30 * (index % 2)) for index in range(THREADS)]
+        calls = [
+            self.request(index, start, time(start.hour + 1, start.minute)) for index, start in enumerate(starts)
+        ]
+        results = run_concurrently(calls)
+        bookings = self.confirmed(court=self.court)
+        self.assertTrue(bookings)
+        self.assertEqual(len(bookings), sum(isinstance(result, Booking) for result in results))
+        self.assertNoOverlap(bookings)
+
+    def test_occupancy_counters(self):
+        calls = [self.request(index, time(10), time(12), court=self.data.courts[index % 3]) for index in range(THREADS)]
+        run_concurrently(calls)
+        counters = dict(
+            SlotOccupancy.objects.filter(venue=self.data.venue, date=self.day).values_list("hour", "booked")
+        )
+        # Applied after each commit, yet no count is lost to the race
+        self.assertEqual(counters, {10: 3, 11: 3})
+
+    def test_coach_across_courts(self):
+        coach = self.data.coaches[0]
+        CoachAvailability.objects.create(coach=coach, date=self.day, start_time=time(8), end_time=time(20))
+        calls = [
+            self.request(index, time(10), time(11), court=self.data.courts[index % 3], coach=coach)
+            for index in range(THREADS)
+        ]
+        run_concurrently(calls)
+        self.assertEqual(len(self.confirmed(coach=coach)), 1)
+
+    def test_equipment_stock(self):
+        equipment = self.data.equipment[0]
+        # 20 in stock; up to three courts an hour each asking for 8 can't all be served
+        calls = [
+            self.request(
+                index,
+                time(12 + index // 3),
+                time(13 + index // 3),
+                court=self.data.courts[index % 3],
+                equipment={equipment.id: 8},
+            )
+            for index in range(THREADS)
+        ]
+        run_concurrently(calls)
+        for hour in range(12, 15):
+            rented = BookingEquipment.objects.filter(
+                equipment=equipment,
+                booking__status=Booking.CONFIRMED,
+                booking__date=self.day,
+                booking__start_time=time(hour),
+            ).values_list("quantity", flat=True)
+            self.assertTrue(rented)
+            self.assertLessEqual(sum(rented), equipment.total_quantity)
+        for court in self.data.courts:
+            self.assertNoOverlap(self.confirmed(court=court))
@@ -0,0 +1,173 @@
+"""
+Upper bounds on the queries each page runs. The fixture has enough courts,
+bookings and history that an N+1 anywhere adds dozens of queries, so a
+regression fails here instead of shipping. When a change legitimately
+needs another query, raise the bound in the same commit and say why.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from booking.changelist import with_date_range_dates
+from booking.ical import feed_url, rotate_feed_secret
+from booking.middleware import PIN_COOKIE
+from booking.models import Booking, CalendarFeed
+from booking.tests.base import PerformanceAssertions, plain_static_files
+from booking.tests.factories import Scale, build_venue
+from booking.warmup import warm_venue
+
+
+@plain_static_files
+class ViewQueryCountTests(PerformanceAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Feed versions are bumped on commit, which the test transaction never does
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.data = build_venue(Scale(courts=12, days=21, occupancy=0.6, users=3))
+        cls.day = cls.data.first_day + timedelta(days=10)
+        cls.player = cls.data.users[0]
+        cls.staff = get_user_model().objects.create_superuser("staff", "staff@example.com", "password")
+
+    def setUp(self):
+        # Quotes and grid fragments are cached; every test measures a cold request
+        cache.clear()
+
+    def get(self, name, **params):
+        return self.client.get(reverse(name), {"venue": self.data.venue.slug, **params})
+
+    def test_availability(self):
+        # venue, versions, courts, bookings, rules, occupancy counters and court count, venue list
+        with self.assertMaxQueries(9):
+            response = self.get("booking:availability", date=self.day.isoformat())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["court_grid"]), 12)
+
+    def test_availability_fragments_cached(self):
+        self.get("booking:availability", date=self.day.isoformat())
+        # venue, courts, venue list: every grid comes from the fragment cache
+        with self.assertMaxQueries(3) as context:
+            response = self.get("booking:availability", date=self.day.isoformat())
+        self.assertTrue(all(court["fragment"] for court in response.context["court_grid"]))
+        tables = " ".join(query["sql"] for query in context.captured_queries)
+        for table in ("booking_booking", "booking_pricingrule", "booking_slotoccupancy"):
+            self.assertNotIn(table, tables)
+
+    def test_warmed_venue(self):
+        warm_venue(self.data.venue, self.day)
+        with self.assertMaxQueries(3):
+            response = self.get("booking:availability", date=self.day.isoformat())
+        self.assertTrue(all(court["fragment"] for court in response.context["court_grid"]))
+        # venue; the quote itself is cached
+        params = {"date": self.day.isoformat(), "start_time": "18:00", "end_time": "19:00", "court": self.data.courts[0].id}
+        with self.assertMaxQueries(1):
+            self.assertNotIn("error", self.get("booking:pricing_quote", **params).json())
+
+    def test_pricing_quote(self):
+        params = {
+            "date": self.day.isoformat(),
+            "start_time": "18:00",
+            "end_time": "20:00",
+            "court": self.data.courts[0].id,
+            "coach": self.data.coaches[0].id,
+            f"equipment_{self.data.equipment[0].id}": "2",
+        }
+        with self.assertMaxQueries(9):
+            response = self.get("booking:pricing_quote", **params)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("error", response.json())
+        # A repeat is answered from the quote cache
+        with self.assertMaxQueries(1):
+            self.get("booking:pricing_quote", **params)
+
+    def test_price_matrix(self):
+        with self.assertMaxQueries(5):
+            response = self.get("booking:price_matrix", date=self.day.isoformat())
+        self.assertEqual(len(response.json()["courts"]), 12)
+
+    def test_booking_history(self):
+        self.client.force_login(self.player)
+        # session, user, bookings with their courts and coaches in one query, calendar link secret
+        with self.assertMaxQueries(4):
+            response = self.client.get(reverse("booking:booking_history"))
+        self.assertEqual(len(response.context["bookings"]), 50)
+        # Reading the calendar link secret back is not a write, so it must not pin the client.
+        response = self.client.get(reverse("booking:booking_history"))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_booking_form(self):
+        self.client.force_login(self.player)
+        with self.assertMaxQueries(6):
+            response = self.get("booking:create_booking")
+        self.assertEqual(response.status_code, 200)
+
+    def test_customer_lookup(self):
+        self.client.force_login(self.staff)
+        # The first search of a process also checks that the search index is installed
+        self.client.get(reverse("booking:customer_lookup"), {"q": "Player 2"})
+        with self.assertMaxQueries(4):
+            response = self.client.get(reverse("booking:customer_lookup"), {"q": "Player 1"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_calendar_feed(self):
+        url = feed_url(CalendarFeed.COURT, self.data.courts[0].id)
+        # feed version, court name, stored events
+        with self.assertMaxQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response["Content-Type"], "text/calendar; charset=utf-8")
+        # Calendar apps polling with the ETag only cost the version lookup
+        with self.assertMaxQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        # A revoked link stops working at once
+        rotate_feed_secret(CalendarFeed.COURT, self.data.courts[0].id)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_admin_index(self):
+        self.client.force_login(self.staff)
+        # session, user, then the dashboard figures
+        with self.assertMaxQueries(16):
+            response = self.client.get(reverse("admin:index"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["booking_list"]), 5)
+
+    def test_booking_changelist(self):
+        self.client.force_login(self.staff)
+        with self.assertMaxQueries(10):
+            response = self.client.get(reverse("admin:booking_booking_changelist"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_changelist_dates(self):
+        bookings = Booking.objects.all()
+        # Leave empty months between the fixture's bookings and this one
+        later = bookings.order_by("-date").first()
+        later.pk = None
+        later.date += timedelta(days=100)
+        later.save()
+        for kind in ("year", "month"):
+            with self.assertMaxQueries(6):
+                dates = with_date_range_dates(bookings).dates("date", kind, order="DESC")
+            self.assertEqual(dates, list(bookings.dates("date", kind, order="DESC")))
+
+    def test_waitlist_changelist(self):
+        self.client.force_login(self.staff)
+        with self.assertMaxQueries(8):
+            response = self.client.get(reverse("admin:booking_waitlistentry_changelist"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_utilization_report(self):
+        self.client.force_login(self.staff)
+        params = {
+            "venue": self.data.venue.id,
+            "date_from": self.data.first_day.isoformat(),
+            "date_to": self.data.last_day.isoformat(),
+        }
+        # Hot and archived bookings are one query each, however long the range
+        with self.assertMaxQueries(9):
+            response = self.client.get(reverse("admin:booking_booking_utilization"), params)
+        self.assertEqual(len(response.context["court_rows"]), 12)
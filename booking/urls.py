@@ -7,9 +7,15 @@ app_name = "booking"
 urlpatterns = [
     path("", views.home, name="home"),
     path("availability/", views.availability_view, name="availability"),
+    path("availability/stream/", views.availability_stream_view, name="availability_stream"),
     path("book/", views.create_booking_view, name="create_booking"),
     path("bookings/", views.booking_history_view, name="booking_history"),
+    path("bookings/calendar/reset/", views.reset_calendar_feed_view, name="reset_calendar_feed"),
     path("pricing-quote/", views.pricing_quote_view, name="pricing_quote"),
+    path("pricing-matrix/", views.price_matrix_view, name="price_matrix"),
+    path("staff/customers/", views.customer_lookup_view, name="customer_lookup"),
+    path("staff/booking-events/", views.booking_events_view, name="booking_events"),
+    path("calendar/<str:scope>/<int:object_id>/<str:token>.ics", views.calendar_feed_view, name="calendar_feed"),
 
     # Auth
     path("signup/", views.signup_view, name="signup"),
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.http import Http404
+
+from .models import Venue
+
+
+def resolve_venue(slug: str | None) -> Venue | None:
+    """
+    The active venue with ``slug``, or the first active venue when no slug
+    is given. ``None`` only when no venue is open at all.
+    """
+    venues = Venue.objects.filter(is_active=True)
+    if not slug:
+        return venues.order_by("id").first()
+    try:
+        return venues.get(slug=slug)
+    except Venue.DoesNotExist:
+        raise Http404(f"Unknown venue {slug!r}") from None
+
+
+async def aresolve_venue(slug: str | None) -> Venue | None:
+    venues = Venue.objects.filter(is_active=True)
+    if not slug:
+        return await venues.order_by("id").afirst()
+    try:
+        return await venues.aget(slug=slug)
+    except Venue.DoesNotExist:
+        raise Http404(f"Unknown venue {slug!r}") from None
+
+
+def _venue_slug(request) -> str | None:
+    if request.method == "POST":
+        return request.POST.get("venue") or request.GET.get("venue")
+    return request.GET.get("venue")
+
+
+def venue_scoped(view):
+    """
+    View decorator that resolves ``request.venue`` from the ``venue``
+    parameter.
+    """
+
+    if iscoroutinefunction(view):
+
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            request.venue = await aresolve_venue(_venue_slug(request))
+            return await view(request, *args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        request.venue = resolve_venue(_venue_slug(request))
+        return view(request, *args, **kwargs)
+
+    return wrapper
@@ -1,43 +1,153 @@
 from __future__ import annotations
 
-from datetime import datetime
+import hashlib
+import json
+import uuid
+from datetime import datetime, time, timedelta
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import login, logout
 from django.contrib.auth.forms import AuthenticationForm
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q, Sum
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.dateformat import time_format
+from django.utils.http import http_date
+from django.views.decorators.http import require_POST, require_safe
 
 from .forms import AvailabilitySearchForm, BookingForm, SignUpForm
 from .models import (
+    CLOSING_HOUR,
+    OPENING_HOUR,
     Booking,
+    BookingEquipment,
+    CalendarFeed,
     Coach,
     Court,
     Equipment,
-    apply_pricing_rules,
-    calculate_base_price,
-    get_equipment_availability,
-    is_coach_available,
-    is_court_available,
+    IdempotencyKey,
+    IdempotencyKeyReused,
+    PricingRule,
+    Venue,
+    WaitlistEntry,
+    ahourly_occupancy,
+    build_price_matrix,
     create_booking_atomic,
+    create_booking_once,
+    rule_applies,
 )
+from .archive import user_booking_history
+from .cache import cached_quote, grid_versions, quote_cache_key
+from .events import MAX_PAGE, read_events, serialize_event
+from .ical import FEED_SCOPES, feed_etag, feed_state, feed_token, feed_url, render_feed, rotate_feed_secret
+from .live import get_broker
+from .routers import replica_reads, use_primary
+from .search import search_customers
+from .venues import resolve_venue, venue_scoped
+
+
+# Seconds a rendered per-court slot grid is reused; version bumps retire it sooner
+SLOT_FRAGMENT_TTL = 600
+
+# Matches returned per table by the staff customer lookup
+CUSTOMER_LOOKUP_LIMIT = 20
+
+# Default page size of the booking event feed
+BOOKING_EVENTS_PAGE = 500
+
+
+def _hourly_slots() -> list[tuple[time, time]]:
+    return [(time(hour), time(hour + 1)) for hour in range(OPENING_HOUR, CLOSING_HOUR)]
+
+
+async def _alist(queryset) -> list:
+    return [obj async for obj in queryset]
 
 
 def home(request: HttpRequest) -> HttpResponse:
     return redirect("booking:availability")
 
 
-def availability_view(request: HttpRequest) -> HttpResponse:
+async def _court_grid(venue, date, courts) -> list[dict]:
+    """Every court's hourly slots for ``date``, with availability and price."""
+    # One query for the courts and one for the day's bookings, instead of one per slot.
+    # The async ORM runs each query on the request's one database thread, so they run
+    # one after another; what matters is that there are four of them.
+    bookings = Booking.objects.filter(venue=venue, date=date, status=Booking.CONFIRMED, court__in=courts)
+    court_list = await _alist(courts.order_by("name"))
+    booked = await _alist(bookings.values_list("court_id", "start_time", "end_time"))
+    rules = await _alist(PricingRule.objects.filter(venue=venue, is_active=True))
+    occupancy = await ahourly_occupancy(venue.id, date)
+    booked_by_court: dict[int, list[tuple]] = {}
+    for court_id, booked_start, booked_end in booked:
+        booked_by_court.setdefault(court_id, []).append((booked_start, booked_end))
+
+    hourly_slots = _hourly_slots()
+    prices = build_price_matrix(date, court_list, None, rules, hourly_slots, occupancy)
+    # Formatting and URL reversing happen once per hour, not once per card
+    book_url = reverse("booking:create_booking")
+    hour_cells = [
+        (
+            f"{time_format(start, 'g:i a')} - {time_format(end, 'g:i a')}",
+            f"{book_url}?venue={venue.slug}&date={date.isoformat()}&start={start}&end={end}&court=",
+        )
+        for start, end in hourly_slots
+    ]
+    court_grid = []
+    for court in court_list:
+        court_bookings = booked_by_court.get(court.id, ())
+        court_slots = []
+        for (label, book_href), (start, end), price in zip(hour_cells, hourly_slots, prices[court.id]):
+            available = not any(
+                booked_start < end and booked_end > start for booked_start, booked_end in court_bookings
+            )
+            court_slots.append(
+                {
+                    "label": label,
+                    "start": start.strftime("%H:%M"),
+                    "book_href": f"{book_href}{court.id}",
+                    "available": available,
+                    "price": price,
+                }
+            )
+        court_grid.append(
+            {
+                "id": court.id,
+                "name": court.name,
+                "court_type": court.court_type,
+                "court_type_label": court.get_court_type_display(),
+                "slots": court_slots,
+            }
+        )
+    return court_grid
+
+
+@replica_reads
+@venue_scoped
+async def availability_view(request: HttpRequest) -> HttpResponse:
+    venue = request.venue
     form = AvailabilitySearchForm(request.GET or None)
-    slots = []
+    court_grid = []
+    slot_count = 0
+    grid_date = None
+    grid_version = None
     
     # Get filter parameters
     court_type_filter = request.GET.get("court_type", "")
     search_query = request.GET.get("search", "").strip()
     
-    if form.is_valid():
+    if form.is_valid() and venue is not None:
         date = form.cleaned_data["date"]
-        courts = Court.objects.filter(is_active=True)
+        grid_date = date.isoformat()
+        courts = Court.objects.filter(venue=venue, is_active=True)
         
         # Apply court type filter
         if court_type_filter and court_type_filter.lower() in ["indoor", "outdoor"]:
@@ -47,33 +157,136 @@ def availability_view(request: HttpRequest) -> HttpResponse:
         if search_query:
             courts = courts.filter(name__icontains=search_query)
         
-        for hour in range(6, 22):
-            start = datetime.combine(date, datetime.min.time()).replace(hour=hour).time()
-            end = datetime.combine(date, datetime.min.time()).replace(hour=hour + 1).time()
-            for court in courts:
-                court_available = is_court_available(court, date, start, end)
-                slots.append(
-                    {
-                        "date": date,
-                        "start": start,
-                        "end": end,
-                        "court": court,
-                        "available": court_available,
-                    }
-                )
+        grid_version = await grid_versions(venue.id, date)
+        court_list = await _alist(courts.order_by("name"))
+        fragment_keys = [
+            make_template_fragment_key("slot_grid", [venue.id, grid_date, court.id, *grid_version])
+            for court in court_list
+        ]
+        fragments = await cache.aget_many(fragment_keys)
+        if court_list and len(fragments) == len(court_list):
+            # Every court's grid is cached: no booking, rule or occupancy reads, and the
+            # template prints what was fetched rather than trusting the keys still exist
+            court_grid = [{"id": court.id, "fragment": fragments[key]} for court, key in zip(court_list, fragment_keys)]
+        else:
+            # Fragments are stored under versions that are already bumped, so their
+            # data has to come from the primary, never from a lagging replica
+            with use_primary():
+                court_grid = await _court_grid(venue, date, courts)
+        slot_count = len(court_grid) * (CLOSING_HOUR - OPENING_HOUR)
+
+    venues = await _alist(Venue.objects.filter(is_active=True).order_by("name"))
     
-    return render(
+    # Rendering touches the lazy session/user, so it runs in the sync thread
+    return await sync_to_async(render)(
         request,
         "booking/availability.html",
         {
             "form": form,
-            "slots": slots,
+            "venue": venue,
+            "venues": venues,
+            "court_grid": court_grid,
+            "slot_count": slot_count,
+            "grid_date": grid_date,
+            "grid_version": grid_version,
+            "fragment_ttl": SLOT_FRAGMENT_TTL,
+            "live_updates": _serves_live_updates(request),
             "court_type_filter": court_type_filter,
             "search_query": search_query,
         },
     )
 
 
+@replica_reads
+@venue_scoped
+async def price_matrix_view(request: HttpRequest) -> JsonResponse:
+    """
+    Prices for every court and hourly slot of a date in one response, so the
+    front end can price the grid without a quote request per cell.
+    """
+    try:
+        date_str = request.GET.get("date")
+        coach_id = request.GET.get("coach")
+        if not date_str:
+            raise ValueError("Missing parameters")
+        date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        venue = request.venue
+
+        courts = await _alist(Court.objects.filter(venue=venue, is_active=True).order_by("id"))
+        coach = await Coach.objects.aget(venue=venue, pk=coach_id) if coach_id else None
+        rules = await _alist(PricingRule.objects.filter(venue=venue, is_active=True))
+        occupancy = await ahourly_occupancy(venue.id, date)
+        hourly_slots = _hourly_slots()
+        prices = build_price_matrix(date, courts, coach, rules, hourly_slots, occupancy)
+
+        return JsonResponse(
+            {
+                "venue": venue.slug,
+                "date": date_str,
+                "coach": coach.id if coach else None,
+                "slots": [[start.strftime("%H:%M"), end.strftime("%H:%M")] for start, end in hourly_slots],
+                "courts": [
+                    {
+                        "id": court.id,
+                        "name": court.name,
+                        "court_type": court.court_type,
+                        "prices": prices[court.id],
+                    }
+                    for court in courts
+                ],
+            }
+        )
+    except Exception as exc:  # noqa: BLE001
+        return JsonResponse({"error": str(exc)}, status=400)
+
+
+def _serves_live_updates(request: HttpRequest) -> bool:
+    # Under WSGI each open stream would pin a worker thread for as long as the page is open
+    return isinstance(request, ASGIRequest)
+
+
+@venue_scoped
+async def availability_stream_view(request: HttpRequest) -> HttpResponse:
+    """
+    Server-Sent Events feed of slot changes for one venue and date. Reconnecting
+    clients send ``Last-Event-ID`` and receive what they missed, or a
+    ``reset`` event when that is no longer available.
+
+    Only served under ASGI; elsewhere it answers 204, which tells an
+    ``EventSource`` to stop reconnecting.
+    """
+    if not _serves_live_updates(request):
+        return HttpResponse(status=204)
+    try:
+        date = datetime.strptime(request.GET.get("date", ""), "%Y-%m-%d").date()
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    today = timezone.localdate()
+    if not today <= date <= today + timedelta(days=settings.LIVE_AVAILABILITY_DAYS_AHEAD):
+        # Brokers keep state per date, so clients can't make them track arbitrary ones
+        return JsonResponse({"error": "Live updates are only available for upcoming dates"}, status=400)
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    venue_id = request.venue.id if request.venue else None
+
+    async def events():
+        yield "retry: 5000\n\n"
+        async for event in get_broker().subscribe(date, last_event_id, settings.LIVE_AVAILABILITY_HEARTBEAT):
+            if event is None:
+                yield ": heartbeat\n\n"
+                continue
+            event_id, payload = event
+            if event_id is None:
+                yield "event: reset\ndata: {}\n\n"
+            elif payload["venue"] == venue_id:
+                yield f"id: {event_id}\nevent: slot\ndata: {json.dumps(payload)}\n\n"
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx-style proxies from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 def _extract_equipment_quantities(form: BookingForm) -> dict[int, int]:
     equipment_quantities: dict[int, int] = {}
     for field_name, value in form.cleaned_data.items():
@@ -83,11 +296,57 @@ def _extract_equipment_quantities(form: BookingForm) -> dict[int, int]:
     return equipment_quantities
 
 
+WAITLIST_MESSAGE = "Selected slot or equipment not available. You have been added to the waitlist."
+
+
+def _submission_fingerprint(request: HttpRequest) -> str:
+    """Digest of the booking parameters posted with an idempotency key."""
+    fields = sorted(
+        (name, values)
+        for name, values in request.POST.lists()
+        if name not in ("csrfmiddlewaretoken", "idempotency_key")
+    )
+    payload = json.dumps([request.venue.id if request.venue else None, fields])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _render_booking_form(request: HttpRequest, form: BookingForm, **context) -> HttpResponse:
+    if form.is_bound:
+        # A corrected resubmission is a new submission, not a retry of this one
+        form.data = form.data.copy()
+        form.data["idempotency_key"] = uuid.uuid4().hex
+    return render(request, "booking/booking_form.html", {"form": form, **context})
+
+
+def _booking_outcome_response(request: HttpRequest, form: BookingForm, record: IdempotencyKey) -> HttpResponse:
+    if record.outcome == IdempotencyKey.BOOKED:
+        return redirect(reverse("booking:booking_history"))
+    return _render_booking_form(request, form, error=WAITLIST_MESSAGE)
+
+
+def _idempotency_key_reused() -> HttpResponse:
+    return HttpResponse("Idempotency key was already used for a different booking", status=422)
+
+
+@venue_scoped
 def create_booking_view(request: HttpRequest) -> HttpResponse:
     if not request.user.is_authenticated:
         return redirect("booking:login")
+    venue = request.venue
     if request.method == "POST":
-        form = BookingForm(request.POST)
+        idempotency_key = request.headers.get("Idempotency-Key") or request.POST.get("idempotency_key", "")
+        if len(idempotency_key) > 64:
+            return HttpResponseBadRequest("Idempotency key too long")
+        fingerprint = _submission_fingerprint(request)
+        if idempotency_key:
+            # A retry of a submission we already handled: replay it without locks or pricing
+            record = IdempotencyKey.objects.filter(user=request.user, key=idempotency_key).first()
+            if record is not None and record.outcome:
+                if record.fingerprint != fingerprint:
+                    return _idempotency_key_reused()
+                return _booking_outcome_response(request, BookingForm(request.POST, venue=venue), record)
+
+        form = BookingForm(request.POST, venue=venue)
         if form.is_valid():
             customer_name = form.cleaned_data["customer_name"]
             date = form.cleaned_data["date"]
@@ -97,8 +356,7 @@ def create_booking_view(request: HttpRequest) -> HttpResponse:
             coach: Coach | None = form.cleaned_data["coach"]
             equipment_quantities = _extract_equipment_quantities(form)
 
-            booking = create_booking_atomic(
-                user=request.user if request.user.is_authenticated else None,
+            booking_kwargs = dict(
                 customer_name=customer_name,
                 date=date,
                 start=start,
@@ -108,18 +366,22 @@ def create_booking_view(request: HttpRequest) -> HttpResponse:
                 equipment_quantities=equipment_quantities,
                 allow_waitlist=True,
             )
+            if idempotency_key:
+                try:
+                    record = create_booking_once(
+                        idempotency_key=idempotency_key, fingerprint=fingerprint, user=request.user, **booking_kwargs
+                    )
+                except IdempotencyKeyReused:
+                    return _idempotency_key_reused()
+                return _booking_outcome_response(request, form, record)
+
+            booking = create_booking_atomic(user=request.user, **booking_kwargs)
             if booking:
                 return redirect(reverse("booking:booking_history"))
-            return render(
-                request,
-                "booking/booking_form.html",
-                {
-                    "form": form,
-                    "error": "Selected slot or equipment not available. You have been added to the waitlist.",
-                },
-            )
+            return _render_booking_form(request, form, error=WAITLIST_MESSAGE)
+        return _render_booking_form(request, form)
     else:
-        initial = {}
+        initial = {"idempotency_key": uuid.uuid4().hex}
         date = request.GET.get("date")
         start = request.GET.get("start")
         end = request.GET.get("end")
@@ -129,7 +391,7 @@ def create_booking_view(request: HttpRequest) -> HttpResponse:
             initial["start_time"] = start
             initial["end_time"] = end
             initial["court"] = court_id
-        form = BookingForm(initial=initial)
+        form = BookingForm(initial=initial, venue=venue)
 
     return render(request, "booking/booking_form.html", {"form": form})
 
@@ -137,11 +399,25 @@ def create_booking_view(request: HttpRequest) -> HttpResponse:
 def booking_history_view(request: HttpRequest) -> HttpResponse:
     if not request.user.is_authenticated:
         return redirect("booking:login")
-    bookings = Booking.objects.filter(user=request.user).order_by("-created_at")[:50]
-    return render(request, "booking/booking_history.html", {"bookings": bookings})
+    bookings = user_booking_history(request.user, limit=50)
+    # webcal:// opens the subscription dialog of the visitor's calendar app
+    calendar_url = request.build_absolute_uri(feed_url(CalendarFeed.USER, request.user.pk))
+    calendar_url = "webcal://" + calendar_url.split("://", 1)[1]
+    return render(request, "booking/booking_history.html", {"bookings": bookings, "calendar_url": calendar_url})
 
 
-def pricing_quote_view(request: HttpRequest) -> JsonResponse:
+@require_POST
+def reset_calendar_feed_view(request: HttpRequest) -> HttpResponse:
+    """Revoke the user's calendar link, e.g. after sharing it by mistake, and show the new one."""
+    if not request.user.is_authenticated:
+        return redirect("booking:login")
+    rotate_feed_secret(CalendarFeed.USER, request.user.pk)
+    return redirect("booking:booking_history")
+
+
+@replica_reads
+@venue_scoped
+async def pricing_quote_view(request: HttpRequest) -> JsonResponse:
     try:
         date_str = request.GET.get("date")
         start_str = request.GET.get("start_time")
@@ -153,81 +429,215 @@ def pricing_quote_view(request: HttpRequest) -> JsonResponse:
         date = datetime.strptime(date_str, "%Y-%m-%d").date()
         start = datetime.strptime(start_str, "%H:%M").time()
         end = datetime.strptime(end_str, "%H:%M").time()
-        court = Court.objects.get(pk=court_id)
-        coach = Coach.objects.get(pk=coach_id) if coach_id else None
-        duration_hours = (end.hour + end.minute / 60) - (start.hour + start.minute / 60)
-        
-        # Calculate base prices separately
-        court_base_rate = float(court.hourly_rate) * duration_hours
-        coach_rate = (float(coach.hourly_rate) * duration_hours) if coach else 0
-        base_price = court_base_rate + coach_rate
 
-        # Calculate equipment fees
-        equipment_fee = 0
+        court_id = int(court_id)
+        coach_id = int(coach_id) if coach_id else None
+
+        requested_equipment: dict[int, int] = {}
         for field_name, value in request.GET.items():
             if field_name.startswith("equipment_") and value:
                 try:
                     eq_id = int(field_name.replace("equipment_", ""))
-                    equipment = Equipment.objects.get(pk=eq_id)
-                    qty = int(value) if value.isdigit() else 1
-                    equipment_fee += float(equipment.rental_price) * qty
-                except (ValueError, Equipment.DoesNotExist):
-                    pass
-
-        # Apply pricing rules and track breakdown
-        from .models import PricingRule, is_weekend, is_peak_hour
-        
-        price = base_price + equipment_fee
-        rules_applied = []
-        
-        active_rules = PricingRule.objects.filter(is_active=True)
-        for rule in active_rules:
-            applies = False
-            if rule.rule_type == PricingRule.WEEKEND and is_weekend(date):
-                applies = True
-            elif rule.rule_type == PricingRule.PEAK_HOUR and is_peak_hour(rule, start, end):
-                applies = True
-            elif rule.rule_type == PricingRule.INDOOR_PREMIUM and court.court_type == Court.INDOOR:
-                applies = True
-
-            if applies:
-                adjustment = price * (float(rule.percentage_adjustment) / 100.0)
-                price += adjustment
-                rules_applied.append({
-                    "name": rule.name,
-                    "amount": round(adjustment, 2),
-                })
-
-        total = round(price, 2)
-
-        equipment_breakdown = []
-        for equipment in Equipment.objects.filter(is_active=True):
-            available = get_equipment_availability(equipment, date, start, end)
-            equipment_breakdown.append(
-                {
-                    "id": equipment.id,
-                    "name": equipment.name,
-                    "available": available,
-                }
-            )
+                except ValueError:
+                    continue
+                requested_equipment[eq_id] = int(value) if value.isdigit() else 1
 
-        return JsonResponse(
-            {
-                "base_price": round(base_price, 2),
-                "total_price": total,
-                "equipment": equipment_breakdown,
-                "breakdown": {
-                    "base_price": round(court_base_rate, 2),
-                    "coach_fee": round(coach_rate, 2) if coach else 0,
-                    "equipment_fee": round(equipment_fee, 2),
-                    "rules": rules_applied,
-                },
-            }
+        venue_id = request.venue.id if request.venue else None
+        key = await quote_cache_key(venue_id, date, start, end, court_id, coach_id, requested_equipment)
+        payload = await cached_quote(
+            key, lambda: _compute_quote(venue_id, date, start, end, court_id, coach_id, requested_equipment)
         )
+        return JsonResponse(payload)
     except Exception as exc:  # noqa: BLE001
         return JsonResponse({"error": str(exc)}, status=400)
 
 
+async def _compute_quote(
+    venue_id: int,
+    date,
+    start: time,
+    end: time,
+    court_id: int,
+    coach_id: int | None,
+    requested_equipment: dict[int, int],
+) -> dict:
+    # The queries run one after another on the request's database thread, so keep them few:
+    # the requested and the active equipment come back in one query
+    court = await Court.objects.aget(venue_id=venue_id, pk=court_id)
+    coach = await Coach.objects.aget(venue_id=venue_id, pk=coach_id) if coach_id else None
+    equipment = await _alist(
+        Equipment.objects.filter(Q(pk__in=requested_equipment) | Q(is_active=True), venue_id=venue_id)
+    )
+    priced_equipment = [item for item in equipment if item.id in requested_equipment]
+    active_equipment = [item for item in equipment if item.is_active]
+    active_rules = await _alist(PricingRule.objects.filter(venue_id=venue_id, is_active=True))
+    booked_equipment = await _alist(
+        BookingEquipment.objects.filter(
+            booking__venue_id=venue_id,
+            booking__date=date,
+            booking__start_time__lt=end,
+            booking__end_time__gt=start,
+            booking__status=Booking.CONFIRMED,
+        )
+        .values_list("equipment_id")
+        .annotate(Sum("quantity"))
+    )
+    # Read from the maintained counters; only demand rules look at it
+    occupancy = await ahourly_occupancy(venue_id, date)
+    duration_hours = (end.hour + end.minute / 60) - (start.hour + start.minute / 60)
+    
+    # Calculate base prices separately
+    court_base_rate = float(court.hourly_rate) * duration_hours
+    coach_rate = (float(coach.hourly_rate) * duration_hours) if coach else 0
+    base_price = court_base_rate + coach_rate
+
+    # Calculate equipment fees
+    equipment_fee = 0
+    for equipment in priced_equipment:
+        equipment_fee += float(equipment.rental_price) * requested_equipment[equipment.id]
+
+    # Apply pricing rules and track breakdown
+    price = base_price + equipment_fee
+    rules_applied = []
+    
+    for rule in active_rules:
+        if rule_applies(rule, date, start, end, court, occupancy):
+            adjustment = price * (float(rule.percentage_adjustment) / 100.0)
+            price += adjustment
+            rules_applied.append({
+                "name": rule.name,
+                "amount": round(adjustment, 2),
+            })
+
+    total = round(price, 2)
+
+    booked_qty = dict(booked_equipment)
+    equipment_breakdown = []
+    for equipment in active_equipment:
+        available = max(equipment.total_quantity - (booked_qty.get(equipment.id) or 0), 0)
+        equipment_breakdown.append(
+            {
+                "id": equipment.id,
+                "name": equipment.name,
+                "available": available,
+            }
+        )
+
+    return {
+        "base_price": round(base_price, 2),
+        "total_price": total,
+        "equipment": equipment_breakdown,
+        "breakdown": {
+            "base_price": round(court_base_rate, 2),
+            "coach_fee": round(coach_rate, 2) if coach else 0,
+            "equipment_fee": round(equipment_fee, 2),
+            "rules": rules_applied,
+        },
+    }
+
+
+@replica_reads
+def customer_lookup_view(request: HttpRequest) -> JsonResponse:
+    """
+    Front-desk search: the most recent bookings and waitlist entries whose
+    customer name contains ``q``, served from the customer name index.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff only"}, status=403)
+    term = request.GET.get("q", "").strip()
+    if not term:
+        return JsonResponse({"bookings": [], "waitlist": []})
+
+    bookings = search_customers(Booking.objects.select_related("court"), term).order_by("-date", "-id")
+    waitlist = search_customers(WaitlistEntry.objects.select_related("court"), term).order_by("-date", "-id")
+    return JsonResponse(
+        {
+            "bookings": [
+                {
+                    "id": booking.id,
+                    "customer_name": booking.customer_name,
+                    "date": booking.date.isoformat(),
+                    "start": booking.start_time.strftime("%H:%M"),
+                    "end": booking.end_time.strftime("%H:%M"),
+                    "court": booking.court.name,
+                    "status": booking.status,
+                }
+                for booking in bookings[:CUSTOMER_LOOKUP_LIMIT]
+            ],
+            "waitlist": [
+                {
+                    "id": entry.id,
+                    "customer_name": entry.customer_name,
+                    "date": entry.date.isoformat(),
+                    "start": entry.start_time.strftime("%H:%M"),
+                    "court": entry.court.name,
+                    "notified": entry.notified,
+                }
+                for entry in waitlist[:CUSTOMER_LOOKUP_LIMIT]
+            ],
+        }
+    )
+
+
+def booking_events_view(request: HttpRequest) -> JsonResponse:
+    """
+    Staff feed of the booking event log for processes outside this app:
+    events after the ``after`` cursor, oldest first. Request again with
+    ``after=<next>`` while ``has_more`` is true. ``limit`` echoes the page
+    size actually used, which is capped at ``MAX_PAGE``. Read from the
+    primary, so a cursor never runs ahead of what it saw.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff only"}, status=403)
+    try:
+        after = int(request.GET.get("after", 0))
+        limit = int(request.GET.get("limit", BOOKING_EVENTS_PAGE))
+    except ValueError:
+        return JsonResponse({"error": "after and limit must be integers"}, status=400)
+    if limit < 1:
+        return JsonResponse({"error": "limit must be at least 1"}, status=400)
+    limit = min(limit, MAX_PAGE)
+    slug = request.GET.get("venue")
+    venue = resolve_venue(slug) if slug else None
+    kinds = request.GET.getlist("kind")
+    events = read_events(after, limit, venue=venue, kinds=kinds)
+    # Only a full page can have more behind it; one more row settles it
+    has_more = len(events) == limit and bool(read_events(events[-1].sequence, 1, venue=venue, kinds=kinds))
+    return JsonResponse(
+        {
+            "events": [serialize_event(event) for event in events],
+            "next": events[-1].sequence if events else after,
+            "limit": limit,
+            "has_more": has_more,
+        }
+    )
+
+
+@require_safe
+@replica_reads
+def calendar_feed_view(request: HttpRequest, scope: str, object_id: int, token: str) -> HttpResponse:
+    """
+    iCalendar feed of a court, coach or user. Calendar apps poll these
+    often, so the feed's version row alone answers conditional requests
+    with a 304, and a changed feed is joined from stored events.
+    """
+    if scope not in FEED_SCOPES:
+        raise Http404("Unknown calendar feed")
+    version, modified, secret = feed_state(scope, object_id)
+    if secret is None or not constant_time_compare(token, feed_token(scope, object_id, secret)):
+        raise Http404("Unknown calendar feed")
+    etag = feed_etag(scope, object_id, version)
+    last_modified = int(modified.timestamp()) if modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(render_feed(scope, object_id, version), content_type="text/calendar; charset=utf-8")
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, max_age=settings.CALENDAR_FEED_MAX_AGE)
+    return response
+
+
 def signup_view(request: HttpRequest) -> HttpResponse:
     if request.user.is_authenticated:
         return redirect("booking:availability")
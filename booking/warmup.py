@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import logging
+from datetime import time
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.template.loader import get_template
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from .cache import prime_versions
+from .models import CLOSING_HOUR, OPENING_HOUR, Court, Venue
+from .views import availability_view, pricing_quote_view
+
+logger = logging.getLogger(__name__)
+
+# Pages whose templates are compiled ahead of the first request
+WARM_TEMPLATES = [
+    "booking/availability.html",
+    "booking/booking_form.html",
+    "booking/booking_history.html",
+    "accounts/login.html",
+]
+
+
+def warm_up() -> None:
+    """
+    Prepare a freshly started worker so its first requests are not the slow
+    ones: compile the main templates into the cached loader, check that every
+    database alias answers, seed the cache version keys, and fill the slot
+    grid fragments and quotes for the rest of today. Failures are logged,
+    never raised, so a warm-up problem can't stop a worker from booting.
+    """
+    try:
+        for name in WARM_TEMPLATES:
+            get_template(name)
+
+        for alias in connections:
+            connections[alias].ensure_connection()
+
+        today = timezone.localdate()
+        for venue in Venue.objects.filter(is_active=True):
+            prime_versions(venue.id, today)
+            warm_venue(venue, today)
+    except Exception:  # noqa: BLE001
+        logger.exception("Worker warm-up failed")
+    finally:
+        # Connections are per thread and this one serves no requests
+        connections.close_all()
+
+
+def warm_venue(venue: Venue, date) -> None:
+    """
+    Render ``venue``'s availability grid for ``date`` and quote each of its
+    courts for every hourly slot still ahead, through the views themselves
+    so the cache keys are exactly the ones requests will look up.
+    """
+    factory = RequestFactory()
+    request = factory.get(reverse("booking:availability"), {"venue": venue.slug, "date": date.isoformat()})
+    request.user = AnonymousUser()
+    async_to_sync(availability_view)(request)
+
+    now = timezone.localtime()
+    first_hour = max(OPENING_HOUR, now.hour + 1) if date == now.date() else OPENING_HOUR
+    court_ids = Court.objects.filter(venue=venue, is_active=True).values_list("id", flat=True)
+    quote_url = reverse("booking:pricing_quote")
+    for court_id in court_ids:
+        for hour in range(first_hour, CLOSING_HOUR):
+            request = factory.get(
+                quote_url,
+                {
+                    "venue": venue.slug,
+                    "date": date.isoformat(),
+                    "start_time": time(hour).strftime("%H:%M"),
+                    "end_time": time(hour + 1).strftime("%H:%M"),
+                    "court": court_id,
+                },
+            )
+            request.user = AnonymousUser()
+            async_to_sync(pricing_quote_view)(request)
@@ -0,0 +1,34 @@
+# Gunicorn settings for production. Procfile runs:
+#   gunicorn badminton_booking.asgi:application --config gunicorn.conf.py
+# To serve badminton_booking.wsgi:application instead, set
+# GUNICORN_WORKER_CLASS=gthread.
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+
+# Import Django once in the master; workers fork with the code already loaded
+preload_app = True
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "uvicorn.workers.UvicornWorker")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+# Only used by gthread workers
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+# Recycle workers now and then to bound memory growth; jitter keeps them
+# from all restarting at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = 200
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+
+
+# Fill this worker's template and cache state for today before it serves traffic
+def post_worker_init(worker):
+    from booking.warmup import warm_up
+
+    warm_up()